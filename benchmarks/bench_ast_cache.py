@@ -0,0 +1,34 @@
+# Loading a cached binary AST vs lexing and parsing the source again
+#
+#   python -m benchmarks.bench_ast_cache [functions]
+
+import sys
+import time
+
+from benchmarks.programs import generate_program
+from lexer.lexer import Lexer
+from parser.parser import Parser, dump_ast, load_ast
+
+def main() -> None:
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    source = generate_program(functions=functions)
+
+    start = time.perf_counter()
+    ast = Parser(Lexer(source).tokenize_stream()).parse_program()
+    parse_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data = dump_ast(ast)
+    dump_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    load_ast(data)
+    load_seconds = time.perf_counter() - start
+
+    print(f"Source: {len(source):,} bytes, binary AST: {len(data):,} bytes")
+    print(f"  lex + parse: {parse_seconds:.3f} s")
+    print(f"  dump_ast:    {dump_seconds:.3f} s")
+    print(f"  load_ast:    {load_seconds:.3f} s ({parse_seconds / load_seconds:.2f}x faster than lex + parse)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# AST memory and traversal: node objects vs the flat array AST
+#
+#   python -m benchmarks.bench_ast_memory [functions]
+
+import sys
+import time
+import tracemalloc
+
+from benchmarks.programs import generate_program
+from lexer.lexer import Lexer
+from parser.flat import KIND_CODES, LAYOUTS, LIST, NODE, parse_flat
+from parser.parser import Parser
+
+def measure(build):
+    """Return (result, bytes still allocated once build returns)."""
+    tracemalloc.start()
+    result = build()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, allocated
+
+def walk_objects(root) -> int:
+    """Visit every node object in pre-order, returning how many there are."""
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        for name, field_type in LAYOUTS[KIND_CODES[type(node)]][1]:
+            value = getattr(node, name)
+            if field_type == LIST:
+                stack.extend(reversed(value))
+            elif field_type == NODE and value is not None:
+                stack.append(value)
+    return count
+
+def main() -> None:
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    source = generate_program(functions=functions)
+    tokens = Lexer(source).tokenize_stream()
+
+    objects, object_bytes = measure(lambda: Parser(tokens).parse_program())
+    flat, flat_bytes = measure(lambda: parse_flat(tokens))
+    nodes = len(flat)
+    print(f"Nodes: {nodes:,}")
+    print(f"Node objects: {object_bytes / nodes:6.1f} bytes/node")
+    print(f"FlatAST:      {flat_bytes / nodes:6.1f} bytes/node (string table included)")
+    print(f"Reduction:    {object_bytes / flat_bytes:6.1f}x")
+
+    start = time.perf_counter()
+    walk_objects(objects)
+    object_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    sum(1 for _ in flat.walk())
+    flat_seconds = time.perf_counter() - start
+    print(f"Pre-order walk: objects {object_seconds:.3f} s, flat ids {flat_seconds:.3f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Code generation throughput, and classifying IR operands by type vs by their text
+#
+#   python -m benchmarks.bench_codegen_operands [functions]
+
+import gc
+import sys
+import time
+
+from benchmarks.programs import generate_program
+from generator.generator import CodeGenerator
+from intermediator.intermediator import (AssignInstr, BinaryOpInstr, ConditionalJumpInstr, IRGenerator,
+                                         PrintInstr, ReturnInstr, Temp, Var)
+from lexer.lexer import Lexer
+from parser.parser import Parser
+from semanter.semanter import SemanticAnalyzer
+
+OPERAND_FIELDS = {
+    AssignInstr: ('target', 'source'),
+    BinaryOpInstr: ('target', 'left', 'right'),
+    ConditionalJumpInstr: ('condition_var',),
+    ReturnInstr: ('value',),
+    PrintInstr: ('value',),
+}
+
+def by_text(operands) -> int:
+    """The old classification: a variable is whatever does not read like a number or a string."""
+    count = 0
+    for operand in operands:
+        text = str(operand)
+        if text.isdigit() or (text.startswith('-') and text[1:].isdigit()):
+            continue
+        if not (text.startswith('"') or text.startswith("'")):
+            count += 1
+    return count
+
+def by_type(operands) -> int:
+    return sum(isinstance(operand, (Var, Temp)) for operand in operands)
+
+def best_time(run, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main() -> None:
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    ast = Parser(Lexer(generate_program(functions=functions)).tokenize()).parse_program()
+    SemanticAnalyzer().analyze(ast)
+    ir_generator = IRGenerator()
+    ir_code = ir_generator.generate(ast)
+    operands = [getattr(instr, field) for instr in ir_code for field in OPERAND_FIELDS.get(type(instr), ())]
+    assert by_text(operands) == by_type(operands)
+    print(f"IR instructions: {len(ir_code):,}, operands: {len(operands):,}")
+
+    text_seconds = best_time(lambda: by_text(operands))
+    type_seconds = best_time(lambda: by_type(operands))
+    print(f"  classify operands: by text {text_seconds:.3f} s, by type {type_seconds:.3f} s"
+          f" ({text_seconds / type_seconds:.1f}x)")
+    for label, frames in (("analyzer frames", ir_generator.frames), ("frames from IR", None)):
+        seconds = best_time(lambda: CodeGenerator(ir_code, frames).generate_x86())
+        print(f"  generate_x86, {label + ':':16} {seconds:.3f} s, {len(ir_code) / seconds:,.0f} instructions/s")
+
+if __name__ == "__main__":
+    main()
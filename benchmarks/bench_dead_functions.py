@@ -0,0 +1,43 @@
+# Back end time and assembly size with and without dead function elimination
+#
+#   python -m benchmarks.bench_dead_functions [functions]
+
+import gc
+import sys
+import time
+
+from benchmarks.programs import generate_program
+from generator.generator import CodeGenerator
+from intermediator.intermediator import IRGenerator
+from lexer.lexer import Lexer
+from lexer.symbols import SymbolInterner
+from optimizer.callgraph import drop_unreachable_functions
+from parser.parser import Parser
+from semanter.semanter import SemanticAnalyzer
+
+def back_end(ast, prune: bool) -> tuple[float, int, str]:
+    """Seconds for pruning, IR and code generation, the functions kept and the assembly."""
+    gc.collect()
+    start = time.perf_counter()
+    if prune:
+        ast = drop_unreachable_functions(ast)
+    ir_generator = IRGenerator()
+    ir_code = ir_generator.generate(ast)
+    assembly = CodeGenerator(ir_code, ir_generator.frames).generate_x86()
+    return time.perf_counter() - start, len(ast.functions), assembly
+
+def main() -> None:
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    symbols = SymbolInterner()
+    ast = Parser(Lexer(generate_program(functions=functions), symbols=symbols).tokenize()).parse_program()
+    SemanticAnalyzer(symbols).analyze(ast)
+
+    all_seconds, all_count, all_assembly = back_end(ast, prune=False)
+    live_seconds, live_count, live_assembly = back_end(ast, prune=True)
+    print(f"Functions: {functions:,}, reachable from main: {live_count:,}")
+    print(f"  every function:   {all_seconds:.3f} s, {len(all_assembly):,} bytes of assembly")
+    print(f"  reachable only:   {live_seconds:.3f} s, {len(live_assembly):,} bytes of assembly"
+          f" ({all_seconds / live_seconds:.1f}x faster, {len(all_assembly) / len(live_assembly):.1f}x smaller)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# Loading and lexing a source file: read() into a str vs a memory map
+#
+#   python -m benchmarks.bench_file_load [functions]
+#
+# Each mode runs in a fresh interpreter so its peak RSS is its own.
+
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.programs import generate_program
+from lexer.lexer import Lexer, map_source_file
+
+def load(mode: str, path: str) -> None:
+    """Load and lex path, then print the seconds taken and the peak RSS in KiB."""
+    start = time.perf_counter()
+    if mode == 'text':
+        with open(path, 'r') as file:
+            source = file.read()
+    else:
+        source = map_source_file(path)
+    tokens = Lexer(source).tokenize_stream()
+    seconds = time.perf_counter() - start
+    print(seconds, len(tokens), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+def main() -> None:
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with tempfile.NamedTemporaryFile('w', suffix='.c') as file:
+        file.write(generate_program(functions=functions))
+        file.flush()
+        print(f"Source: {file.tell():,} bytes")
+
+        for mode in ('text', 'mmap'):
+            output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_file_load', '--load', mode, file.name],
+                                    capture_output=True, text=True, check=True).stdout
+            seconds, count, peak = output.split()
+            print(f"  {mode}: {float(seconds):.3f} s, {int(count):,} tokens, peak RSS {int(peak) / 1024:,.1f} MiB")
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['--load']:
+        load(sys.argv[2], sys.argv[3])
+    else:
+        main()
@@ -0,0 +1,44 @@
+# Front end: SemanticAnalyzer then IRGenerator vs the fused single pass
+#
+#   python -m benchmarks.bench_fused_frontend [functions]
+
+import gc
+import sys
+import time
+
+from benchmarks.programs import generate_program
+from intermediator.fused import FusedIRGenerator
+from intermediator.intermediator import IRGenerator
+from lexer.lexer import Lexer
+from parser.parser import Parser
+from semanter.semanter import SemanticAnalyzer
+
+def best_time(run, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def two_passes(ast) -> list:
+    SemanticAnalyzer().analyze(ast)
+    return IRGenerator().generate(ast)
+
+def main() -> None:
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    ast = Parser(Lexer(generate_program(functions=functions)).tokenize_stream()).parse_program()
+
+    analyze_seconds = best_time(lambda: SemanticAnalyzer().analyze(ast))
+    generate_seconds = best_time(lambda: IRGenerator().generate(ast))
+    two_pass_seconds = best_time(lambda: two_passes(ast))
+    fused_seconds = best_time(lambda: FusedIRGenerator().generate(ast))
+    print(f"Functions: {functions:,}")
+    print(f"Analyze:      {analyze_seconds:.3f} s")
+    print(f"Generate IR:  {generate_seconds:.3f} s")
+    print(f"Both passes:  {two_pass_seconds:.3f} s")
+    print(f"Fused pass:   {fused_seconds:.3f} s ({two_pass_seconds / fused_seconds:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# Input size where the NumPy lexer engine starts beating the regex engine
+#
+#   python -m benchmarks.bench_lexer_crossover
+
+import time
+
+from benchmarks.programs import generate_program
+from lexer.lexer import Lexer
+
+def best_time(source: str, engine: str, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        Lexer(source, engine=engine).tokenize_stream()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main() -> None:
+    crossover = None
+    print(f"{'characters':>12} {'regex ms':>10} {'numpy ms':>10} {'speedup':>8}")
+    for functions in (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096):
+        source = generate_program(functions=functions)
+        repeat = max(3, 2000 // functions)
+        regex = best_time(source, 'regex', repeat)
+        vectorized = best_time(source, 'numpy', repeat)
+        print(f"{len(source):>12,} {regex * 1000:>10.3f} {vectorized * 1000:>10.3f} {regex / vectorized:>7.2f}x")
+        if crossover is None and vectorized < regex:
+            crossover = len(source)
+    if crossover is None:
+        print("The NumPy engine did not beat the regex engine at any size.")
+    else:
+        print(f"The NumPy engine is faster from about {crossover:,} characters.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+# Tokens per second of the lexer engines on small and very large inputs
+#
+#   python -m benchmarks.bench_lexer_engines [functions]
+
+import sys
+import time
+
+from benchmarks.programs import generate_program
+from lexer.lexer import ENGINES, Lexer
+
+def best_time(function, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main() -> None:
+    large = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    inputs = [("small", generate_program(functions=2, statements=10), 200),
+              ("large", generate_program(functions=large), 3)]
+
+    for label, source, repeat in inputs:
+        count = len(Lexer(source).tokenize_stream())
+        print(f"{label}: {len(source):,} characters, {count:,} tokens")
+        for engine in ENGINES:
+            for method in ('tokenize', 'tokenize_stream'):
+                seconds = best_time(lambda: getattr(Lexer(source, engine=engine), method)(), repeat)
+                print(f"  {engine:>6} {method:<16} {count / seconds:>12,.0f} tokens/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# Sequential vs process-pool parsing of a large generated program
+#
+#   python -m benchmarks.bench_parallel_parser [functions] [workers]
+
+import os
+import sys
+import time
+
+from benchmarks.programs import generate_program
+from lexer.lexer import Lexer
+from parser.parallel import parallel_parse
+from parser.parser import Parser
+
+def main() -> None:
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    source = generate_program(functions=functions)
+    tokens = Lexer(source).tokenize()
+    print(f"Tokens: {len(tokens):,}, functions: {functions:,}, workers: {workers}")
+
+    start = time.perf_counter()
+    Parser(tokens).parse_program()
+    sequential = time.perf_counter() - start
+    print(f"  sequential:              {sequential:.3f} s")
+
+    # A list sends tokens to the workers, a TokenStream sends source text
+    for label, parallel_input in (("list", tokens), ("TokenStream", Lexer(source).tokenize_stream())):
+        start = time.perf_counter()
+        parallel_parse(parallel_input, workers=workers, threshold=0)
+        parallel = time.perf_counter() - start
+        print(f"  parallel ({label + '):':<13} {parallel:.3f} s ({sequential / parallel:.2f}x)")
+
+if __name__ == "__main__":
+    main()
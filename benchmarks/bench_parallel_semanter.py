@@ -0,0 +1,35 @@
+# Sequential vs process-pool semantic analysis of a large generated program
+#
+#   python -m benchmarks.bench_parallel_semanter [functions] [workers]
+
+import os
+import sys
+import time
+
+from benchmarks.programs import generate_program
+from lexer.lexer import Lexer
+from parser.parser import Parser
+from semanter.parallel import parallel_analyze
+from semanter.semanter import SemanticAnalyzer
+
+def main() -> None:
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    source = generate_program(functions=functions)
+    print(f"Functions: {functions:,}, workers: {workers}")
+
+    # Analysis annotates the nodes, so each run gets a fresh tree
+    ast = Parser(Lexer(source).tokenize()).parse_program()
+    start = time.perf_counter()
+    SemanticAnalyzer().analyze(ast)
+    sequential = time.perf_counter() - start
+    print(f"  sequential: {sequential:.3f} s")
+
+    ast = Parser(Lexer(source).tokenize()).parse_program()
+    start = time.perf_counter()
+    parallel_analyze(ast, workers=workers, threshold=0)
+    parallel = time.perf_counter() - start
+    print(f"  parallel:   {parallel:.3f} s ({sequential / parallel:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+# Tokens per second of the recursive-descent and LL(1) parser engines
+#
+#   python -m benchmarks.bench_parser_engines [functions]
+
+import sys
+import time
+
+from benchmarks.programs import generate_program
+from lexer.lexer import Lexer
+from parser.parser import PARSER_ENGINES, Parser
+
+def best_time(function, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main() -> None:
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    tokens = Lexer(generate_program(functions=functions)).tokenize()
+    print(f"Tokens: {len(tokens):,}")
+    for engine in PARSER_ENGINES:
+        seconds = best_time(lambda: Parser(tokens, engine=engine).parse_program(), 3)
+        print(f"  {engine:>9}: {len(tokens) / seconds:>12,.0f} tokens/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Back end time, calls and assembly size with and without removing calls to pure functions
+#
+# The calls removed are the ones the program no longer makes at run time. The
+# back end time includes the purity analysis, which costs somewhat more than
+# generating code for the smaller program saves.
+#
+#   python -m benchmarks.bench_pure_calls [functions]
+
+import gc
+import random
+import sys
+import time
+
+from generator.generator import CodeGenerator
+from intermediator.intermediator import FunctionCallInstr, IRGenerator
+from lexer.lexer import Lexer
+from lexer.symbols import SymbolInterner
+from optimizer.callgraph import drop_unreachable_ir
+from optimizer.purity import pure_functions, remove_pure_calls
+from parser.parser import Parser
+from semanter.semanter import SemanticAnalyzer
+
+def generate_helpers(functions: int, seed: int = 0) -> str:
+    """A program whose main calls every helper, a quarter of which print.
+
+    The other helpers only compute with their locals in counted loops and
+    call earlier helpers, so whether they are pure depends on what they call.
+    """
+    rng = random.Random(seed)
+    lines = []
+    for index in range(functions):
+        lines.append(f"int helper_{index}() {{")
+        lines.append(f"    int i = 0; int x = {rng.randint(1, 99)};")
+        lines.append(f"    while (i < {rng.randint(1, 50)}) {{ x = x * 3 + i; i = i + 1; }}")
+        if index > 0 and rng.random() < 0.5:
+            lines.append(f"    helper_{rng.randrange(index)}();")
+        if rng.random() < 0.25:
+            lines.append("    print(x);")
+        lines.append("    return x;")
+        lines.append("}")
+    lines.append("int main() {")
+    lines.extend(f"    helper_{index}();" for index in range(functions))
+    lines.append("    return 0;")
+    lines.append("}")
+    return "\n".join(lines)
+
+def back_end(ast, optimize: bool) -> tuple[float, int, str]:
+    """Seconds for the analysis, IR and code generation, the calls left and the assembly."""
+    gc.collect()
+    start = time.perf_counter()
+    ir_generator = IRGenerator()
+    ir_code = ir_generator.generate(ast)
+    if optimize:
+        ir_code = drop_unreachable_ir(remove_pure_calls(ir_code, pure_functions(ast)))
+    assembly = CodeGenerator(ir_code, ir_generator.frames).generate_x86()
+    calls = sum(isinstance(instr, FunctionCallInstr) for instr in ir_code)
+    return time.perf_counter() - start, calls, assembly
+
+def main() -> None:
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    symbols = SymbolInterner()
+    ast = Parser(Lexer(generate_helpers(functions), symbols=symbols).tokenize()).parse_program()
+    SemanticAnalyzer(symbols).analyze(ast)
+
+    all_seconds, all_calls, all_assembly = back_end(ast, optimize=False)
+    kept_seconds, kept_calls, kept_assembly = back_end(ast, optimize=True)
+    print(f"Functions: {functions:,}, pure: {len(pure_functions(ast)):,}")
+    print(f"  every call:       {all_seconds:.3f} s, {all_calls:,} calls, {len(all_assembly):,} bytes of assembly")
+    print(f"  pure calls gone:  {kept_seconds:.3f} s, {kept_calls:,} calls, {len(kept_assembly):,} bytes of assembly"
+          f" ({len(all_assembly) / len(kept_assembly):.1f}x smaller)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+# Bytes per token: list of tuples vs TokenStream
+#
+#   python -m benchmarks.bench_token_memory [functions]
+
+import sys
+import tracemalloc
+
+from benchmarks.programs import generate_program
+from lexer.lexer import Lexer
+
+def measure(tokenize) -> tuple[int, int]:
+    """Return (token count, bytes still allocated once tokenize returns)."""
+    tracemalloc.start()
+    tokens = tokenize()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(tokens), allocated
+
+def main() -> None:
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    source = generate_program(functions=functions)
+    print(f"Source: {len(source):,} characters")
+
+    count, list_bytes = measure(lambda: Lexer(source).tokenize())
+    _, stream_bytes = measure(lambda: Lexer(source).tokenize_stream())
+
+    print(f"Tokens: {count:,}")
+    print(f"list[tuple[str, str]]: {list_bytes / count:6.1f} bytes/token")
+    print(f"TokenStream:           {stream_bytes / count:6.1f} bytes/token")
+    print(f"Reduction:             {list_bytes / stream_bytes:6.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# Visitor dispatch: cached per-class lookup vs building 'visit_' names per node
+#
+#   python -m benchmarks.bench_visitor_dispatch [functions]
+#
+# The default of 8000 functions gives an AST of about a million nodes.
+
+import gc
+import sys
+import time
+
+from benchmarks.programs import generate_program
+from intermediator.intermediator import IRGenerator
+from lexer.lexer import Lexer
+from parser.flat import LAYOUTS, LIST, NODE
+from parser.parser import Parser
+from parser.visitor import NodeVisitor, visit_iteratively
+from semanter.semanter import SemanticAnalyzer
+
+class NameDispatch:
+    """Mixin restoring the old dispatch: a method name and a getattr per node."""
+
+    def visit(self, node):
+        def dispatch(node):
+            method_name = f'visit_{type(node).__name__}'
+            return getattr(self, method_name, self.generic_visit)(node)
+        return visit_iteratively(dispatch, node)
+
+def _counting_method(layout):
+    def visit(self, node):
+        self.count += 1
+        for name, field_type in layout:
+            value = getattr(node, name)
+            if field_type == LIST:
+                for child in value:
+                    yield child
+            elif field_type == NODE and value is not None:
+                yield value
+    return visit
+
+class NodeCounter(NodeVisitor):
+    """Does nothing but visit every node, so dispatch is most of the work."""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+for node_class, layout in LAYOUTS:
+    setattr(NodeCounter, f'visit_{node_class.__name__}', _counting_method(layout))
+
+class NameDispatchCounter(NameDispatch, NodeCounter):
+    pass
+
+class NameDispatchAnalyzer(NameDispatch, SemanticAnalyzer):
+    pass
+
+class NameDispatchIRGenerator(NameDispatch, IRGenerator):
+    pass
+
+def best_time(run, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect() # Garbage left by the previous run would be collected during this one
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main() -> None:
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    ast = Parser(Lexer(generate_program(functions=functions)).tokenize_stream()).parse_program()
+    counter = NodeCounter()
+    counter.visit(ast)
+    print(f"Nodes: {counter.count:,}")
+
+    walkers = (
+        ("Node count only", NameDispatchCounter, NodeCounter, lambda walker: walker.visit(ast)),
+        ("SemanticAnalyzer", NameDispatchAnalyzer, SemanticAnalyzer, lambda walker: walker.analyze(ast)),
+        ("IRGenerator", NameDispatchIRGenerator, IRGenerator, lambda walker: walker.generate(ast)),
+    )
+    for label, old_class, new_class, run in walkers:
+        old_seconds = best_time(lambda: run(old_class()))
+        new_seconds = best_time(lambda: run(new_class()))
+        print(f"{label:17} name+getattr {old_seconds:.3f} s, cached {new_seconds:.3f} s"
+              f" ({old_seconds / new_seconds:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Synthetic source programs for the benchmarks
+
+import random
+
+def generate_program(functions: int = 100, statements: int = 20, seed: int = 0) -> str:
+    """Return a valid program with the given number of functions.
+
+    Every function declares a few locals and then mixes assignments,
+    conditionals, loops, prints and calls to earlier functions, so all token
+    and node types show up. The last function is main.
+    """
+    rng = random.Random(seed)
+    operators = ['+', '-', '*', '/', '==', '!=', '<', '>', '<=', '>=', '&&', '||']
+    lines = []
+
+    for index in range(functions):
+        name = "main" if index == functions - 1 else f"helper_{index}"
+        local_names = [f"v{index}_{k}" for k in range(4)]
+        lines.append(f"int {name}() {{")
+        lines.append(f"    // function {index}")
+        for local_name in local_names:
+            lines.append(f"    int {local_name} = {rng.randint(0, 99)};")
+
+        def expression(terms: int) -> str:
+            parts = [rng.choice(local_names + [str(rng.randint(1, 9))])]
+            for _ in range(terms - 1):
+                parts.append(rng.choice(operators))
+                parts.append(rng.choice(local_names + [str(rng.randint(1, 9))]))
+            return " ".join(parts)
+
+        for _ in range(statements):
+            choice = rng.random()
+            if choice < 0.4:
+                lines.append(f"    {rng.choice(local_names)} = {expression(rng.randint(1, 5))};")
+            elif choice < 0.55:
+                lines.append(f"    if ({expression(3)}) {{")
+                lines.append(f"        print(\"branch {index}\");")
+                lines.append("    } else {")
+                lines.append(f"        {rng.choice(local_names)} = {expression(2)};")
+                lines.append("    }")
+            elif choice < 0.7:
+                counter = rng.choice(local_names)
+                lines.append(f"    while ({counter} < {rng.randint(1, 9)}) {{")
+                lines.append(f"        {counter} = {counter} + 1;")
+                lines.append("    }")
+            elif choice < 0.85:
+                lines.append(f"    print({rng.choice(local_names)});")
+            elif index > 0:
+                lines.append(f"    helper_{rng.randrange(index)}();")
+            else:
+                lines.append("    print('leaf');")
+        lines.append(f"    return {expression(2)};")
+        lines.append("}")
+        lines.append("")
+
+    return "\n".join(lines)
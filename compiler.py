@@ -2,55 +2,81 @@ import lexer.lexer as lexer
 import parser.parser as parser
 import semanter.semanter as semanter
 import intermediator.intermediator as intermediator
+import intermediator.fused as fused
 import generator.generator as generator
+import optimizer.callgraph as callgraph
+import optimizer.purity as purity
+from lexer.symbols import SymbolInterner
+import mmap
 import subprocess
 
 if __name__ == "__main__":
     import sys
 
     if len(sys.argv) < 3:
-        print("Usage: python compiler.py <source_file> <output_file>")
+        print("Usage: python compiler.py <source_file> <output_file> [--fused]")
         sys.exit(1)
 
     source_file = sys.argv[1]
     output_file = sys.argv[2]
+    # Type-check and generate IR in one walk of the AST instead of two
+    fused_front_end = "--fused" in sys.argv[3:]
 
     try:
-        with open(source_file, 'r') as file:
-            source_code = file.read()
-
-        # Tokenize the source code
-        lexer_instance = lexer.Lexer(source_code)
-        tokens = lexer_instance.tokenize()
-
-        # Print the tokens
-        print("Tokens:")
-        for token in tokens:
-            print(token)
-
-        # Parse the tokens
-        parser_instance = parser.Parser(tokens)
-        ast = parser_instance.parse_program()
+        # Map the file instead of reading and decoding it; the lexer scans the bytes
+        source_code = lexer.map_source_file(source_file)
+        try:
+            # Identifier ids shared by every stage of this compilation
+            symbols = SymbolInterner()
+
+            # Tokenize the source code
+            lexer_instance = lexer.Lexer(source_code, symbols=symbols)
+            tokens = lexer_instance.tokenize_stream()
+
+            # Print the tokens
+            print("Tokens:")
+            for token in tokens:
+                print(token)
+
+            # Parse the tokens
+            parser_instance = parser.Parser(tokens)
+            ast = parser_instance.parse_program()
+        finally:
+            # The AST holds its own copies of the token values, so the mapping can go
+            if isinstance(source_code, mmap.mmap):
+                source_code.close()
 
         # Print the AST
         print("\nAbstract Syntax Tree (AST):")
         parser.print_ast(ast)
 
-        # Run the semantic analysis
-        semanter_instance = semanter.SemanticAnalyzer()
-        semanter_instance.analyze(ast)
+        if fused_front_end:
+            # Semantic analysis and Intermediate Code in a single pass
+            ir_generator = fused.FusedIRGenerator(symbols)
+            ir_code = ir_generator.generate(ast)
+        else:
+            # Run the semantic analysis
+            semanter_instance = semanter.SemanticAnalyzer(symbols)
+            semanter_instance.analyze(ast)
+
+            # Drop the functions main never calls, once they have been checked
+            ast = callgraph.drop_unreachable_functions(ast)
+
+            # Generate Intermediate Code
+            ir_generator = intermediator.IRGenerator()
+            ir_code = ir_generator.generate(ast)
 
-        # Generate Intermediate Code
-        ir_generator = intermediator.IRGenerator()
-        ir_code = ir_generator.generate(ast)
+        # Drop the calls that do nothing observable, then the functions main never calls
+        ir_code = purity.remove_pure_calls(ir_code, purity.pure_functions(ast))
+        ir_code = callgraph.drop_unreachable_ir(ir_code)
 
         # Print the Intermediate Code
         # print("\\nIntermediate Code:")
         for instruction in ir_code:
             print(instruction)
 
-        # Call the code generator
-        code_generator = generator.CodeGenerator(ir_code)
+        # Call the code generator, with the stack frames laid out from the analyzer's symbols
+        code_generator = generator.CodeGenerator(ir_code, ir_generator.frames)
         code = code_generator.generate_x86()
 
         # Print the generated code
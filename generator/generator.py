@@ -1,8 +1,27 @@
 # Generator
 import intermediator.intermediator as intermediator
 
+# Operand fields of each IR instruction type
+_OPERAND_FIELDS = {
+    intermediator.AssignInstr: ('target', 'source'),
+    intermediator.BinaryOpInstr: ('target', 'left', 'right'),
+    intermediator.ConditionalJumpInstr: ('condition_var',),
+    intermediator.ReturnInstr: ('value',),
+    intermediator.PrintInstr: ('value',),
+}
+
+# Instruction setting AL from the flags of cmp eax, ebx, by comparison operator
+_SET_CONDITION = {
+    "==": "  sete al         ; Set AL if equal",
+    "!=": "  setne al        ; Set AL if not equal",
+    "<": "  setl al         ; Set AL if less",
+    "<=": "  setle al        ; Set AL if less or equal",
+    ">": "  setg al         ; Set AL if greater",
+    ">=": "  setge al        ; Set AL if greater or equal",
+}
+
 class CodeGenerator:
-    def __init__(self, ir_code):
+    def __init__(self, ir_code, frames: dict | None = None):
         self.ir_code = ir_code
         self.assembly_code_parts = {
             "data": [],
@@ -12,57 +31,44 @@ class CodeGenerator:
         self.current_function_name = None
         self.current_function_var_offsets = {}
         self.defined_data_labels = set()
+        # Function name -> its stack frame operands in slot order, as in
+        # IRGenerator.frames. Frames of other functions are collected from the IR.
+        self.frames = frames if frames is not None else {}
 
     def _get_var_location_or_value(self, var_name_or_value):
-        if isinstance(var_name_or_value, int):
+        # Every variable of the current function has a location, anything else is a value
+        location = self.current_function_var_offsets.get(var_name_or_value)
+        if location is None:
             return str(var_name_or_value)
+        return location
 
-        s_val = str(var_name_or_value)
-        if s_val.isdigit() or (s_val.startswith('-') and s_val[1:].isdigit()):
-            return s_val
-
-        if (s_val.startswith('"') and s_val.endswith('"')) or (s_val.startswith("'") and s_val.endswith("'")):
-            return s_val
-
-        if var_name_or_value in self.current_function_var_offsets:
-            return self.current_function_var_offsets[var_name_or_value]
-
-    def _collect_vars_for_function(self, function_irs):
-        local_vars = set()
+    def _collect_vars_for_function(self, function_irs, function_names=frozenset()):
+        local_vars = {}
+        assigned = set()
         for instr in function_irs:
-            if isinstance(instr, intermediator.AssignInstr):
-                if not str(instr.target).isdigit(): local_vars.add(instr.target)
-                if not isinstance(instr.source, int) and not str(instr.source).isdigit() and not str(instr.source).startswith('"') and not str(instr.source).startswith("'"):
-                    local_vars.add(instr.source)
-            elif isinstance(instr, intermediator.BinaryOpInstr):
-                if not str(instr.target).isdigit(): local_vars.add(instr.target)
-                if not isinstance(instr.left, int) and not str(instr.left).isdigit() and not str(instr.left).startswith('"') and not str(instr.left).startswith("'"):
-                    local_vars.add(instr.left)
-                if not isinstance(instr.right, int) and not str(instr.right).isdigit() and not str(instr.right).startswith('"') and not str(instr.right).startswith("'"):
-                    local_vars.add(instr.right)
-            elif isinstance(instr, intermediator.ConditionalJumpInstr):
-                if not isinstance(instr.condition_var, int) and not str(instr.condition_var).isdigit() and not str(instr.condition_var).startswith('"') and not str(instr.condition_var).startswith("'"):
-                    local_vars.add(instr.condition_var)
-            elif isinstance(instr, intermediator.ReturnInstr):
-                if instr.value is not None and not isinstance(instr.value, int) and not str(instr.value).isdigit() and not str(instr.value).startswith('"') and not str(instr.value).startswith("'"):
-                    local_vars.add(instr.value)
-            elif isinstance(instr, intermediator.PrintInstr):
-                if not isinstance(instr.value, int) and not str(instr.value).isdigit() and not str(instr.value).startswith('"') and not str(instr.value).startswith("'"):
-                    local_vars.add(instr.value)
-        return sorted(list(local_vars))
-
-    def _get_irs_for_function(self, func_name_label):
-        function_instructions = []
-        in_function_scope = False
-        for instr in enumerate(self.ir_code):
-            if isinstance(instr, intermediator.LabelInstr):
-                if instr.name == func_name_label:
-                    in_function_scope = True
-                elif in_function_scope:
-                    break
-            if in_function_scope:
-                function_instructions.append(instr)
-        return function_instructions
+            for field in _OPERAND_FIELDS.get(type(instr), ()):
+                operand = getattr(instr, field)
+                if isinstance(operand, (intermediator.Var, intermediator.Temp)):
+                    local_vars[operand] = None
+                    if field == 'target':
+                        assigned.add(operand)
+        # A function name used as a value is the function's address, as with
+        # frames, where only the function's own variables have slots
+        return sorted((var for var in local_vars
+                       if not self._names_function(var, function_names, assigned)), key=str)
+
+    @staticmethod
+    def _names_function(operand, function_names, assigned):
+        """Whether a Var is a function of the program rather than a variable.
+
+        Once analyzed, a function is a global Symbol. Without a Symbol, it is a
+        name of one of the program's functions that the function never assigns.
+        """
+        if not isinstance(operand, intermediator.Var):
+            return False
+        if operand.symbol is not None:
+            return operand.symbol.scope_level == 0
+        return operand.name in function_names and operand not in assigned
 
     def _add_asm(self, line, section="text"):
         self.assembly_code_parts[section].append(line)
@@ -75,25 +81,22 @@ class CodeGenerator:
         self._add_asm("section .text", section="text")
         self._add_asm("global _start", section="text")
 
-        function_starts = {}
-        for i, instr in enumerate(self.ir_code):
-            if isinstance(instr, intermediator.LabelInstr) and not instr.name.startswith("L"):
-                function_starts[instr.name] = i
-
-        processed_functions = set()
+        # Function labels are typed, so a function named like an internal label is still a function
+        function_starts = [i for i, instr in enumerate(self.ir_code)
+                           if isinstance(instr, intermediator.LabelInstr) and isinstance(instr.name, intermediator.FuncLabel)]
+        function_ends = function_starts[1:] + [len(self.ir_code)]
+        function_names = {self.ir_code[i].name for i in function_starts}
+        text = self.assembly_code_parts["text"]
+        add = text.append
 
-        for func_name, start_index in function_starts.items():
+        for start_index, end_index in zip(function_starts, function_ends):
+            func_name = self.ir_code[start_index].name
             self.current_function_name = func_name
-            self.current_function_var_offsets = {}
+            func_irs = self.ir_code[start_index:end_index]
 
-            func_irs = []
-            for i in range(start_index, len(self.ir_code)):
-                current_instr = self.ir_code[i]
-                if isinstance(current_instr, intermediator.LabelInstr) and current_instr.name != func_name and current_instr.name in function_starts:
-                    break
-                func_irs.append(current_instr)
-
-            local_vars = self._collect_vars_for_function(func_irs)
+            local_vars = self.frames.get(func_name)
+            if local_vars is None:
+                local_vars = self._collect_vars_for_function(func_irs, function_names)
             stack_size = len(local_vars) * 4
 
             label_to_emit = "_start" if func_name == "main" else func_name
@@ -101,126 +104,97 @@ class CodeGenerator:
             self._add_asm("  push ebp")
             self._add_asm("  mov ebp, esp")
             if stack_size > 0:
-                self._add_asm(f"  sub esp, {stack_size}  ; Allocate {stack_size} bytes for locals: {', '.join(local_vars)}")
-
-            current_offset = 0
-            for var_name in local_vars:
-                current_offset += 4
-                self.current_function_var_offsets[var_name] = f"[ebp-{current_offset}]"
-
-            for instr in func_irs:
-                if isinstance(instr, intermediator.LabelInstr):
-                    if instr.name != func_name:
-                         self._add_asm(f"{instr.name}:")
-
-                elif isinstance(instr, intermediator.AssignInstr):
-                    target_loc = self._get_var_location_or_value(instr.target)
-                    source_val_or_loc = self._get_var_location_or_value(instr.source)
-
-                    if source_val_or_loc.startswith("[ebp-") or source_val_or_loc.startswith("[ebp+"):
-                        self._add_asm(f"  mov eax, {source_val_or_loc}")
-                        self._add_asm(f"  mov {target_loc}, eax")
+                self._add_asm(f"  sub esp, {stack_size}  ; Allocate {stack_size} bytes for locals: {', '.join(map(str, local_vars))}")
+
+            offsets = self.current_function_var_offsets = {
+                var: f"[ebp-{4 * slot}]" for slot, var in enumerate(local_vars, 1)}
+            # Where an operand is: its stack slot, or the operand itself as an immediate
+            location = self._get_var_location_or_value
+
+            for instr in func_irs[1:]:
+                instr_type = type(instr)
+                if instr_type is intermediator.LabelInstr:
+                    add(f"{instr.name}:")
+
+                elif instr_type is intermediator.AssignInstr:
+                    target_loc = location(instr.target)
+                    source_loc = offsets.get(instr.source)
+                    if source_loc is not None:
+                        add(f"  mov eax, {source_loc}")
+                        add(f"  mov {target_loc}, eax")
                     else:
-                        self._add_asm(f"  mov dword {target_loc}, {source_val_or_loc}")
-
-                elif isinstance(instr, intermediator.FunctionCallInstr):
-                    self._add_asm(f"  call {instr.function_name}")
+                        add(f"  mov dword {target_loc}, {instr.source}")
 
-                elif isinstance(instr, intermediator.BinaryOpInstr):
-                    target_loc = self._get_var_location_or_value(instr.target)
-                    left_val_or_loc = self._get_var_location_or_value(instr.left)
-                    right_val_or_loc = self._get_var_location_or_value(instr.right)
-
-                    if left_val_or_loc.startswith("[ebp-") or left_val_or_loc.startswith("[ebp+"):
-                        self._add_asm(f"  mov eax, {left_val_or_loc}")
-                    else:
-                        self._add_asm(f"  mov eax, {left_val_or_loc}")
+                elif instr_type is intermediator.FunctionCallInstr:
+                    add(f"  call {instr.function_name}")
 
-                    if right_val_or_loc.startswith("[ebp-") or right_val_or_loc.startswith("[ebp+"):
-                        self._add_asm(f"  mov ebx, {right_val_or_loc}")
-                    else:
-                        self._add_asm(f"  mov ebx, {right_val_or_loc}")
+                elif instr_type is intermediator.BinaryOpInstr:
+                    target_loc = location(instr.target)
+                    add(f"  mov eax, {location(instr.left)}")
+                    add(f"  mov ebx, {location(instr.right)}")
 
                     op = instr.operator
                     if op == '+':
-                        self._add_asm("  add eax, ebx")
-                        self._add_asm(f"  mov {target_loc}, eax")
+                        add("  add eax, ebx")
+                        add(f"  mov {target_loc}, eax")
                     elif op == '-':
-                        self._add_asm("  sub eax, ebx")
-                        self._add_asm(f"  mov {target_loc}, eax")
+                        add("  sub eax, ebx")
+                        add(f"  mov {target_loc}, eax")
                     elif op == '*':
-                        self._add_asm("  imul eax, ebx")
-                        self._add_asm(f"  mov {target_loc}, eax")
+                        add("  imul eax, ebx")
+                        add(f"  mov {target_loc}, eax")
                     elif op == '/':
-                        self._add_asm("  cdq           ; Sign extend eax into edx:eax for idiv")
-                        self._add_asm("  idiv ebx      ; Quotient in eax, remainder in edx")
-                        self._add_asm(f"  mov {target_loc}, eax")
-                    elif op in ["==", "!=", "<", "<=", ">", ">="]:
-                        self._add_asm("  cmp eax, ebx")
-                        if op == "==":  self._add_asm("  sete al         ; Set AL if equal")
-                        elif op == "!=": self._add_asm("  setne al        ; Set AL if not equal")
-                        elif op == "<":   self._add_asm("  setl al         ; Set AL if less")
-                        elif op == "<=":  self._add_asm("  setle al        ; Set AL if less or equal")
-                        elif op == ">":   self._add_asm("  setg al         ; Set AL if greater")
-                        elif op == ">=":  self._add_asm("  setge al        ; Set AL if greater or equal")
-                        self._add_asm("  movzx eax, al   ; Zero-extend AL to EAX (EAX = 0 or 1)")
-                        self._add_asm(f"  mov {target_loc}, eax")
-
-                elif isinstance(instr, intermediator.JumpInstr):
-                    self._add_asm(f"  jmp {instr.label_name}")
-
-                elif isinstance(instr, intermediator.ConditionalJumpInstr):
-                    condition_var_loc = self._get_var_location_or_value(instr.condition_var)
-                    if condition_var_loc.startswith("[ebp-") or condition_var_loc.startswith("[ebp+"):
-                        self._add_asm(f"  mov eax, {condition_var_loc}")
-                    else:
-                         self._add_asm(f"  mov eax, {condition_var_loc}")
-
-                    self._add_asm("  test eax, eax    ; Test if the condition_var (result of a comparison) is zero")
+                        add("  cdq           ; Sign extend eax into edx:eax for idiv")
+                        add("  idiv ebx      ; Quotient in eax, remainder in edx")
+                        add(f"  mov {target_loc}, eax")
+                    elif op in _SET_CONDITION:
+                        add("  cmp eax, ebx")
+                        add(_SET_CONDITION[op])
+                        add("  movzx eax, al   ; Zero-extend AL to EAX (EAX = 0 or 1)")
+                        add(f"  mov {target_loc}, eax")
+
+                elif instr_type is intermediator.JumpInstr:
+                    add(f"  jmp {instr.label_name}")
+
+                elif instr_type is intermediator.ConditionalJumpInstr:
+                    add(f"  mov eax, {location(instr.condition_var)}")
+                    add("  test eax, eax    ; Test if the condition_var (result of a comparison) is zero")
                     if instr.jump_if_false:
-                        self._add_asm(f"  je {instr.label_name}  ; Jump if condition_var is zero (false)")
+                        add(f"  je {instr.label_name}  ; Jump if condition_var is zero (false)")
                     else:
-                        self._add_asm(f"  jne {instr.label_name} ; Jump if condition_var is not zero (true)")
+                        add(f"  jne {instr.label_name} ; Jump if condition_var is not zero (true)")
 
-                elif isinstance(instr, intermediator.ReturnInstr):
+                elif instr_type is intermediator.ReturnInstr:
                     is_main_function = (self.current_function_name == "main")
 
                     if is_main_function:
-                        self._add_asm("  ; --- Main function returning, preparing to exit ---")
+                        add("  ; --- Main function returning, preparing to exit ---")
                         if instr.value is not None:
-                            val_or_loc = self._get_var_location_or_value(instr.value)
-                            if val_or_loc.startswith("[ebp-") or val_or_loc.startswith("[ebp+"):
-                                self._add_asm(f"  mov eax, {val_or_loc}")
-                                self._add_asm(f"  mov ebx, eax        ; Exit code from main\'s return value")
+                            val_loc = offsets.get(instr.value)
+                            if val_loc is not None:
+                                add(f"  mov eax, {val_loc}")
+                                add(f"  mov ebx, eax        ; Exit code from main\'s return value")
                             else:
-                                self._add_asm(f"  mov ebx, {val_or_loc} ; Exit code from main\'s return constant")
+                                add(f"  mov ebx, {instr.value} ; Exit code from main\'s return constant")
                         else:
-                            self._add_asm("  xor ebx, ebx          ; Default exit code 0")
-                        self._add_asm("  mov eax, 1            ; syscall: sys_exit")
-                        self._add_asm("  int 0x80              ; Call kernel")
+                            add("  xor ebx, ebx          ; Default exit code 0")
+                        add("  mov eax, 1            ; syscall: sys_exit")
+                        add("  int 0x80              ; Call kernel")
                     else:
                         if instr.value is not None:
-                            val_or_loc = self._get_var_location_or_value(instr.value)
-                            if val_or_loc.startswith("[ebp-") or val_or_loc.startswith("[ebp+"):
-                                 self._add_asm(f"  mov eax, {val_or_loc}   ; Return value")
+                            val_loc = offsets.get(instr.value)
+                            if val_loc is not None:
+                                 add(f"  mov eax, {val_loc}   ; Return value")
                             else:
-                                 self._add_asm(f"  mov eax, {val_or_loc}   ; Return constant value")
-                        self._add_asm("  mov esp, ebp      ; Deallocate locals")
-                        self._add_asm("  pop ebp")
-                        self._add_asm("  ret")
+                                 add(f"  mov eax, {instr.value}   ; Return constant value")
+                        add("  mov esp, ebp      ; Deallocate locals")
+                        add("  pop ebp")
+                        add("  ret")
 
-                elif isinstance(instr, intermediator.PrintInstr):
+                elif instr_type is intermediator.PrintInstr:
                     val = instr.value
-                    s_val = str(val)
-
-                    is_string_literal = False
-                    if len(s_val) >= 2 and \
-                       ((s_val.startswith('"') and s_val.endswith('"')) or \
-                        (s_val.startswith("'") and s_val.endswith("'"))):
-                        is_string_literal = True
-                    if is_string_literal:
-                        string_literal_content = s_val[1:-1]
-                        processed_content = string_literal_content.replace('\\\\n', '\\n')
+                    if isinstance(val, intermediator.StrConst):
+                        processed_content = val.value.replace('\\\\n', '\\n')
                         encoded_bytes = processed_content.encode("utf-8")
                         actual_length = len(encoded_bytes)
 
@@ -231,22 +205,17 @@ class CodeGenerator:
                             self.assembly_code_parts["data"].append(f'  {label_name} db {byte_values},0')
                             self.defined_data_labels.add(label_name)
 
-                        self._add_asm(f"  mov eax, 4          ; syscall: sys_write")
-                        self._add_asm(f"  mov ebx, 1          ; fd: stdout")
-                        self._add_asm(f"  mov ecx, {label_name}   ; message address")
-                        self._add_asm(f"  mov edx, {actual_length}  ; message length")
-                        self._add_asm(f"  int 0x80            ; Call kernel")
+                        add(f"  mov eax, 4          ; syscall: sys_write")
+                        add(f"  mov ebx, 1          ; fd: stdout")
+                        add(f"  mov ecx, {label_name}   ; message address")
+                        add(f"  mov edx, {actual_length}  ; message length")
+                        add(f"  int 0x80            ; Call kernel")
                     else:
-                        val_or_loc = self._get_var_location_or_value(val)
-                        if val_or_loc.startswith("[ebp-") or val_or_loc.startswith("[ebp+"):
-                            self._add_asm(f"  mov eax, {val_or_loc}")
-                        else:
-                            self._add_asm(f"  mov eax, {val_or_loc}")
-                        self._add_asm("  call print_integer")
-                        self._add_asm("  call print_newline")
+                        add(f"  mov eax, {location(val)}")
+                        add("  call print_integer")
+                        add("  call print_newline")
 
-            processed_functions.add(func_name)
-            if func_name != "main" and not any(isinstance(ir, intermediator.ReturnInstr) for ir in func_irs):
+            if func_name != "main" and not any(type(ir) is intermediator.ReturnInstr for ir in func_irs):
                 self._add_asm("  mov esp, ebp")
                 self._add_asm("  pop ebp")
                 self._add_asm("  ret")
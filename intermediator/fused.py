@@ -0,0 +1,196 @@
+# Fused semantic analysis and IR generation
+
+from intermediator.intermediator import (IRGenerator, AssignInstr, BinaryOpInstr, JumpInstr,
+                                         ConditionalJumpInstr, LabelInstr, PrintInstr, ReturnInstr,
+                                         FunctionCallInstr, FuncLabel, IntConst)
+from lexer.symbols import SymbolInterner
+from parser.parser import BlockNode, IdentifierNode, LiteralNode, ProgramNode
+from semanter.semanter import SemanticAnalyzer, SemanticError, SymbolTable
+
+class FusedIRGenerator(IRGenerator):
+    """Type-checks a program and generates its IR in a single walk.
+
+    generate() raises the same SemanticErrors, in the same order, as
+    SemanticAnalyzer.analyze() and otherwise returns the same IR as
+    IRGenerator.generate(), visiting every node once instead of twice. Each
+    visit method does the analyzer's checks and then emits the generator's
+    instructions; expression visitors return (type, operand) pairs.
+
+    Nodes get the same symbol and frame slot annotations as from the
+    analyzer, and variables are IR operands through the Vars of their Symbols.
+    """
+
+    def __init__(self, symbols: SymbolInterner | None = None):
+        super().__init__()
+        # Identifier ids for the symbol table, usually the lexer's
+        self.symbols = symbols if symbols is not None else SymbolInterner()
+
+    def generate(self, node):
+        if not isinstance(node, ProgramNode):
+            raise SemanticError("AST root must be a ProgramNode.")
+        self.symbol_table = SymbolTable(self.symbols)
+        self.current_function_return_type = None
+        self.local_symbols = None
+        return super().generate(node)
+
+    # Nodes without a visitor fail like they do in the analyzer, which runs first
+    generic_visit = SemanticAnalyzer.generic_visit
+
+    def visit_ProgramNode(self, node):
+        # Functions are in the global scope
+        for func_node in node.functions:
+            if self.symbol_table.lookup(func_node.name) and self.symbol_table.lookup(func_node.name).scope_level == 0:
+                raise SemanticError(f"Function '{func_node.name}' already declared.")
+            self.symbol_table.declare(func_node.name, func_node.type_name)
+
+        for func_node in node.functions:
+            yield func_node
+
+    def visit_FunctionNode(self, node):
+        func_symbol = self.symbol_table.lookup(node.name)
+        if not func_symbol or func_symbol.type != node.type_name:
+            raise SemanticError(f"Function '{node.name}' signature mismatch or not pre-declared.")
+
+        self.current_function_return_type = node.type_name
+        self.symbol_table.enter_scope()
+        node.local_symbols = self.local_symbols = []
+        self._function_temps = []
+        self._vars = {}
+        self._add_instruction(LabelInstr(FuncLabel(node.name)))
+
+        if node.block:
+            if not isinstance(node.block, BlockNode):
+                 raise SemanticError(f"Expected BlockNode for function '{node.name}' body, got {type(node.block)}.")
+            for stmt in node.block.statements:
+                yield stmt
+
+        expected_return_type = self.current_function_return_type
+
+        if node.return_expression is None:
+            raise SemanticError(f"Non-void function '{node.name}' must return a value of type '{expected_return_type}'.")
+
+        return_expr_type, return_val_or_temp = yield node.return_expression
+        if return_expr_type != expected_return_type:
+            raise SemanticError(f"Return type mismatch in function '{node.name}'. Expected '{expected_return_type}' but got '{return_expr_type}'.")
+        self._add_instruction(ReturnInstr(return_val_or_temp))
+        self.frames[node.name] = self._frame(node.local_symbols)
+
+        self.symbol_table.exit_scope()
+        self.current_function_return_type = None
+
+    def visit_BlockNode(self, node):
+        self.symbol_table.enter_scope()
+        for stmt in node.statements:
+            yield stmt
+        self.symbol_table.exit_scope()
+
+    def visit_DeclarationNode(self, node):
+        if node.type_name != 'int':
+            raise SemanticError(f"Unsupported type '{node.type_name}'. Only 'int' is supported.")
+
+        symbol = node.symbol = self.symbol_table.declare(node.name, node.type_name)
+        symbol.slot = len(self.local_symbols)
+        self.local_symbols.append(symbol)
+
+        if node.expression:
+            expr_type, expr_val_or_temp = yield node.expression
+            if expr_type != node.type_name:
+                raise SemanticError(f"Type mismatch in declaration of '{node.name}'. Expected '{node.type_name}' but got '{expr_type}'.")
+            self._add_instruction(AssignInstr(self._variable(symbol, node.name), expr_val_or_temp))
+
+    def visit_AssignmentNode(self, node):
+        var_symbol = self.symbol_table.lookup(node.identifier_name)
+        if not var_symbol:
+            raise SemanticError(f"Identifier '{node.identifier_name}' not declared.")
+        node.symbol = var_symbol
+
+        if var_symbol.type != 'int':
+             raise SemanticError(f"Assignment to non-int variable '{node.identifier_name}' of type '{var_symbol.type}' is not supported or type error.")
+
+        expr_type, expr_val_or_temp = yield node.expression
+        if expr_type != var_symbol.type:
+            raise SemanticError(f"Type mismatch in assignment to '{node.identifier_name}'. Expected '{var_symbol.type}' but got '{expr_type}'.")
+        self._add_instruction(AssignInstr(self._variable(var_symbol, node.identifier_name), expr_val_or_temp))
+
+    def visit_ConditionalNode(self, node):
+        condition_type, condition_val_or_temp = yield node.condition
+        # Non-zero integer is true and zero is false
+        if condition_type != 'int':
+            raise SemanticError(f"Condition for 'if' statement must be an 'int', got '{condition_type}'.")
+
+        else_label = self._new_label()
+        end_if_label = self._new_label()
+
+        target_label_on_false = else_label if node.else_block else end_if_label
+        self._add_instruction(ConditionalJumpInstr(condition_val_or_temp, target_label_on_false, jump_if_false=True))
+
+        yield node.if_block
+
+        if node.else_block:
+            self._add_instruction(JumpInstr(end_if_label))
+            self._add_instruction(LabelInstr(else_label))
+            yield node.else_block
+
+        self._add_instruction(LabelInstr(end_if_label))
+
+    def visit_WhileNode(self, node):
+        loop_start_label = self._new_label()
+        loop_end_label = self._new_label()
+
+        self._add_instruction(LabelInstr(loop_start_label))
+        condition_type, condition_val_or_temp = yield node.condition
+        if condition_type != 'int':
+            raise SemanticError(f"Condition for 'while' statement must be an 'int', got '{condition_type}'.")
+
+        self._add_instruction(ConditionalJumpInstr(condition_val_or_temp, loop_end_label, jump_if_false=True))
+
+        yield node.block
+        self._add_instruction(JumpInstr(loop_start_label))
+        self._add_instruction(LabelInstr(loop_end_label))
+
+    def visit_PrintNode(self, node):
+        expr_type, value_to_print = yield node.expression
+
+        if isinstance(node.expression, LiteralNode):
+            pass
+        elif isinstance(node.expression, IdentifierNode):
+            if expr_type != 'int':
+                raise SemanticError(f"Identifier '{node.expression.name}' in print statement must be an 'int', got '{expr_type}'.")
+        else:
+            raise SemanticError(f"Unexpected expression type in print statement: {type(node.expression)}.")
+        self._add_instruction(PrintInstr(value_to_print))
+
+    def visit_FunctionCallNode(self, node):
+        func_symbol = self.symbol_table.lookup(node.name)
+        if not func_symbol:
+            raise SemanticError(f"Function '{node.name}' not declared.")
+        self._add_instruction(FunctionCallInstr(FuncLabel(node.name)))
+        return func_symbol.type, None
+
+    def visit_IdentifierNode(self, node):
+        symbol = self.symbol_table.lookup(node.name)
+        if not symbol:
+            raise SemanticError(f"Identifier '{node.name}' not declared.")
+        node.symbol = symbol
+        return symbol.type, self._variable(symbol, node.name)
+
+    def visit_ConstantNode(self, node):
+        try:
+            value = int(node.value)
+        except ValueError:
+            raise SemanticError(f"Invalid integer constant: '{node.value}'.")
+        return 'int', IntConst(value)
+
+    def visit_LiteralNode(self, node):
+        return 'string_literal', super().visit_LiteralNode(node)
+
+    def visit_BinaryOpNode(self, node):
+        left_type, left_operand = yield node.left
+        right_type, right_operand = yield node.right
+
+        if left_type != 'int' or right_type != 'int':
+            raise SemanticError(f"Operands for binary operator '{node.operator}' must be 'int'. Got '{left_type}' and '{right_type}'.")
+
+        result_temp = self._new_temp()
+        self._add_instruction(BinaryOpInstr(result_temp, left_operand, node.operator, right_operand))
+        return 'int', result_temp
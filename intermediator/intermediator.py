@@ -1,16 +1,69 @@
+from parser.visitor import NodeVisitor
+
+# --- IR Operand Classes ---
+# Each operand says what it is, so the code generator never has to guess
+# from its text. An operand prints as it appears in the IR.
+class Operand:
+    """Base class for the values IR instructions read and write."""
+    __slots__ = ()
+
+class Temp(Operand):
+    """A temporary holding an intermediate result. Each one is a distinct object."""
+    __slots__ = ('name',)
+    def __init__(self, name):
+        self.name = name
+    def __str__(self):
+        return self.name
+
+class Var(Operand):
+    """A variable. IRGenerator makes one Var per variable, so they compare by identity."""
+    __slots__ = ('name', 'symbol')
+    def __init__(self, name, symbol=None):
+        self.name = name
+        self.symbol = symbol # Its semanter Symbol, for an analyzed AST
+    def __str__(self):
+        return self.name
+
+class IntConst(Operand):
+    __slots__ = ('value',)
+    def __init__(self, value):
+        self.value = value # int
+    def __str__(self):
+        return str(self.value)
+
+class StrConst(Operand):
+    __slots__ = ('value',)
+    def __init__(self, value):
+        self.value = value # str, with its escapes decoded
+    def __str__(self):
+        return f'"{self.value}"'
+
+# Labels are strings, so they compare equal to, and key dictionaries like,
+# the names they hold
+class Label(str):
+    """A jump target inside a function."""
+    __slots__ = ()
+
+class FuncLabel(str):
+    """The entry of a function."""
+    __slots__ = ()
+
 # --- IR Node Classes ---
 class IRInstruction:
     """Base class for all IR instructions."""
+    __slots__ = ()
     def __str__(self):
         raise NotImplementedError
 
 class LabelInstr(IRInstruction):
+    __slots__ = ('name',)
     def __init__(self, name):
-        self.name = name
+        self.name = name # Label or FuncLabel
     def __str__(self):
         return f"{self.name}:"
 
 class AssignInstr(IRInstruction):
+    __slots__ = ('target', 'source')
     def __init__(self, target, source):
         self.target = target
         self.source = source
@@ -18,6 +71,7 @@ class AssignInstr(IRInstruction):
         return f"  {self.target} = {self.source}"
 
 class BinaryOpInstr(IRInstruction):
+    __slots__ = ('target', 'left', 'operator', 'right')
     def __init__(self, target, left, operator, right):
         self.target = target
         self.left = left
@@ -27,51 +81,72 @@ class BinaryOpInstr(IRInstruction):
         return f"  {self.target} = {self.left} {self.operator} {self.right}"
 
 class JumpInstr(IRInstruction):
+    __slots__ = ('label_name',)
     def __init__(self, label_name):
-        self.label_name = label_name
+        self.label_name = label_name # Label
     def __str__(self):
         return f"  goto {self.label_name}"
 
 class ConditionalJumpInstr(IRInstruction):
+    __slots__ = ('condition_var', 'label_name', 'jump_if_false')
     def __init__(self, condition_var, label_name, jump_if_false=True):
         self.condition_var = condition_var
-        self.label_name = label_name
+        self.label_name = label_name # Label
         self.jump_if_false = jump_if_false
     def __str__(self):
         return f"  if_false {self.condition_var} goto {self.label_name}"
 
 class ReturnInstr(IRInstruction):
+    __slots__ = ('value',)
     def __init__(self, value):
         self.value = value
     def __str__(self):
         return f"  return {self.value}"
 
 class FunctionCallInstr(IRInstruction):
+    __slots__ = ('function_name',)
     def __init__(self,function_name):
-        self.function_name = function_name
+        self.function_name = function_name # FuncLabel
     def __str__(self):
         return f"  call {self.function_name}"
 
 class PrintInstr(IRInstruction):
+    __slots__ = ('value',)
     def __init__(self, value):
         self.value = value
     def __str__(self):
         return f"  print {self.value}"
 
 # --- IR Generator Class ---
-class IRGenerator:
+class IRGenerator(NodeVisitor):
     def __init__(self):
         self.ir_code = []
         self.label_count = 0
         self.temp_var_count = 0
+        # Function name -> operands of its stack frame in slot order, for
+        # functions of an analyzed AST: the Vars of its variables (see
+        # SemanticAnalyzer), then its Temps
+        self.frames = {}
+        self._function_temps = []
+        self._vars = {} # Symbol, or name for an AST not analyzed, -> its Var
 
     def _new_label(self):
         self.label_count += 1
-        return f"L{self.label_count}"
+        return Label(f"L{self.label_count}")
 
     def _new_temp(self):
         self.temp_var_count += 1
-        return f"t{self.temp_var_count}"
+        temp = Temp(f"t{self.temp_var_count}")
+        self._function_temps.append(temp)
+        return temp
+
+    def _variable(self, symbol, name):
+        """The operand of a name: the Var of its Symbol once analyzed, else of its name."""
+        key = symbol if symbol is not None else name
+        var = self._vars.get(key)
+        if var is None:
+            var = self._vars[key] = Var(name, symbol)
+        return var
 
     def _add_instruction(self, instr):
         self.ir_code.append(instr)
@@ -86,46 +161,57 @@ class IRGenerator:
         self.ir_code = []
         self.label_count = 0
         self.temp_var_count = 0
+        self.frames = {}
+        self._vars = {}
         self._visit(node)
         return self.ir_code
 
     def _visit(self, node):
-        """Helper method to dispatch to the correct visitor based on node type."""
-        method_name = 'visit_' + node.__class__.__name__
-        visitor = getattr(self, method_name, self._generic_visit)
-        return visitor(node)
+        """Visit node and return the operand holding its value, if any.
 
-    def _generic_visit(self, node):
+        Visitors of nodes with children are generators that yield each child
+        and get its operand back, so deep trees do not recurse.
+        """
+        return self.visit(node)
+
+    def generic_visit(self, node):
         self._print_ir()  # Print current IR for debugging
         raise Exception(f"No IRGenerator visitor method found for AST node type: {node.__class__.__name__}")
 
     def visit_ProgramNode(self, node):
         for func_node in node.functions:
-            self._visit(func_node)
+            yield func_node
 
     def visit_FunctionNode(self, node):
-        self._add_instruction(LabelInstr(node.name))
+        self._function_temps = []
+        self._vars = {} # Unanalyzed names are local to their function
+        self._add_instruction(LabelInstr(FuncLabel(node.name)))
 
-        self._visit(node.block)
+        yield node.block
 
-        return_val_or_temp = self._visit(node.return_expression)
+        return_val_or_temp = yield node.return_expression
         self._add_instruction(ReturnInstr(return_val_or_temp))
+        if node.local_symbols is not None:
+            self.frames[node.name] = self._frame(node.local_symbols)
+
+    def _frame(self, local_symbols):
+        return [self._variable(symbol, symbol.name) for symbol in local_symbols] + self._function_temps
 
     def visit_BlockNode(self, node):
         for stmt_node in node.statements:
-            self._visit(stmt_node)
+            yield stmt_node
 
     def visit_DeclarationNode(self, node):
         if node.expression:
-            expr_val_or_temp = self._visit(node.expression)
-            self._add_instruction(AssignInstr(node.name, expr_val_or_temp))
+            expr_val_or_temp = yield node.expression
+            self._add_instruction(AssignInstr(self._variable(node.symbol, node.name), expr_val_or_temp))
 
     def visit_AssignmentNode(self, node):
-        expr_val_or_temp = self._visit(node.expression)
-        self._add_instruction(AssignInstr(node.identifier_name, expr_val_or_temp))
+        expr_val_or_temp = yield node.expression
+        self._add_instruction(AssignInstr(self._variable(node.symbol, node.identifier_name), expr_val_or_temp))
 
     def visit_ConditionalNode(self, node):
-        condition_val_or_temp = self._visit(node.condition)
+        condition_val_or_temp = yield node.condition
 
         else_label = self._new_label()
         end_if_label = self._new_label()
@@ -135,12 +221,12 @@ class IRGenerator:
         self._add_instruction(ConditionalJumpInstr(condition_val_or_temp, target_label_on_false, jump_if_false=True))
 
         # If block (executes if condition was true)
-        self._visit(node.if_block)
+        yield node.if_block
 
         if node.else_block:
             self._add_instruction(JumpInstr(end_if_label))
             self._add_instruction(LabelInstr(else_label))
-            self._visit(node.else_block)
+            yield node.else_block
         else:
             if not node.else_block:
                  pass
@@ -152,29 +238,29 @@ class IRGenerator:
         loop_end_label = self._new_label()
 
         self._add_instruction(LabelInstr(loop_start_label))
-        condition_val_or_temp = self._visit(node.condition)
+        condition_val_or_temp = yield node.condition
 
         # If condition_val_or_temp is 0 (false), jump out of the loop to loop_end_label
         self._add_instruction(ConditionalJumpInstr(condition_val_or_temp, loop_end_label, jump_if_false=True))
 
         # Loop body (executes if condition was true)
-        self._visit(node.block)
+        yield node.block
         self._add_instruction(JumpInstr(loop_start_label))
         self._add_instruction(LabelInstr(loop_end_label))
 
     def visit_PrintNode(self, node):
-        value_to_print = self._visit(node.expression)
+        value_to_print = yield node.expression
         self._add_instruction(PrintInstr(value_to_print))
 
     def visit_FunctionCallNode(self, node):
-        function_name_to_call = node.name
+        function_name_to_call = FuncLabel(node.name)
         self._add_instruction(FunctionCallInstr(function_name_to_call))
 
     def visit_IdentifierNode(self, node):
-        return node.name
+        return self._variable(node.symbol, node.name)
 
     def visit_ConstantNode(self, node):
-        return node.value
+        return IntConst(int(node.value))
 
     def visit_LiteralNode(self, node):
         if isinstance(node.value, str):
@@ -185,11 +271,11 @@ class IRGenerator:
                 processed_value = node.value
         else:
             processed_value = str(node.value)
-        return f'"{processed_value}"'
+        return StrConst(processed_value)
 
     def visit_BinaryOpNode(self, node):
-        left_operand = self._visit(node.left)
-        right_operand = self._visit(node.right)
+        left_operand = yield node.left
+        right_operand = yield node.right
 
         result_temp = self._new_temp()
         self._add_instruction(BinaryOpInstr(result_temp, left_operand, node.operator, right_operand))
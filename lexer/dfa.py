@@ -0,0 +1,177 @@
+# Table-driven DFA scanner
+#
+# An alternative to the regex engine in lexer.lexer that produces exactly the
+# same tokens. Characters are first mapped to character classes in one
+# str.translate call, then a DFA over those classes finds the longest match at
+# each position (backing up to the last accepting state, which is what turns an
+# unterminated quote into an 'unknown' token). Identifiers are recognized once
+# and classified as keywords with a set lookup.
+
+from lexer.tokens import KIND_CODES, TokenStream
+
+# --- Character classes ---
+C_LETTER = 0 # [a-zA-Z_]
+C_DIGIT = 1 # [0-9]
+C_MINUS = 2 # -
+C_PLUS_STAR = 3 # + *
+C_SLASH = 4 # /
+C_EQUALS = 5 # =
+C_BANG = 6 # !
+C_LESS_GREATER = 7 # < >
+C_AMPERSAND = 8 # &
+C_PIPE = 9 # |
+C_PUNCTUATION = 10 # ; { } , ( )
+C_DOUBLE_QUOTE = 11 # "
+C_SINGLE_QUOTE = 12 # '
+C_NEWLINE = 13 # \n
+C_SPACE = 14 # Any other whitespace
+C_WORD_OTHER = 15 # Non-ASCII letters and digits (only matter for keyword boundaries)
+C_OTHER = 16 # Anything else
+CLASS_COUNT = 17
+
+_SYMBOL_CLASSES = {
+    '-': C_MINUS, '+': C_PLUS_STAR, '*': C_PLUS_STAR, '/': C_SLASH, '=': C_EQUALS,
+    '!': C_BANG, '<': C_LESS_GREATER, '>': C_LESS_GREATER, '&': C_AMPERSAND, '|': C_PIPE,
+    ';': C_PUNCTUATION, '{': C_PUNCTUATION, '}': C_PUNCTUATION, ',': C_PUNCTUATION,
+    '(': C_PUNCTUATION, ')': C_PUNCTUATION, '"': C_DOUBLE_QUOTE, "'": C_SINGLE_QUOTE,
+    '\n': C_NEWLINE
+}
+
+def _class_of(ch: str) -> int:
+    if ch == '_' or ('a' <= ch <= 'z') or ('A' <= ch <= 'Z'):
+        return C_LETTER
+    if '0' <= ch <= '9':
+        return C_DIGIT
+    if ch in _SYMBOL_CLASSES:
+        return _SYMBOL_CLASSES[ch]
+    # Same definitions of whitespace and word characters as the re module
+    if ch.isspace():
+        return C_SPACE
+    if ch.isalnum():
+        return C_WORD_OTHER
+    return C_OTHER
+
+class _ClassTable(dict):
+    """str.translate table mapping every code point to its character class."""
+    def __missing__(self, code_point: int) -> int:
+        cls = self[code_point] = _class_of(chr(code_point))
+        return cls
+
+_CLASS_TABLE = _ClassTable((code_point, _class_of(chr(code_point))) for code_point in range(128))
+
+# --- States ---
+(S_START, S_IDENTIFIER, S_NUMBER, S_MINUS, S_OPERATOR, S_SLASH, S_COMMENT, S_EQUALS_LIKE,
+ S_BANG, S_AMPERSAND, S_PIPE, S_PUNCTUATION, S_DOUBLE_OPEN, S_DOUBLE_BODY, S_SINGLE_OPEN,
+ S_SINGLE_BODY, S_LITERAL, S_SPACE, S_OTHER) = range(19)
+STATE_COUNT = 19
+DEAD = -1
+
+# What each state accepts: a token kind code, SKIP for comments and
+# whitespace, or NOT_ACCEPTING
+SKIP = -1
+NOT_ACCEPTING = -2
+_UNKNOWN = KIND_CODES['unknown']
+ACCEPT = [NOT_ACCEPTING] * STATE_COUNT
+ACCEPT[S_IDENTIFIER] = KIND_CODES['identifier']
+ACCEPT[S_NUMBER] = KIND_CODES['constant']
+ACCEPT[S_MINUS] = KIND_CODES['operator']
+ACCEPT[S_OPERATOR] = KIND_CODES['operator']
+ACCEPT[S_SLASH] = KIND_CODES['operator']
+ACCEPT[S_COMMENT] = SKIP
+ACCEPT[S_EQUALS_LIKE] = KIND_CODES['operator']
+ACCEPT[S_BANG] = _UNKNOWN
+ACCEPT[S_AMPERSAND] = _UNKNOWN
+ACCEPT[S_PIPE] = _UNKNOWN
+ACCEPT[S_PUNCTUATION] = KIND_CODES['punctuation']
+ACCEPT[S_DOUBLE_OPEN] = _UNKNOWN
+ACCEPT[S_SINGLE_OPEN] = _UNKNOWN
+ACCEPT[S_LITERAL] = KIND_CODES['literal']
+ACCEPT[S_SPACE] = SKIP
+ACCEPT[S_OTHER] = _UNKNOWN
+
+def _build_transitions() -> list[int]:
+    """Flat transition table indexed by state * CLASS_COUNT + class."""
+    table = [DEAD] * (STATE_COUNT * CLASS_COUNT)
+
+    def on(state, classes, target):
+        for cls in classes:
+            table[state * CLASS_COUNT + cls] = target
+
+    every_class = range(CLASS_COUNT)
+    on(S_START, [C_LETTER], S_IDENTIFIER)
+    on(S_START, [C_DIGIT], S_NUMBER)
+    on(S_START, [C_MINUS], S_MINUS)
+    on(S_START, [C_PLUS_STAR], S_OPERATOR)
+    on(S_START, [C_SLASH], S_SLASH)
+    on(S_START, [C_EQUALS, C_LESS_GREATER], S_EQUALS_LIKE)
+    on(S_START, [C_BANG], S_BANG)
+    on(S_START, [C_AMPERSAND], S_AMPERSAND)
+    on(S_START, [C_PIPE], S_PIPE)
+    on(S_START, [C_PUNCTUATION], S_PUNCTUATION)
+    on(S_START, [C_DOUBLE_QUOTE], S_DOUBLE_OPEN)
+    on(S_START, [C_SINGLE_QUOTE], S_SINGLE_OPEN)
+    on(S_START, [C_NEWLINE, C_SPACE], S_SPACE)
+    on(S_START, [C_WORD_OTHER, C_OTHER], S_OTHER)
+
+    on(S_IDENTIFIER, [C_LETTER, C_DIGIT], S_IDENTIFIER)
+    on(S_NUMBER, [C_DIGIT], S_NUMBER)
+    on(S_MINUS, [C_DIGIT], S_NUMBER)
+    on(S_SLASH, [C_SLASH], S_COMMENT)
+    on(S_COMMENT, [cls for cls in every_class if cls != C_NEWLINE], S_COMMENT)
+    on(S_EQUALS_LIKE, [C_EQUALS], S_OPERATOR) # == <= >=
+    on(S_BANG, [C_EQUALS], S_OPERATOR) # !=
+    on(S_AMPERSAND, [C_AMPERSAND], S_OPERATOR) # &&
+    on(S_PIPE, [C_PIPE], S_OPERATOR) # ||
+    on(S_SPACE, [C_NEWLINE, C_SPACE], S_SPACE)
+
+    for open_state, body_state, quote in ((S_DOUBLE_OPEN, S_DOUBLE_BODY, C_DOUBLE_QUOTE),
+                                          (S_SINGLE_OPEN, S_SINGLE_BODY, C_SINGLE_QUOTE)):
+        for state in (open_state, body_state):
+            on(state, [cls for cls in every_class if cls != quote], body_state)
+            on(state, [quote], S_LITERAL)
+    return table
+
+TRANSITIONS = _build_transitions()
+
+KEYWORDS = frozenset(('if', 'else', 'print', 'int', 'return', 'while'))
+_MAX_KEYWORD_LENGTH = max(len(keyword) for keyword in KEYWORDS)
+_IDENTIFIER = KIND_CODES['identifier']
+_KEYWORD = KIND_CODES['keyword']
+
+def scan(source: str) -> TokenStream:
+    """Tokenize source into a TokenStream using the DFA."""
+    stream = TokenStream(source)
+    kinds, starts, ends = stream.kinds, stream.starts, stream.ends
+    classes = source.translate(_CLASS_TABLE).encode('ascii')
+    transitions, accept = TRANSITIONS, ACCEPT
+    length = len(source)
+    pos = 0
+
+    while pos < length:
+        # Run the DFA as far as it goes, remembering the last accepting state
+        state = S_START
+        kind = NOT_ACCEPTING
+        end = i = pos
+        while i < length:
+            state = transitions[state * CLASS_COUNT + classes[i]]
+            if state == DEAD:
+                break
+            i += 1
+            if accept[state] != NOT_ACCEPTING:
+                kind = accept[state]
+                end = i
+
+        if kind != SKIP:
+            if (kind == _IDENTIFIER and end - pos <= _MAX_KEYWORD_LENGTH
+                    and source[pos:end] in KEYWORDS
+                    # The regex engine wraps keywords in \b, so a keyword right
+                    # after a digit or next to a non-ASCII letter stays an identifier
+                    and not (pos and classes[pos - 1] in (C_DIGIT, C_WORD_OTHER))
+                    and not (end < length and classes[end] == C_WORD_OTHER)):
+                kind = _KEYWORD
+            kinds.append(kind)
+            starts.append(pos)
+            ends.append(end)
+        pos = end
+
+    return stream
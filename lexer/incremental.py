@@ -0,0 +1,119 @@
+# Incremental re-lexing
+
+from array import array
+from bisect import bisect_left
+
+from lexer.lexer import TOKEN_REGEX, _GROUP_KIND_CODES
+from lexer.tokens import KIND_CODES, TokenStream
+
+_UNKNOWN_CODE = KIND_CODES['unknown']
+
+class TokenDiff:
+    """Token indexes touched by an edit: old[start:old_stop] became new[start:new_stop]."""
+    __slots__ = ('start', 'old_stop', 'new_stop')
+
+    def __init__(self, start: int, old_stop: int, new_stop: int) -> None:
+        self.start = start
+        self.old_stop = old_stop
+        self.new_stop = new_stop
+
+    @property
+    def changed(self) -> range:
+        """Indexes of the rescanned tokens in the new stream."""
+        return range(self.start, self.new_stop)
+
+    @property
+    def delta(self) -> int:
+        """How much the indexes of the tokens after the edit moved."""
+        return self.new_stop - self.old_stop
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, TokenDiff):
+            return NotImplemented
+        return (self.start, self.old_stop, self.new_stop) == (other.start, other.old_stop, other.new_stop)
+
+    def __repr__(self) -> str:
+        return f"TokenDiff(start={self.start}, old_stop={self.old_stop}, new_stop={self.new_stop})"
+
+def _restart_point(stream: TokenStream, offset: int) -> tuple[int, int]:
+    """Token index and source offset where rescanning begins for an edit at offset."""
+    starts = stream.starts
+    # The last token starting before the edit may grow into the edited text,
+    # and a comment or whitespace run before it is rescanned along with it
+    before = bisect_left(starts, offset)
+    if before == 0:
+        # Nothing but whitespace and comments before the edit
+        return 0, 0
+    index = before - 1
+
+    # A lone quote only lexes as 'unknown' because no matching quote follows it
+    # anywhere in the file, so an edit after it can turn it into a literal.
+    # Such a quote is always the last one of its kind in the source.
+    source = stream.source
+    for quote in '"\'':
+        quote_offset = source.rfind(quote)
+        if quote_offset < 0 or quote_offset >= starts[index]:
+            continue
+        quote_index = bisect_left(starts, quote_offset)
+        if starts[quote_index] == quote_offset and stream.kinds[quote_index] == _UNKNOWN_CODE:
+            index = min(index, quote_index)
+    return index, starts[index]
+
+def relex(stream: TokenStream, offset: int, removed: int, inserted: str) -> tuple[TokenStream, TokenDiff]:
+    """Apply an edit to the source of stream and re-lex only what it affects.
+
+    The edit replaces removed characters at offset with inserted. Scanning
+    restarts at the last token before the edit and stops as soon as a new
+    token starts where an old one started in the unchanged text after the
+    edit, since from there on both scans see the same characters. Returns the
+    spliced stream and the TokenDiff of the rescanned token indexes.
+
+    Only the rescan depends on the edit; moving the offsets of the tokens
+    after it is one pass over the arrays without any regex work.
+    """
+    source = stream.source
+    if offset < 0 or removed < 0 or offset + removed > len(source):
+        raise ValueError(f"Edit at {offset} removing {removed} characters is outside the source.")
+
+    new_source = source[:offset] + inserted + source[offset + removed:]
+    delta = len(inserted) - removed
+    edit_end = offset + len(inserted) # End of the edit in the new source
+
+    starts = stream.starts
+    start_index, scan_from = _restart_point(stream, offset)
+
+    kinds, new_starts, new_ends = array('B'), array('I'), array('I')
+    stop_index = len(starts)
+    group_kind_codes = _GROUP_KIND_CODES
+
+    for mo in TOKEN_REGEX.finditer(new_source, scan_from):
+        kind_code = group_kind_codes[mo.lastgroup]
+        if kind_code < 0:
+            continue
+        token_start = mo.start()
+        # Past the edit (with one character of context for the keyword \b),
+        # a token starting where an old token started means the rest matches
+        if token_start > edit_end:
+            old_index = bisect_left(starts, token_start - delta, start_index)
+            if old_index < len(starts) and starts[old_index] == token_start - delta:
+                stop_index = old_index
+                break
+        kinds.append(kind_code)
+        new_starts.append(token_start)
+        new_ends.append(mo.end())
+
+    if delta:
+        # The tokens after the edit keep their kinds but move in the source
+        shifted_starts = array('I', map(delta.__add__, starts[stop_index:]))
+        shifted_ends = array('I', map(delta.__add__, stream.ends[stop_index:]))
+    else:
+        shifted_starts = starts[stop_index:]
+        shifted_ends = stream.ends[stop_index:]
+
+    new_stream = TokenStream(
+        new_source,
+        stream.kinds[:start_index] + kinds + stream.kinds[stop_index:],
+        starts[:start_index] + new_starts + shifted_starts,
+        stream.ends[:start_index] + new_ends + shifted_ends
+    )
+    return new_stream, TokenDiff(start_index, stop_index, start_index + len(kinds))
@@ -44,53 +44,292 @@
 # 1: ".*"
 # 2: '.*'
 
+import codecs
+import mmap
 import re
+from collections import deque
+from collections.abc import Iterable, Iterator
+
+from lexer import dfa
+from lexer.symbols import SymbolInterner
+from lexer.tokens import IDENTIFIER_CODE, KIND_CODES, TokenStream
+
+TOKEN_SPECIFICATION = [
+    ('COMMENT',      r'//[^\n]*'), # Comments
+    ('LITERAL',      r'"[^"]*"|\'[^\']*\''), # String literals (e.g., "abc", 'xyz')
+    ('KEYWORD',      r'\b(if|else|print|int|return|while)\b'), # Keywords
+    ('IDENTIFIER',   r'[a-zA-Z_][a-zA-Z0-9_]*'), # Identifiers (e.g., var_name, myFunction)
+    ('CONSTANT',     r'-?[0-9]+'), # Integer constants (e.g., 123, 0, -5)
+    ('OPERATOR',     r'==|!=|<=|>=|&&|\|\||[-+*/=<>]'), # Operators
+    ('PUNCTUATION',  r'[;{},()]'), # Punctuation
+    ('WHITESPACE',   r'\s+'), # Whitespace
+    ('MISMATCH',     r'.') # Any other character (error token)
+]
+# Combine all regex patterns into one, using named capture groups
+TOKEN_REGEX = re.compile('|'.join('(?P<%s>%s)' % pair for pair in TOKEN_SPECIFICATION))
+
+# The same tokens over bytes, for memory-mapped files. A bytes pattern's \s
+# only knows ASCII whitespace, so the control characters that str.isspace()
+# also accepts are listed explicitly. Every other pattern is ASCII already.
+BYTES_TOKEN_REGEX = re.compile('|'.join(
+    '(?P<%s>%s)' % (name, r'[ \t\n\r\f\v\x1c-\x1f]+' if name == 'WHITESPACE' else pattern)
+    for name, pattern in TOKEN_SPECIFICATION
+).encode('ascii'))
+
+# Sources that tokenize_stream() scans as bytes
+BUFFER_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+
+# Only comments and literals. Every other token is free of '/', '"' and "'",
+# apart from the single '/' operator, so searching with this finds exactly the
+# comments and literals that a full scan finds, without producing the tokens
+COMMENT_OR_LITERAL_REGEX = re.compile(r'//[^\n]*|"[^"]*"|\'[^\']*\'')
+
+# Kind code for each regex group; comments and whitespace produce no token
+_GROUP_KIND_CODES = {name: KIND_CODES.get(name.lower(), -1) for name, _ in TOKEN_SPECIFICATION}
+_GROUP_KIND_CODES['MISMATCH'] = KIND_CODES['unknown']
+
+# Characters read per chunk when tokenizing a file object or mmap
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Scanning engines: the combined regex above, the table-driven DFA in lexer.dfa,
+# or the NumPy-vectorized scanner in lexer.vectorized (needs NumPy)
+ENGINES = ('regex', 'dfa', 'numpy')
+
 class Lexer:
-    def __init__(self, source_code: str) -> None:
+    def __init__(self, source_code, engine: str = 'regex', symbols: SymbolInterner | None = None) -> None:
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown lexer engine '{engine}'. Expected one of {', '.join(ENGINES)}.")
+        # Either the whole source as a str, or a readable file object / mmap
         self.source_code = source_code
-        self.tokens_list: list[tuple[str, str]] | None = None
+        self.engine = engine
+        # Interner that gets every identifier; token values are then its shared strings
+        self.symbols = symbols
+        self.tokens_list: list[tuple[str, str]] | TokenStream | None = None
 
     def tokenize(self) -> list[tuple[str, str]]:
-        token_specification = [
-            ('COMMENT',      r'//[^\n]*'), # Comments
-            ('LITERAL',      r'"[^"]*"|\'[^\']*\''), # String literals (e.g., "abc", 'xyz')
-            ('KEYWORD',      r'\b(if|else|print|int|return|while)\b'), # Keywords
-            ('IDENTIFIER',   r'[a-zA-Z_][a-zA-Z0-9_]*'), # Identifiers (e.g., var_name, myFunction)
-            ('CONSTANT',     r'-?[0-9]+'), # Integer constants (e.g., 123, 0, -5)
-            ('OPERATOR',     r'==|!=|<=|>=|&&|\|\||[-+*/=<>]'), # Operators
-            ('PUNCTUATION',  r'[;{},()]'), # Punctuation
-            ('WHITESPACE',   r'\s+'), # Whitespace
-            ('MISMATCH',     r'.') # Any other character (error token)
-        ]
-        # Combine all regex patterns into one, using named capture groups
-        tok_regex = '|'.join('(?P<%s>%s)' % pair for pair in token_specification)
-
-        self.tokens_list = []
-
-        for mo in re.finditer(tok_regex, self.source_code):
-            kind = mo.lastgroup
-            value = mo.group()
-
-            if kind == 'COMMENT' or kind == 'WHITESPACE':
+        if self.engine != 'regex' or isinstance(self.source_code, BUFFER_TYPES):
+            stream = self.tokenize_stream()
+            tokens = list(stream if self.symbols is None else _intern_identifiers(stream, self.symbols))
+        else:
+            tokens = list(self.iter_tokens())
+        self.tokens_list = tokens
+        return tokens
+
+    def tokenize_stream(self) -> TokenStream:
+        """Tokenize into a compact TokenStream that slices values lazily.
+
+        The source is either a str or a bytes-like buffer such as an mmap of
+        the source file. Buffers are scanned as bytes without decoding them
+        first; only the values of the tokens that are read get decoded.
+        With an interner, every identifier is interned, but values are still
+        sliced from the source when read.
+        """
+        stream = self._scan_stream()
+        if self.symbols is not None:
+            intern = self.symbols.intern
+            for index, kind_code in enumerate(stream.kinds):
+                if kind_code == IDENTIFIER_CODE:
+                    intern(stream.value(index))
+        self.tokens_list = stream
+        return stream
+
+    def _scan_stream(self) -> TokenStream:
+        if isinstance(self.source_code, BUFFER_TYPES):
+            if self.engine == 'regex':
+                return _scan_bytes(self.source_code)
+            # The other engines work on text
+            self.source_code = str(self.source_code, 'utf-8')
+        elif not isinstance(self.source_code, str):
+            raise TypeError("tokenize_stream() needs the whole source as a str or a bytes-like buffer.")
+
+        if self.engine == 'dfa':
+            return dfa.scan(self.source_code)
+        if self.engine == 'numpy':
+            # Imported here so NumPy is only loaded when this engine is used
+            from lexer import vectorized
+            return vectorized.scan(self.source_code)
+
+        stream = TokenStream(self.source_code)
+        kinds, starts, ends = stream.kinds, stream.starts, stream.ends
+        group_kind_codes = _GROUP_KIND_CODES
+
+        for mo in TOKEN_REGEX.finditer(self.source_code):
+            kind_code = group_kind_codes[mo.lastgroup]
+            if kind_code < 0:
                 # Skip comments and whitespace
                 continue
+            kinds.append(kind_code)
+            starts.append(mo.start())
+            ends.append(mo.end())
+        return stream
 
-            token_value = value
-            if kind == 'LITERAL':
-                # For string literals, remove the surrounding quotes
-                token_value = value[1:-1]
+    def iter_tokens(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[tuple[str, str]]:
+        """Yield tokens one at a time instead of building the whole list.
 
-            if kind == 'MISMATCH':
-                # Handle unexpected characters
-                self.tokens_list.append(('unknown', token_value))
-            else:
-                # For all other valid tokens, store as (lowercase_type, value)
-                self.tokens_list.append((kind.lower(), token_value))
+        File objects (text or binary) and mmaps are read chunk_size at a time,
+        so memory stays proportional to the chunk size rather than the file.
+        """
+        tokens = self._iter_tokens(chunk_size)
+        return tokens if self.symbols is None else _intern_identifiers(tokens, self.symbols)
 
-        return self.tokens_list
+    def _iter_tokens(self, chunk_size: int) -> Iterator[tuple[str, str]]:
+        if isinstance(self.source_code, str):
+            for mo in TOKEN_REGEX.finditer(self.source_code):
+                token = _make_token(mo)
+                if token is not None:
+                    yield token
+        else:
+            yield from _iter_chunked_tokens(self.source_code, chunk_size)
 
     def token_count(self) -> int:
         if self.tokens_list is None:
             # If tokenize() hasn't been called, there are no tokens
             return 0
         return len(self.tokens_list)
+
+class TokenIterator:
+    """Tokens of a str source, one at a time, for streaming into Parser.
+
+    Unlike iter_tokens(), it also tracks lines as it scans, so position()
+    can report the line and column of the most recent tokens (the last
+    window of them) without keeping a list of all tokens.
+    """
+    def __init__(self, source: str, window: int = 16) -> None:
+        if not isinstance(source, str):
+            raise TypeError("TokenIterator needs the source as a str.")
+        self.source = source
+        self._matches = TOKEN_REGEX.finditer(source)
+        self._count = 0 # Tokens produced so far
+        self._scanned = 0 # Offset up to which newlines have been counted
+        self._line = 1
+        self._line_start = 0
+        self._positions = deque(maxlen=window) # (line, column) of the latest tokens
+
+    def __iter__(self) -> 'TokenIterator':
+        return self
+
+    def __next__(self) -> tuple[str, str]:
+        source = self.source
+        for mo in self._matches:
+            token = _make_token(mo)
+            if token is None:
+                continue
+            start = mo.start()
+            newlines = source.count('\n', self._scanned, start)
+            if newlines:
+                self._line += newlines
+                self._line_start = source.rfind('\n', self._scanned, start) + 1
+            self._scanned = start
+            self._positions.append((self._line, start - self._line_start + 1))
+            self._count += 1
+            return token
+        raise StopIteration
+
+    def position(self, index: int) -> tuple[int, int]:
+        """Return the 1-based (line, column) of a recently produced token."""
+        oldest = self._count - len(self._positions)
+        if not oldest <= index < self._count:
+            raise IndexError(f"Position of token {index} is no longer (or not yet) known.")
+        return self._positions[index - oldest]
+
+def map_source_file(path) -> mmap.mmap | bytes:
+    """Memory-map a source file read-only, for Lexer(...).tokenize_stream().
+
+    The pages are shared with the OS page cache instead of being copied and
+    decoded into a str. Empty files cannot be mapped and return b''.
+    """
+    with open(path, 'rb') as file:
+        if file.seek(0, 2) == 0:
+            return b''
+        # The mapping stays valid after the file is closed
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+def _scan_bytes(source) -> TokenStream:
+    stream = TokenStream(source)
+    kinds, starts, ends = stream.kinds, stream.starts, stream.ends
+    group_kind_codes = _GROUP_KIND_CODES
+
+    for mo in BYTES_TOKEN_REGEX.finditer(source):
+        kind_code = group_kind_codes[mo.lastgroup]
+        if kind_code < 0:
+            continue
+        kinds.append(kind_code)
+        starts.append(mo.start())
+        ends.append(mo.end())
+
+    # Outside literals and comments the language is ASCII. A non-ASCII byte
+    # there is an 'unknown' token, but as text it may be Unicode whitespace or
+    # a letter that changes a keyword boundary, so such sources are decoded
+    # and lexed as text to get exactly the same tokens.
+    unknown = KIND_CODES['unknown']
+    if unknown in kinds and any(kinds[index] == unknown and source[starts[index]] >= 0x80
+                                for index in range(len(kinds))):
+        return Lexer(str(source, 'utf-8')).tokenize_stream()
+    return stream
+
+def _intern_identifiers(tokens: Iterable[tuple[str, str]],
+                        symbols: SymbolInterner) -> Iterator[tuple[str, str]]:
+    """Tokens with every identifier value replaced by the interner's shared string."""
+    canonical = symbols.canonical
+    for token in tokens:
+        yield ('identifier', canonical(token[1])) if token[0] == 'identifier' else token
+
+def _make_token(mo: re.Match) -> tuple[str, str] | None:
+    kind = mo.lastgroup
+    value = mo.group()
+
+    if kind == 'COMMENT' or kind == 'WHITESPACE':
+        # Skip comments and whitespace
+        return None
+
+    if kind == 'LITERAL':
+        # For string literals, remove the surrounding quotes
+        return ('literal', value[1:-1])
+
+    if kind == 'MISMATCH':
+        # Handle unexpected characters
+        return ('unknown', value)
+
+    # For all other valid tokens, store as (lowercase_type, value)
+    return (kind.lower(), value)
+
+def _read_chunks(source, chunk_size: int) -> Iterator[str]:
+    """Read text chunks from a file object or mmap, decoding bytes as UTF-8."""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            # Flush the decoder, raising if the input ends mid-character
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                yield tail
+            return
+        yield chunk if isinstance(chunk, str) else decoder.decode(chunk)
+
+def _iter_chunked_tokens(source, chunk_size: int) -> Iterator[tuple[str, str]]:
+    buffer = ''
+    pos = 0 # Where scanning resumes in buffer
+
+    for chunk in _read_chunks(source, chunk_size):
+        # Drop what was already scanned, but keep one character of context so
+        # the keyword pattern's leading \b sees the same text as a full scan
+        keep = max(pos - 1, 0)
+        buffer = buffer[keep:] + chunk
+        pos -= keep
+
+        end = len(buffer)
+        for mo in TOKEN_REGEX.finditer(buffer, pos):
+            # A match touching the end of the buffer may continue in the next
+            # chunk, and a lone quote may still find its closing quote there
+            if mo.end() == end or (mo.lastgroup == 'MISMATCH' and mo.group() in '"\''):
+                break
+            pos = mo.end()
+            token = _make_token(mo)
+            if token is not None:
+                yield token
+
+    # End of input: everything left in the buffer is final
+    for mo in TOKEN_REGEX.finditer(buffer, pos):
+        token = _make_token(mo)
+        if token is not None:
+            yield token
@@ -0,0 +1,66 @@
+# Parallel lexing
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from lexer.lexer import COMMENT_OR_LITERAL_REGEX, Lexer
+
+# tokenize() lexes 1 MiB of a generated program in about 0.4 s here. Sending
+# its tokens back through pickle takes about half as long again, and starting
+# a pool about 10 ms, so smaller sources gain too little to be worth it.
+PARALLEL_THRESHOLD = 1 << 20
+
+def split_source(source: str, parts: int) -> list[str]:
+    """Split source into up to parts chunks that lex independently.
+
+    Chunks are cut right before a newline that is not inside a string literal
+    (comments never contain one). At such a newline the sequential scan is
+    between tokens, in whitespace, and every token on either side only looks
+    at characters up to that newline, so lexing the chunks separately and
+    concatenating the results gives exactly the tokens of the whole source.
+    """
+    cuts = [0]
+    literals = COMMENT_OR_LITERAL_REGEX.finditer(source)
+    span = next(literals, None)
+
+    for part in range(1, parts):
+        pos = source.find('\n', max(len(source) * part // parts, cuts[-1] + 1))
+        while pos != -1:
+            # Skip comments and literals that end before the candidate newline
+            while span is not None and span.end() <= pos:
+                span = next(literals, None)
+            if span is None or span.start() > pos:
+                break
+            # The newline is inside a literal: try the first one after it
+            pos = source.find('\n', span.end())
+        if pos == -1:
+            break
+        cuts.append(pos)
+
+    cuts.append(len(source))
+    return [source[start:end] for start, end in zip(cuts, cuts[1:])]
+
+def _tokenize_chunk(chunk: str) -> list[tuple[str, str]]:
+    return Lexer(chunk).tokenize()
+
+def parallel_tokenize(source: str, workers: int | None = None,
+                      threshold: int = PARALLEL_THRESHOLD) -> list[tuple[str, str]]:
+    """Tokenize source in a process pool, giving the same result as Lexer.tokenize().
+
+    Sources shorter than threshold characters, or a single worker, are lexed
+    sequentially in this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers < 2 or len(source) < threshold:
+        return Lexer(source).tokenize()
+
+    chunks = split_source(source, workers)
+    if len(chunks) < 2:
+        return Lexer(source).tokenize()
+
+    tokens = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+        # map() yields the results in chunk order
+        for chunk_tokens in pool.map(_tokenize_chunk, chunks):
+            tokens.extend(chunk_tokens)
+    return tokens
@@ -0,0 +1,43 @@
+# Symbol interning
+
+from collections.abc import Iterable
+
+class SymbolInterner:
+    """Small integer ids for the names used in one compilation.
+
+    The lexer interns every identifier it produces, and the later stages key
+    their tables by these ids, so a name is hashed once per lookup and ids
+    can index plain lists. names[id] is the one string object shared by
+    every occurrence of the name.
+    """
+    __slots__ = ('names', 'ids')
+
+    def __init__(self, names: Iterable[str] = ()) -> None:
+        self.names: list[str] = [] # Symbol id -> name
+        self.ids: dict[str, int] = {} # Name -> symbol id
+        for name in names:
+            self.intern(name)
+
+    def intern(self, name: str) -> int:
+        """Return the id of name, giving it the next free id if it is new."""
+        symbol_id = self.ids.get(name)
+        if symbol_id is None:
+            symbol_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return symbol_id
+
+    def canonical(self, name: str) -> str:
+        """The shared string object for name."""
+        return self.names[self.intern(name)]
+
+    def __getitem__(self, symbol_id: int) -> str:
+        return self.names[symbol_id]
+
+    def __contains__(self, name) -> bool:
+        return name in self.ids
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __repr__(self) -> str:
+        return f"SymbolInterner({len(self.names)} symbols)"
@@ -0,0 +1,117 @@
+# Compact token storage
+
+import re
+from array import array
+from bisect import bisect_left
+
+# Token kinds in code order; a kind code is the index into this tuple
+TOKEN_KINDS = ('keyword', 'identifier', 'constant', 'operator', 'punctuation', 'literal', 'unknown')
+KIND_CODES = {kind: code for code, kind in enumerate(TOKEN_KINDS)}
+IDENTIFIER_CODE = KIND_CODES['identifier']
+LITERAL_CODE = KIND_CODES['literal']
+
+_NEWLINE = re.compile('\n')
+_BYTES_NEWLINE = re.compile(b'\n')
+
+class LineIndex:
+    """Offsets of every newline in a source, for on-demand line/column lookups.
+
+    Building the table is a single pass over the source, separate from
+    scanning, and each lookup is a binary search over it.
+    """
+    __slots__ = ('newlines',)
+
+    def __init__(self, source) -> None:
+        newline = _NEWLINE if isinstance(source, str) else _BYTES_NEWLINE
+        self.newlines = array('I', (mo.start() for mo in newline.finditer(source)))
+
+    def position(self, offset: int) -> tuple[int, int]:
+        """Return the 1-based (line, column) of a source offset."""
+        line = bisect_left(self.newlines, offset)
+        line_start = self.newlines[line - 1] + 1 if line else 0
+        return line + 1, offset - line_start + 1
+
+    def line_count(self) -> int:
+        return len(self.newlines) + 1
+
+class TokenStream:
+    """Tokens stored as parallel arrays instead of a list of tuples.
+
+    Each token costs one byte for its kind code and two 4-byte offsets into the
+    original source. Token text is only sliced out of the source when a token is
+    read, and indexing returns the same (kind, value) tuples that
+    Lexer.tokenize() produces, so the stream can be handed to Parser as is.
+
+    The source may also be a bytes-like buffer such as an mmap, with byte
+    offsets. Values are then decoded from UTF-8 as they are read.
+    """
+    __slots__ = ('source', 'kinds', 'starts', 'ends', '_line_index')
+
+    def __init__(self, source, kinds: array | None = None,
+                 starts: array | None = None, ends: array | None = None,
+                 line_index: LineIndex | None = None) -> None:
+        self.source = source
+        self.kinds = kinds if kinds is not None else array('B') # Kind codes
+        self.starts = starts if starts is not None else array('I') # Lexeme start offsets
+        self.ends = ends if ends is not None else array('I') # Lexeme end offsets (exclusive)
+        self._line_index = line_index # Built on the first position lookup
+
+    def append(self, kind_code: int, start: int, end: int) -> None:
+        self.kinds.append(kind_code)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def kind(self, index: int) -> str:
+        return TOKEN_KINDS[self.kinds[index]]
+
+    def value(self, index: int) -> str:
+        if self.kinds[index] == LITERAL_CODE:
+            # The offsets cover the quotes, the token value does not
+            value = self.source[self.starts[index] + 1:self.ends[index] - 1]
+        else:
+            value = self.source[self.starts[index]:self.ends[index]]
+        return value if isinstance(value, str) else str(value, 'utf-8')
+
+    @property
+    def line_index(self) -> LineIndex:
+        if self._line_index is None:
+            self._line_index = LineIndex(self.source)
+        return self._line_index
+
+    def position(self, index: int) -> tuple[int, int]:
+        """Return the 1-based (line, column) where a token starts."""
+        start = self.starts[index]
+        line, column = self.line_index.position(start)
+        if not isinstance(self.source, str):
+            # Count characters, not bytes, in case a literal earlier on the line is not ASCII
+            column = len(str(self.source[start - column + 1:start], 'utf-8')) + 1
+        return line, column
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return TokenStream(self.source, self.kinds[index], self.starts[index], self.ends[index],
+                               self._line_index)
+        if index < 0:
+            index += len(self.kinds)
+        return (TOKEN_KINDS[self.kinds[index]], self.value(index))
+
+    def __iter__(self):
+        for index in range(len(self.kinds)):
+            yield (TOKEN_KINDS[self.kinds[index]], self.value(index))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (TokenStream, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"TokenStream({len(self)} tokens)"
+
+    def nbytes(self) -> int:
+        """Bytes used by the token arrays, not counting the shared source."""
+        return sum(column.itemsize * len(column) for column in (self.kinds, self.starts, self.ends))
@@ -0,0 +1,181 @@
+# NumPy-vectorized scanner
+#
+# An alternative lexer engine for very large ASCII sources. Every byte is
+# classified through a 256-entry lookup table in one vectorized step, token
+# boundaries are where the class changes, and token kinds are assigned with
+# array operations. Python only looks at the few ambiguous spots: comments and
+# string literals (found with a small regex), two-character operators,
+# negative constants, numbers glued to identifiers and keyword candidates.
+# The tokens are identical to the regex engine's.
+
+from array import array
+
+from lexer import dfa
+from lexer.lexer import COMMENT_OR_LITERAL_REGEX
+from lexer.tokens import KIND_CODES, TokenStream
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional, only this engine needs it
+    np = None
+
+# Byte classes
+_SPACE = 0
+_LETTER = 1
+_DIGIT = 2
+_SYMBOL = 3 # Every symbol byte is a run of its own
+
+_KEYWORD = KIND_CODES['keyword']
+_IDENTIFIER = KIND_CODES['identifier']
+_CONSTANT = KIND_CODES['constant']
+_OPERATOR = KIND_CODES['operator']
+_PUNCTUATION = KIND_CODES['punctuation']
+_LITERAL = KIND_CODES['literal']
+_UNKNOWN = KIND_CODES['unknown']
+
+# Keywords share few (length, first letter) pairs, which filters the
+# identifiers worth checking against the keyword set
+_KEYWORD_SHAPES = {(len(keyword), keyword[0]) for keyword in dfa.KEYWORDS}
+
+def _build_tables():
+    class_table = np.full(256, _SYMBOL, dtype=np.uint8)
+    symbol_kinds = np.full(256, _UNKNOWN, dtype=np.uint8)
+    for byte in range(128):
+        ch = chr(byte)
+        if ch.isspace():
+            class_table[byte] = _SPACE
+        elif ch == '_' or ch.isalpha():
+            class_table[byte] = _LETTER
+        elif ch.isdigit():
+            class_table[byte] = _DIGIT
+        elif ch in ';{},()':
+            symbol_kinds[byte] = _PUNCTUATION
+        elif ch in '+-*/=<>':
+            symbol_kinds[byte] = _OPERATOR
+    return class_table, symbol_kinds
+
+if np is not None:
+    _CLASS_TABLE, _SYMBOL_KINDS = _build_tables()
+
+def _to_array(typecode: str, values) -> array:
+    result = array(typecode)
+    result.frombytes(values.astype(np.uint8 if typecode == 'B' else np.uint32).tobytes())
+    return result
+
+def scan(source: str) -> TokenStream:
+    """Tokenize source into a TokenStream with vectorized classification."""
+    if np is None:
+        raise ImportError("The 'numpy' lexer engine needs NumPy installed.")
+    if not source.isascii():
+        # Byte offsets would not be character offsets; the DFA gives the same tokens
+        return dfa.scan(source)
+    length = len(source)
+    if length == 0:
+        return TokenStream(source)
+
+    data = np.frombuffer(source.encode('ascii'), dtype=np.uint8)
+    classes = _CLASS_TABLE[data]
+
+    # Comments and literals are found sequentially, then blanked out as spaces
+    extra_starts, extra_ends, extra_kinds = [], [], []
+    covered_starts, covered_ends = [], []
+    for mo in COMMENT_OR_LITERAL_REGEX.finditer(source):
+        start, end = mo.span()
+        covered_starts.append(start)
+        covered_ends.append(end)
+        if source[start] != '/':
+            extra_starts.append(start)
+            extra_ends.append(end)
+            extra_kinds.append(_LITERAL)
+    if covered_starts:
+        marks = np.zeros(length + 1, dtype=np.int32)
+        marks[covered_starts] += 1
+        marks[covered_ends] -= 1
+        classes[np.cumsum(marks[:length]) > 0] = _SPACE
+
+    # Runs: letters and digits together form words, each symbol stands alone
+    run_classes = np.where(classes == _DIGIT, _LETTER, classes)
+    boundaries = np.empty(length, dtype=bool)
+    boundaries[0] = True
+    boundaries[1:] = (run_classes[1:] != run_classes[:-1]) | (run_classes[1:] == _SYMBOL)
+    run_starts = np.flatnonzero(boundaries)
+    run_ends = np.append(run_starts[1:], length)
+    keep = run_classes[run_starts] != _SPACE
+
+    starts = run_starts[keep]
+    ends = run_ends[keep]
+    first_classes = classes[starts]
+    first_bytes = data[starts]
+    count = len(starts)
+    if count == 0 and not extra_starts:
+        return TokenStream(source)
+
+    is_symbol = first_classes == _SYMBOL
+    kinds = np.where(first_classes == _LETTER, _IDENTIFIER, _CONSTANT).astype(np.uint8)
+    kinds[is_symbol] = _SYMBOL_KINDS[first_bytes[is_symbol]]
+    dropped = np.zeros(count, dtype=bool)
+
+    # Words starting with a digit are constants, unless letters follow the
+    # digits: then they split into a constant and an identifier
+    letter_counts = np.concatenate(([0], np.cumsum(classes == _LETTER)))
+    glued = np.flatnonzero((first_classes == _DIGIT) & (letter_counts[ends] > letter_counts[starts]))
+    for index in glued.tolist():
+        start, end = int(starts[index]), int(ends[index])
+        split = start + 1
+        while source[split].isdigit():
+            split += 1
+        ends[index] = split
+        extra_starts.append(split)
+        extra_ends.append(end)
+        extra_kinds.append(_IDENTIFIER)
+
+    # Adjacent symbol runs that make up two-character operators
+    next_adjacent = np.zeros(count, dtype=bool)
+    next_adjacent[:-1] = starts[1:] == ends[:-1]
+    next_bytes = np.zeros(count, dtype=np.uint8)
+    next_bytes[:-1] = first_bytes[1:]
+    next_classes = np.zeros(count, dtype=np.uint8)
+    next_classes[:-1] = first_classes[1:]
+
+    pairs = is_symbol & next_adjacent & (
+        (np.isin(first_bytes, np.frombuffer(b'=!<>', dtype=np.uint8)) & (next_bytes == ord('=')))
+        | ((first_bytes == ord('&')) & (next_bytes == ord('&')))
+        | ((first_bytes == ord('|')) & (next_bytes == ord('|'))))
+    pair_indexes = np.flatnonzero(pairs)
+    if len(pair_indexes):
+        # In a run like "===" only every other candidate starts an operator
+        if np.any(np.diff(pair_indexes) == 1):
+            chosen, last = [], -2
+            for index in pair_indexes.tolist():
+                if index != last + 1:
+                    chosen.append(index)
+                    last = index
+            pair_indexes = np.array(chosen, dtype=np.intp)
+        ends[pair_indexes] = ends[pair_indexes + 1]
+        kinds[pair_indexes] = _OPERATOR
+        dropped[pair_indexes + 1] = True
+
+    # A minus directly followed by digits is a negative constant
+    negatives = np.flatnonzero(is_symbol & (first_bytes == ord('-')) & next_adjacent & (next_classes == _DIGIT))
+    ends[negatives] = ends[negatives + 1]
+    kinds[negatives] = _CONSTANT
+    dropped[negatives + 1] = True
+
+    # Keywords: check only identifiers with a keyword's length and first letter
+    lengths = ends - starts
+    candidates = np.flatnonzero((kinds == _IDENTIFIER) & (lengths >= 2) & (lengths <= 6))
+    keywords = dfa.KEYWORDS
+    for index in candidates.tolist():
+        start, end = int(starts[index]), int(ends[index])
+        if (end - start, source[start]) in _KEYWORD_SHAPES and source[start:end] in keywords:
+            kinds[index] = _KEYWORD
+
+    kept = ~dropped
+    all_starts = np.concatenate((starts[kept], np.array(extra_starts, dtype=starts.dtype)))
+    all_ends = np.concatenate((ends[kept], np.array(extra_ends, dtype=ends.dtype)))
+    all_kinds = np.concatenate((kinds[kept], np.array(extra_kinds, dtype=np.uint8)))
+    if extra_starts:
+        order = np.argsort(all_starts, kind='stable')
+        all_starts, all_ends, all_kinds = all_starts[order], all_ends[order], all_kinds[order]
+
+    return TokenStream(source, _to_array('B', all_kinds), _to_array('I', all_starts), _to_array('I', all_ends))
@@ -0,0 +1,158 @@
+# Call graph
+
+import intermediator.intermediator as intermediator
+from parser.parser import FunctionCallNode, IdentifierNode, ProgramNode, iter_nodes
+
+# Operand fields of the IR instructions that may name a function
+_OPERAND_FIELDS = {
+    intermediator.AssignInstr: ('source',),
+    intermediator.BinaryOpInstr: ('left', 'right'),
+    intermediator.ConditionalJumpInstr: ('condition_var',),
+    intermediator.ReturnInstr: ('value',),
+    intermediator.PrintInstr: ('value',),
+}
+
+def _referenced_names(function) -> list[str]:
+    """Names of the calls and identifiers in a function, in source order."""
+    return [node.name for node in iter_nodes(function) if isinstance(node, (FunctionCallNode, IdentifierNode))]
+
+def function_ranges(ir_code) -> dict[str, tuple[int, int]]:
+    """Index range of each function's instructions in ir_code, by function name.
+
+    A function starts at its FuncLabel and runs up to the next one.
+    """
+    starts = [(index, instr.name) for index, instr in enumerate(ir_code)
+              if isinstance(instr, intermediator.LabelInstr) and isinstance(instr.name, intermediator.FuncLabel)]
+    ends = [index for index, _ in starts[1:]] + [len(ir_code)]
+    return {name: (start, end) for (start, name), end in zip(starts, ends)}
+
+class CallGraph:
+    """The functions of a program and the functions each one refers to.
+
+    Calls are the only way from one function into another, but an identifier
+    naming a function (whose value is the function's address) also keeps it
+    alive, so it counts as an edge as well. Edges only go to functions of the
+    program.
+    """
+
+    def __init__(self, calls: dict[str, list[str]]) -> None:
+        self.calls = calls # Function name (in source order) -> functions it refers to
+
+    @classmethod
+    def from_program(cls, program: ProgramNode) -> 'CallGraph':
+        names = {function.name for function in program.functions}
+        return cls({function.name: list(dict.fromkeys(name for name in _referenced_names(function) if name in names))
+                    for function in program.functions})
+
+    @classmethod
+    def from_ir(cls, ir_code) -> 'CallGraph':
+        ranges = function_ranges(ir_code)
+        calls = {}
+        for function_name, (start, end) in ranges.items():
+            callees = {}
+            for instr in ir_code[start:end]:
+                if isinstance(instr, intermediator.FunctionCallInstr):
+                    callees[instr.function_name] = None
+                else:
+                    for field in _OPERAND_FIELDS.get(type(instr), ()):
+                        operand = str(getattr(instr, field))
+                        if operand in ranges:
+                            callees[operand] = None
+            calls[function_name] = [name for name in callees if name in ranges]
+        return cls(calls)
+
+    def reachable(self, root: str = 'main') -> set[str]:
+        """The functions root can end up calling, root included."""
+        if root not in self.calls:
+            return set()
+        seen = {root}
+        stack = [root]
+        while stack:
+            for callee in self.calls[stack.pop()]:
+                if callee not in seen:
+                    seen.add(callee)
+                    stack.append(callee)
+        return seen
+
+    def strongly_connected_components(self) -> list[list[str]]:
+        """Tarjan's strongly connected components, without recursion.
+
+        Components come out in reverse topological order: every function a
+        component calls outside itself is in an earlier component, so
+        bottom-up analyses can take them in order.
+        """
+        index_of: dict[str, int] = {}
+        low: dict[str, int] = {}
+        on_stack: set[str] = set()
+        stack: list[str] = []
+        components = []
+        for root in self.calls:
+            if root in index_of:
+                continue
+            index_of[root] = low[root] = len(index_of)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(self.calls[root]))]
+            while work:
+                function, callees = work[-1]
+                for callee in callees:
+                    if callee not in index_of:
+                        index_of[callee] = low[callee] = len(index_of)
+                        stack.append(callee)
+                        on_stack.add(callee)
+                        work.append((callee, iter(self.calls[callee])))
+                        break
+                    if callee in on_stack:
+                        low[function] = min(low[function], index_of[callee])
+                else:
+                    # Every callee is done
+                    work.pop()
+                    if work:
+                        caller = work[-1][0]
+                        low[caller] = min(low[caller], low[function])
+                    if low[function] == index_of[function]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == function:
+                                break
+                        components.append(component)
+        return components
+
+    def recursive_functions(self) -> set[str]:
+        """Functions that can call themselves, directly or through others."""
+        recursive = set()
+        for component in self.strongly_connected_components():
+            if len(component) > 1 or component[0] in self.calls[component[0]]:
+                recursive.update(component)
+        return recursive
+
+def drop_unreachable_functions(program: ProgramNode, root: str = 'main') -> ProgramNode:
+    """The program without the functions root never reaches.
+
+    Run it after semantic analysis, so that errors in dead functions are
+    still reported. A program without root is returned as it is.
+    """
+    graph = CallGraph.from_program(program)
+    if root not in graph.calls:
+        return program
+    live = graph.reachable(root)
+    return ProgramNode([function for function in program.functions if function.name in live])
+
+def drop_unreachable_ir(ir_code, root: str = 'main') -> list:
+    """ir_code without the instructions of the functions root never reaches.
+
+    For IR whose AST could not be pruned first, like that of the fused
+    front end. IR without root is returned as it is.
+    """
+    ranges = function_ranges(ir_code)
+    if root not in ranges:
+        return ir_code
+    live = CallGraph.from_ir(ir_code).reachable(root)
+    kept = []
+    for name, (start, end) in ranges.items():
+        if name in live:
+            kept.extend(ir_code[start:end])
+    return kept
@@ -0,0 +1,120 @@
+# Side-effect analysis
+
+import intermediator.intermediator as intermediator
+from optimizer.callgraph import CallGraph
+from parser.parser import (AssignmentNode, BinaryOpNode, ConstantNode, DeclarationNode, FunctionCallNode,
+                           IdentifierNode, PrintNode, ProgramNode, WhileNode, iter_nodes)
+
+# What running a function can do that its caller could notice. Functions
+# take no parameters and cannot reach their caller's locals, so a call
+# statement (which throws the return value away) without any of these is
+# the same as no call at all.
+PRINTS = 'prints'
+MAY_NOT_TERMINATE = 'may not terminate' # A loop or recursion not known to end
+MAY_TRAP = 'may trap' # A division that can fault: by zero, or INT_MIN by -1
+
+INT_MAX = 2**31 - 1
+
+def _constant(node) -> int | None:
+    return int(node.value) if isinstance(node, ConstantNode) else None
+
+def _loop_terminates(loop: WhileNode) -> bool:
+    """Whether a loop is known to end: while (v < K) or (v <= K) with v = v + c, c > 0.
+
+    The increment must be a statement of the loop's own block, so it runs on
+    every iteration, and nothing else in the body may assign or redeclare v.
+    It must also not overflow before v passes K.
+    """
+    condition = loop.condition
+    if not (isinstance(condition, BinaryOpNode) and condition.operator in ('<', '<=')
+            and isinstance(condition.left, IdentifierNode) and isinstance(condition.right, ConstantNode)):
+        return False
+    counter = condition.left.name
+    largest_tested = _constant(condition.right) - (1 if condition.operator == '<' else 0)
+
+    step = None
+    for statement in loop.block.statements:
+        if isinstance(statement, AssignmentNode) and statement.identifier_name == counter:
+            expression = statement.expression
+            if (step is None and isinstance(expression, BinaryOpNode) and expression.operator == '+'
+                    and isinstance(expression.left, IdentifierNode) and expression.left.name == counter
+                    and isinstance(expression.right, ConstantNode)):
+                step = _constant(expression.right)
+                increment = statement
+            else:
+                return False
+    if step is None or step <= 0 or largest_tested + step > INT_MAX:
+        return False
+
+    for node in iter_nodes(loop.block):
+        if node is increment:
+            continue
+        if (isinstance(node, AssignmentNode) and node.identifier_name == counter
+                or isinstance(node, DeclarationNode) and node.name == counter):
+            return False
+    return True
+
+def _scan(function) -> tuple[set[str], list[str]]:
+    """The effects of a function's own body, and the names it refers to, in one walk."""
+    effects = set()
+    names = []
+    for node in iter_nodes(function):
+        if isinstance(node, (FunctionCallNode, IdentifierNode)):
+            names.append(node.name)
+        elif isinstance(node, PrintNode):
+            effects.add(PRINTS)
+        elif isinstance(node, WhileNode):
+            if not _loop_terminates(node):
+                effects.add(MAY_NOT_TERMINATE)
+        elif isinstance(node, BinaryOpNode) and node.operator == '/':
+            if _constant(node.right) in (None, 0, -1):
+                effects.add(MAY_TRAP)
+    return effects, names
+
+def local_effects(function) -> set[str]:
+    """The effects of a function's own body, leaving out the functions it calls."""
+    return _scan(function)[0]
+
+def effect_summaries(program: ProgramNode) -> dict[str, frozenset[str]]:
+    """The effects of calling each function, including everything it calls.
+
+    Summaries are computed bottom-up over the strongly connected components
+    of the call graph, callees first. The functions of a component share one
+    summary, and recursion may not terminate, so a recursive component has
+    MAY_NOT_TERMINATE on top of its members' effects.
+    """
+    functions = {function.name for function in program.functions}
+    own = {}
+    calls = {}
+    for function in program.functions:
+        own[function.name], names = _scan(function)
+        calls[function.name] = list(dict.fromkeys(name for name in names if name in functions))
+    graph = CallGraph(calls) # What CallGraph.from_program would build, from the same walk
+    summaries: dict[str, frozenset[str]] = {}
+    for component in graph.strongly_connected_components():
+        effects = set()
+        for name in component:
+            effects |= own[name]
+            for callee in graph.calls[name]:
+                if callee in summaries:
+                    effects |= summaries[callee]
+        if len(component) > 1 or component[0] in graph.calls[component[0]]:
+            effects.add(MAY_NOT_TERMINATE)
+        summary = frozenset(effects)
+        for name in component:
+            summaries[name] = summary
+    return summaries
+
+def pure_functions(program: ProgramNode) -> set[str]:
+    """Functions whose calls can be dropped: no effects, through any callee."""
+    return {name for name, effects in effect_summaries(program).items() if not effects}
+
+def remove_pure_calls(ir_code, pure: set[str]) -> list:
+    """ir_code without the calls to pure functions.
+
+    Every call is a statement that throws the return value away, so a call
+    to a pure function does nothing. The callees may now be unreachable, for
+    optimizer.callgraph.drop_unreachable_ir to remove.
+    """
+    return [instr for instr in ir_code
+            if not (isinstance(instr, intermediator.FunctionCallInstr) and instr.function_name in pure)]
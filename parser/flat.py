@@ -0,0 +1,241 @@
+# Flat AST
+#
+# The same tree as the node classes in parser.parser, stored as parallel
+# arrays and addressed by integer node ids: one byte for the node kind, four
+# integer fields per node (a child node id, an index into the interned string
+# table, or the start and length of a run in the child list array) and one
+# shared list of distinct strings. Nodes are viewed through lightweight
+# subclasses of the regular node classes, so SemanticAnalyzer, IRGenerator and
+# print_ast walk a flat tree unchanged.
+
+from array import array
+
+from parser.parser import ASTNode, NODE_LAYOUTS, Parser, ProgramNode
+from parser.visitor import visit_iteratively
+
+# Field types
+NODE = 0 # Child node id, or NO_NODE
+STRING = 1 # Index into the string table
+LIST = 2 # Takes two fields: start in the child list array and length
+
+NO_NODE = -1
+FIELD_COUNT = 4
+
+# Node kind code -> (node class, its fields in order)
+_FIELD_TYPES = {'node': NODE, 'string': STRING, 'list': LIST}
+LAYOUTS = tuple((node_class, tuple((name, _FIELD_TYPES[field_type]) for name, field_type in layout))
+                for node_class, layout in NODE_LAYOUTS)
+KIND_CODES = {node_class: code for code, (node_class, _) in enumerate(LAYOUTS)}
+
+def _child_slots(layout) -> tuple[tuple[int, int], ...]:
+    """(field slot, field type) of the NODE and LIST fields of a layout."""
+    result = []
+    slot = 0
+    for _, field_type in layout:
+        if field_type != STRING:
+            result.append((slot, field_type))
+        slot += 2 if field_type == LIST else 1
+    return tuple(result)
+
+# Per kind code; empty for leaf nodes
+CHILD_SLOTS = tuple(_child_slots(layout) for _, layout in LAYOUTS)
+
+def _field_property(field_type: int, slot: int) -> property:
+    if field_type == NODE:
+        def getter(self):
+            return self._ast.node(self._ast.fields[self._id * FIELD_COUNT + slot])
+    elif field_type == STRING:
+        def getter(self):
+            return self._ast.strings[self._ast.fields[self._id * FIELD_COUNT + slot]]
+    else:
+        def getter(self):
+            ast = self._ast
+            start = ast.fields[self._id * FIELD_COUNT + slot]
+            length = ast.fields[self._id * FIELD_COUNT + slot + 1]
+            return [ast.node(child) for child in ast.children[start:start + length]]
+    return property(getter)
+
+def _make_view_class(node_class: type, layout) -> type:
+    """A subclass of node_class reading its attributes from a FlatAST.
+
+    It keeps the class name, so visitors that dispatch on the name (and
+    isinstance checks against node_class) treat it like the original.
+    """
+    namespace = {'__slots__': ('_ast', '_id'), '__module__': __name__}
+    slot = 0
+    for name, field_type in layout:
+        namespace[name] = _field_property(field_type, slot)
+        slot += 2 if field_type == LIST else 1
+    return type(node_class.__name__, (node_class,), namespace)
+
+VIEW_CLASSES = tuple(_make_view_class(node_class, layout) for node_class, layout in LAYOUTS)
+
+class FlatAST:
+    """An AST stored in arrays; node ids index the kinds column."""
+    __slots__ = ('kinds', 'fields', 'children', 'strings', '_string_ids', 'root')
+
+    def __init__(self) -> None:
+        self.kinds = array('B') # Kind code of each node
+        self.fields = array('i') # FIELD_COUNT fields per node
+        self.children = array('i') # Child node ids of the list fields
+        self.strings: list[str] = [] # Distinct names, operators and values
+        self._string_ids: dict[str, int] = {}
+        self.root = NO_NODE # Id of the ProgramNode, once there is one
+
+    def intern(self, value: str) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+    def add(self, node: ASTNode | None) -> int:
+        """Copy a node tree into the arrays and return the id of its root.
+
+        Children get their ids before their parent.
+        """
+        return visit_iteratively(self._add, node)
+
+    def _add(self, node: ASTNode | None):
+        if node is None:
+            return NO_NODE
+        code = KIND_CODES[type(node)]
+        if not CHILD_SLOTS[code]:
+            return self._append(code, [self.intern(getattr(node, name)) for name, _ in LAYOUTS[code][1]])
+        return self._add_with_children(node, code)
+
+    def _add_with_children(self, node: ASTNode, code: int):
+        values = []
+        for name, field_type in LAYOUTS[code][1]:
+            value = getattr(node, name)
+            if field_type == NODE:
+                values.append((yield value))
+            elif field_type == STRING:
+                values.append(self.intern(value))
+            else:
+                child_ids = []
+                for child in value:
+                    child_ids.append((yield child))
+                # The list is contiguous because its children are all added first
+                values.append(len(self.children))
+                values.append(len(child_ids))
+                self.children.extend(child_ids)
+        return self._append(code, values)
+
+    def _append(self, code: int, values: list[int]) -> int:
+        node_id = len(self.kinds)
+        self.kinds.append(code)
+        self.fields.extend(values)
+        self.fields.extend([0] * (FIELD_COUNT - len(values)))
+        if code == KIND_CODES[ProgramNode]:
+            self.root = node_id
+        return node_id
+
+    def node(self, node_id: int) -> ASTNode | None:
+        """View of a node that looks like the regular node class."""
+        if node_id == NO_NODE:
+            return None
+        view_class = VIEW_CLASSES[self.kinds[node_id]]
+        view = view_class.__new__(view_class)
+        view._ast = self
+        view._id = node_id
+        return view
+
+    def program(self) -> ProgramNode:
+        """View of the root ProgramNode, to hand to the analyzer or IR generator."""
+        if self.root == NO_NODE:
+            raise ValueError("The flat AST has no ProgramNode.")
+        return self.node(self.root)
+
+    def kind(self, node_id: int) -> type:
+        """Node class of a node, without creating a view."""
+        return LAYOUTS[self.kinds[node_id]][0]
+
+    def child_ids(self, node_id: int) -> list[int]:
+        """Ids of the direct children of a node, in field order."""
+        result = []
+        fields = self.fields
+        base = node_id * FIELD_COUNT
+        for slot, field_type in CHILD_SLOTS[self.kinds[node_id]]:
+            value = fields[base + slot]
+            if field_type == LIST:
+                result.extend(self.children[value:value + fields[base + slot + 1]])
+            elif value != NO_NODE:
+                result.append(value)
+        return result
+
+    def walk(self, node_id: int | None = None):
+        """Yield node ids in pre-order, starting at the root by default."""
+        kinds, child_slots = self.kinds, CHILD_SLOTS
+        stack = [self.root if node_id is None else node_id]
+        while stack:
+            current = stack.pop()
+            yield current
+            if child_slots[kinds[current]]:
+                stack.extend(reversed(self.child_ids(current)))
+
+    def to_node(self, node_id: int | None = None) -> ASTNode | None:
+        """Build regular node objects for a subtree, the root by default.
+
+        Children have smaller ids than their parents, so a single pass in id
+        order builds every child before the node that holds it.
+        """
+        if node_id is None:
+            node_id = self.root
+        if node_id == NO_NODE:
+            return None
+        kinds, fields, children, strings = self.kinds, self.fields, self.children, self.strings
+        # A subtree's nodes have consecutive ids, ending with its root
+        first = 0 if node_id == self.root else min(self.walk(node_id))
+
+        built = [None] * (node_id + 1 - first)
+        for current in range(first, node_id + 1):
+            node_class, layout = LAYOUTS[kinds[current]]
+            args = []
+            slot = current * FIELD_COUNT
+            for _, field_type in layout:
+                value = fields[slot]
+                if field_type == NODE:
+                    args.append(built[value - first] if value != NO_NODE else None)
+                elif field_type == STRING:
+                    args.append(strings[value])
+                else:
+                    args.append([built[child - first] for child in children[value:value + fields[slot + 1]]])
+                    slot += 1
+                slot += 1
+            # The constructors take the fields in layout order
+            built[current - first] = node_class(*args)
+        return built[-1]
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def nbytes(self) -> int:
+        """Bytes used by the node arrays, not counting the string table."""
+        return sum(column.itemsize * len(column) for column in (self.kinds, self.fields, self.children))
+
+def flatten(node: ASTNode) -> FlatAST:
+    """Copy a regular AST into a new FlatAST."""
+    ast = FlatAST()
+    ast.add(node)
+    return ast
+
+def parse_flat(tokens) -> FlatAST:
+    """Parse a program straight into a FlatAST.
+
+    Functions are parsed one at a time with Parser and copied into the
+    arrays, so only one function's node objects exist at any moment. Syntax
+    errors are the same as Parser.parse_program()'s.
+    """
+    ast = FlatAST()
+    parser = Parser(tokens)
+    function_ids = []
+    while parser.current_token is not None:
+        function_ids.append(ast.add(parser.parse_function()))
+
+    if not function_ids:
+        raise SyntaxError(Parser._PROGRAM_MIN_ONE_FUNCTION)
+    start = len(ast.children)
+    ast.children.extend(function_ids)
+    ast._append(KIND_CODES[ProgramNode], [start, len(function_ids)])
+    return ast
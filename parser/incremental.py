@@ -0,0 +1,77 @@
+# Incremental reparsing
+
+from lexer.incremental import TokenDiff
+from parser.parser import FunctionNode, Parser, ProgramNode
+
+def _parse_functions(tokens, start: int, stop: int) -> tuple[list[FunctionNode], list[tuple[int, int]]]:
+    """Parse tokens[start:stop] as whole functions, with the token range of each."""
+    parser = Parser(tokens[start:stop])
+    functions, spans = [], []
+    while parser.current_token is not None:
+        begin = parser.pos
+        functions.append(parser.parse_function())
+        spans.append((start + begin, start + parser.pos))
+    return functions, spans
+
+class IncrementalParser:
+    """A parsed program that can be updated after an edit without parsing it all again.
+
+    Besides the ProgramNode it keeps the token range of every function.
+    update() takes the new tokens and the TokenDiff from
+    lexer.incremental.relex, reparses only the functions whose tokens changed
+    and keeps every other FunctionNode object as it is. A function's parse
+    never looks past its closing brace, so its node only depends on its own
+    tokens.
+    """
+
+    def __init__(self, tokens) -> None:
+        self._reparse_all(tokens)
+
+    def update(self, tokens, diff: TokenDiff) -> ProgramNode:
+        """Apply an edit and return the new ProgramNode.
+
+        tokens are the tokens after the edit, and diff says that the old
+        tokens[diff.start:diff.old_stop] became tokens[diff.start:diff.new_stop].
+        Raises the same SyntaxError as Parser.parse_program() would for
+        tokens; the next update after that parses everything again.
+        """
+        spans = self.spans
+        if spans is None:
+            # The previous edit did not parse, so there is nothing to reuse
+            return self._reparse_all(tokens)
+        # The functions overlapping the edit, or touching it if it only inserts tokens
+        affected = [index for index, (start, stop) in enumerate(spans)
+                    if start <= diff.old_stop and stop >= diff.start]
+        if not affected:
+            return self._reparse_all(tokens)
+        first, last = affected[0], affected[-1]
+        region_start = spans[first][0]
+        region_stop = spans[last][1] + diff.delta
+
+        try:
+            functions, new_spans = _parse_functions(tokens, region_start, region_stop)
+        except SyntaxError:
+            # The edit may have moved a function boundary (a deleted closing
+            # brace, say); only a full parse knows where the functions end now
+            return self._reparse_all(tokens)
+        if not functions and len(affected) == len(spans):
+            return self._reparse_all(tokens)
+
+        old_functions = self.program.functions
+        self.program = ProgramNode(old_functions[:first] + functions + old_functions[last + 1:])
+        self.spans = (spans[:first] + new_spans
+                      + [(start + diff.delta, stop + diff.delta) for start, stop in spans[last + 1:]])
+        self.tokens = tokens
+        self.reparsed = range(first, first + len(functions))
+        return self.program
+
+    def _reparse_all(self, tokens) -> ProgramNode:
+        self.spans = None
+        functions, spans = _parse_functions(tokens, 0, len(tokens))
+        if not functions:
+            raise SyntaxError(Parser._PROGRAM_MIN_ONE_FUNCTION)
+        self.tokens = tokens
+        self.program = ProgramNode(functions)
+        self.spans = spans # Token range of each function
+        self.reparsed = range(len(spans)) # Indexes of the functions parsed by the last call
+        return self.program
@@ -0,0 +1,317 @@
+# Table-driven LL(1) parser
+#
+# An alternative to the recursive-descent Parser that builds the same AST.
+# The grammar documented in the Parser docstrings is rewritten below without
+# left recursion and with common prefixes factored out. FIRST and FOLLOW sets
+# and the parse table are computed from it when this module is imported.
+# Tokens are mapped to integer terminal codes once, and parsing is a single
+# loop over a stack of terminal, nonterminal and action codes. Actions build
+# the AST nodes on a separate value stack.
+
+from parser.parser import (ProgramNode, FunctionNode, BlockNode, DeclarationNode,
+                           AssignmentNode, ConditionalNode, WhileNode, PrintNode,
+                           FunctionCallNode, IdentifierNode, ConstantNode, LiteralNode,
+                           BinaryOpNode, Parser)
+
+# --- Grammar ---
+# Quoted symbols are keyword, punctuation or operator terminals, bare
+# lowercase ones are token kinds, capitalized ones are nonterminals and
+# '@' marks an action.
+EXPRESSION_OPERATORS = ('+', '-', '*', '/', '==', '!=', '<', '>', '<=', '>=', '&&', '||')
+
+GRAMMAR = {
+    'Program': [['@begin_list', 'Function', '@append', 'Functions', '@program']],
+    'Functions': [['Function', '@append', 'Functions'], []],
+    'Function': [["'int'", 'identifier', "'('", "')'", "'{'", 'Block', "'return'", 'Expression', "';'", "'}'", '@function']],
+    'Block': [['@begin_list', 'Statements', '@block']],
+    'Statements': [['Statement', '@append', 'Statements'], []],
+    'Statement': [['Declaration'], ['Conditional'], ['While'], ['Print'], ['identifier', 'IdentifierStatement']],
+    'Declaration': [["'int'", 'identifier', 'DeclarationTail']],
+    'DeclarationTail': [["';'", '@declaration'], ["'='", 'Expression', "';'", '@initialized_declaration']],
+    'IdentifierStatement': [["'('", "')'", "';'", '@call'], ["'='", 'Expression', "';'", '@assignment']],
+    'Conditional': [["'if'", "'('", 'Expression', "')'", "'{'", 'Block', "'}'", 'Else']],
+    'Else': [["'else'", "'{'", 'Block', "'}'", '@if_else'], ['@if']],
+    'While': [["'while'", "'('", 'Expression', "')'", "'{'", 'Block', "'}'", '@while']],
+    'Print': [["'print'", "'('", 'PrintArgument', "')'", "';'", '@print']],
+    'PrintArgument': [['literal', '@literal'], ['identifier', '@identifier']],
+    'Expression': [['Simple', 'ExpressionTail']],
+    'ExpressionTail': [[f"'{operator}'", 'Simple', '@binary', 'ExpressionTail'] for operator in EXPRESSION_OPERATORS] + [[]],
+    'Simple': [['identifier', '@identifier'], ['constant', '@constant']],
+}
+START = 'Program'
+END = '$' # Sorts before every other terminal, so its code is 0
+
+# Terminals whose token value goes on the value stack when matched
+VALUE_TERMINALS = {'identifier', 'constant', 'literal', "'int'"} | {f"'{operator}'" for operator in EXPRESSION_OPERATORS}
+
+def _is_terminal(symbol: str) -> bool:
+    return symbol == END or symbol[0] == "'" or symbol[0].islower()
+
+def compute_first(grammar: dict) -> dict[str, set[str]]:
+    """FIRST set of every nonterminal; '' stands for the empty string."""
+    first = {nonterminal: set() for nonterminal in grammar}
+    changed = True
+    while changed:
+        changed = False
+        for nonterminal, productions in grammar.items():
+            for production in productions:
+                result = _first_of_sequence(production, first)
+                if not result <= first[nonterminal]:
+                    first[nonterminal] |= result
+                    changed = True
+    return first
+
+def _first_of_sequence(symbols, first) -> set[str]:
+    result = set()
+    for symbol in symbols:
+        if symbol[0] == '@':
+            continue
+        if _is_terminal(symbol):
+            result.add(symbol)
+            return result
+        result |= first[symbol] - {''}
+        if '' not in first[symbol]:
+            return result
+    result.add('')
+    return result
+
+def compute_follow(grammar: dict, first: dict[str, set[str]]) -> dict[str, set[str]]:
+    follow = {nonterminal: set() for nonterminal in grammar}
+    follow[START].add(END)
+    changed = True
+    while changed:
+        changed = False
+        for nonterminal, productions in grammar.items():
+            for production in productions:
+                for index, symbol in enumerate(production):
+                    if symbol[0] == '@' or _is_terminal(symbol):
+                        continue
+                    rest = _first_of_sequence(production[index + 1:], first)
+                    result = (rest - {''}) | (follow[nonterminal] if '' in rest else set())
+                    if not result <= follow[symbol]:
+                        follow[symbol] |= result
+                        changed = True
+    return follow
+
+FIRST = compute_first(GRAMMAR)
+FOLLOW = compute_follow(GRAMMAR, FIRST)
+
+# --- Symbol codes ---
+# Terminals are 0..TERMINAL_COUNT-1, nonterminals follow, then actions
+TERMINALS = sorted({symbol for productions in GRAMMAR.values() for production in productions
+                    for symbol in production if _is_terminal(symbol)} | {END})
+NONTERMINALS = list(GRAMMAR)
+ACTIONS = sorted({symbol for productions in GRAMMAR.values() for production in productions
+                  for symbol in production if symbol[0] == '@'})
+TERMINAL_COUNT = len(TERMINALS)
+NONTERMINAL_BASE = TERMINAL_COUNT
+ACTION_BASE = NONTERMINAL_BASE + len(NONTERMINALS)
+
+_CODES = {symbol: code for code, symbol in enumerate(TERMINALS + NONTERMINALS + ACTIONS)}
+END_CODE = _CODES[END]
+# Code of a token no production can match; its table column is empty
+_UNKNOWN_TERMINAL = TERMINAL_COUNT
+TABLE_WIDTH = TERMINAL_COUNT + 1
+
+# Token (kind, value) -> terminal code, for tokens with a terminal of their own
+_TOKEN_CODES = {}
+for _symbol in TERMINALS:
+    if _symbol[0] == "'":
+        _value = _symbol[1:-1]
+        for _kind in ('keyword', 'punctuation', 'operator'):
+            _TOKEN_CODES[(_kind, _value)] = _CODES[_symbol]
+# Token kinds matched by kind alone
+_KIND_CODES = {kind: _CODES[kind] for kind in ('identifier', 'constant', 'literal')}
+
+_VALUE_CODES = frozenset(_CODES[symbol] for symbol in VALUE_TERMINALS)
+
+def _build_table() -> tuple[list[int], list[tuple[int, ...]], list[bool]]:
+    """The parse table and the productions it refers to.
+
+    The table is flat, indexed by (nonterminal code - TERMINAL_COUNT) *
+    TABLE_WIDTH + terminal code, and holds the production to expand or -1.
+    Productions are kept as the symbol codes to push, in reverse. When a
+    production starts with a terminal, that terminal is the lookahead that
+    selected it, so it is matched right away instead of being pushed; the
+    third list says which productions do that (True), or holds the node class
+    when the production is just a token and the action making it a leaf node.
+    """
+    table = [-1] * (len(NONTERMINALS) * TABLE_WIDTH)
+    productions, consumes = [], []
+    for nonterminal_index, nonterminal in enumerate(NONTERMINALS):
+        empty_production = -1
+        for production in GRAMMAR[nonterminal]:
+            first = _first_of_sequence(production, FIRST)
+            lookaheads = (first - {''}) | (FOLLOW[nonterminal] if '' in first else set())
+            for terminal in lookaheads:
+                slot = nonterminal_index * TABLE_WIDTH + _CODES[terminal]
+                if table[slot] != -1:
+                    raise AssertionError(f"Grammar is not LL(1): {nonterminal} on {terminal}.")
+                table[slot] = len(productions)
+            leading_terminal = bool(production) and _is_terminal(production[0])
+            pushed = production[1:] if leading_terminal else production
+            if '' in first:
+                empty_production = len(productions)
+            if leading_terminal and pushed and pushed[0] in _LEAF_ACTIONS:
+                # A token that becomes a leaf node: built as soon as it is matched
+                consumes.append(_LEAF_ACTIONS[pushed[0]])
+                pushed = pushed[1:]
+            else:
+                consumes.append(leading_terminal)
+            productions.append(tuple(_CODES[symbol] for symbol in reversed(pushed)))
+
+        if empty_production >= 0:
+            # Any other lookahead also takes the empty production. That is an
+            # error anyway, but it is then reported by the terminal expected
+            # next (';' rather than "an operator, ')' or ';'")
+            row = nonterminal_index * TABLE_WIDTH
+            for slot in range(row, row + TABLE_WIDTH):
+                if table[slot] == -1:
+                    table[slot] = empty_production
+    return table, productions, consumes
+
+# Actions that wrap the value of the token just matched in a node
+_LEAF_ACTIONS = {'@identifier': IdentifierNode, '@constant': ConstantNode, '@literal': LiteralNode}
+
+TABLE, PRODUCTIONS, CONSUMES = _build_table()
+
+# --- Actions ---
+# Each takes the value stack and replaces the values it consumes with a node
+def _begin_list(values):
+    values.append([])
+
+def _append(values):
+    node = values.pop()
+    values[-1].append(node)
+
+def _program(values):
+    values.append(ProgramNode(values.pop()))
+
+def _function(values):
+    return_expression = values.pop()
+    block = values.pop()
+    name = values.pop()
+    type_name = values.pop()
+    values.append(FunctionNode(type_name, name, block, return_expression))
+
+def _block(values):
+    values.append(BlockNode(values.pop()))
+
+def _declaration(values):
+    name = values.pop()
+    values.append(DeclarationNode(values.pop(), name))
+
+def _initialized_declaration(values):
+    expression = values.pop()
+    name = values.pop()
+    values.append(DeclarationNode(values.pop(), name, expression))
+
+def _call(values):
+    values.append(FunctionCallNode(values.pop()))
+
+def _assignment(values):
+    expression = values.pop()
+    values.append(AssignmentNode(values.pop(), expression))
+
+def _if(values):
+    if_block = values.pop()
+    values.append(ConditionalNode(values.pop(), if_block))
+
+def _if_else(values):
+    else_block = values.pop()
+    if_block = values.pop()
+    values.append(ConditionalNode(values.pop(), if_block, else_block))
+
+def _while(values):
+    block = values.pop()
+    values.append(WhileNode(values.pop(), block))
+
+def _print(values):
+    values.append(PrintNode(values.pop()))
+
+def _literal(values):
+    values.append(LiteralNode(values.pop()))
+
+def _identifier(values):
+    values.append(IdentifierNode(values.pop()))
+
+def _constant(values):
+    values.append(ConstantNode(values.pop()))
+
+def _binary(values):
+    right = values.pop()
+    operator = values.pop()
+    values.append(BinaryOpNode(values.pop(), operator, right))
+
+ACTION_FUNCTIONS = [globals()['_' + action[1:]] for action in ACTIONS]
+
+# --- Parser ---
+class LL1Parser:
+    """Parses a token sequence or iterable with the LL(1) table.
+
+    Errors use Parser's messages for a missing or unexpected token.
+    """
+
+    def __init__(self, tokens) -> None:
+        self.tokens = tokens
+
+    def parse_program(self) -> ProgramNode:
+        """<program> ::= <function>+, with the same AST as Parser.parse_program()."""
+        token_codes, kind_codes = _TOKEN_CODES, _KIND_CODES
+        table, productions, consumes, actions = TABLE, PRODUCTIONS, CONSUMES, ACTION_FUNCTIONS
+        value_codes = _VALUE_CODES
+        terminal_count, action_base, width = TERMINAL_COUNT, ACTION_BASE, TABLE_WIDTH
+
+        tokens = iter(self.tokens)
+        pos = 0
+        token = next(tokens, None)
+        # Code 0 is END, which no token has, so a missing code falls through to the kind
+        code = END_CODE if token is None else token_codes.get(token) or kind_codes.get(token[0], _UNKNOWN_TERMINAL)
+
+        values = []
+        stack = [END_CODE, _CODES[START]]
+        while stack:
+            symbol = stack.pop()
+            if symbol >= action_base:
+                actions[symbol - action_base](values)
+                continue
+            if symbol >= terminal_count:
+                production = table[(symbol - terminal_count) * width + code]
+                if production < 0:
+                    raise self._error(self._expected(symbol), token, pos)
+                stack.extend(productions[production])
+                consumed = consumes[production]
+                if not consumed:
+                    continue
+                # The production starts with the lookahead terminal: match it now
+                if consumed is not True:
+                    values.append(consumed(token[1]))
+                    pos += 1
+                    token = next(tokens, None)
+                    code = END_CODE if token is None else token_codes.get(token) or kind_codes.get(token[0], _UNKNOWN_TERMINAL)
+                    continue
+            elif symbol != code:
+                raise self._error([TERMINALS[symbol]], token, pos)
+            elif symbol == END_CODE:
+                break
+            if code in value_codes:
+                values.append(token[1])
+            pos += 1
+            token = next(tokens, None)
+            code = END_CODE if token is None else token_codes.get(token) or kind_codes.get(token[0], _UNKNOWN_TERMINAL)
+        return values[0]
+
+    def _expected(self, symbol: int) -> list[str]:
+        """Terminals the table accepts for a nonterminal, for error messages."""
+        base = (symbol - TERMINAL_COUNT) * TABLE_WIDTH
+        return sorted(TERMINALS[code] for code in range(TERMINAL_COUNT) if TABLE[base + code] >= 0)
+
+    def _error(self, expected: list[str], token, pos: int) -> SyntaxError:
+        expected_text = ' or '.join('end of input' if symbol == END else symbol for symbol in expected)
+        if token is None:
+            return SyntaxError(Parser._UNEXPECTED_EOF_EXPECTED_TYPE.format(expected_text))
+        position = str(pos)
+        if hasattr(self.tokens, 'position'):
+            line, column = self.tokens.position(pos)
+            position = f"{pos} (line {line}, column {column})"
+        return SyntaxError(Parser._UNEXPECTED_TOKEN_TYPE.format(expected_text, token[0], token[1], f"at position {position}"))
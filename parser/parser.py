@@ -1,5 +1,11 @@
 # Parser
 
+import itertools
+from collections import deque
+from collections.abc import Iterable
+
+from parser.visitor import NodeVisitor
+
 # --- AST Nodes ---
 class ASTNode:
     """Base class for all AST nodes."""
@@ -10,6 +16,8 @@ class ProgramNode(ASTNode):
         self.functions = functions # List of FunctionNode
 
 class FunctionNode(ASTNode):
+    local_symbols = None # Symbols of the function's variables by frame slot, set by the semantic analyzer
+
     def __init__(self, type_name, name, block, return_expression):
         self.type_name = type_name # str (e.g., 'int')
         self.name = name # str (identifier)
@@ -21,12 +29,16 @@ class BlockNode(ASTNode):
         self.statements = statements # List of DeclarationNode, AssignmentNode, ConditionalNode, PrintNode, FunctionCallNode
 
 class DeclarationNode(ASTNode):
+    symbol = None # Symbol declared here, set by the semantic analyzer
+
     def __init__(self, type_name, name, expression=None):
         self.type_name = type_name # str (e.g., 'int')
         self.name = name # str (identifier)
         self.expression = expression # Optional: ExpressionNode (for initialization)
 
 class AssignmentNode(ASTNode):
+    symbol = None # Symbol assigned to, set by the semantic analyzer
+
     def __init__(self, identifier_name, expression):
         self.identifier_name = identifier_name # str
         self.expression = expression # ExpressionNode
@@ -52,6 +64,8 @@ class FunctionCallNode(ASTNode):
 
 # Expression Node Types
 class IdentifierNode(ASTNode):
+    symbol = None # Symbol the name resolves to, set by the semantic analyzer
+
     def __init__(self, name):
         self.name = name # str
 
@@ -69,6 +83,51 @@ class BinaryOpNode(ASTNode):
         self.operator = operator # str (e.g., '+', '==')
         self.right = right # ExpressionNode
 
+# Fields of each node type in constructor order: 'node' (a child node or
+# None), 'string' or 'list' (a list of child nodes). The position in this
+# tuple is also the node's tag in the binary format of dump_ast/load_ast, so
+# new node types go at the end.
+NODE_LAYOUTS = (
+    (ProgramNode, (('functions', 'list'),)),
+    (FunctionNode, (('type_name', 'string'), ('name', 'string'), ('block', 'node'), ('return_expression', 'node'))),
+    (BlockNode, (('statements', 'list'),)),
+    (DeclarationNode, (('type_name', 'string'), ('name', 'string'), ('expression', 'node'))),
+    (AssignmentNode, (('identifier_name', 'string'), ('expression', 'node'))),
+    (ConditionalNode, (('condition', 'node'), ('if_block', 'node'), ('else_block', 'node'))),
+    (WhileNode, (('condition', 'node'), ('block', 'node'))),
+    (PrintNode, (('expression', 'node'),)),
+    (FunctionCallNode, (('name', 'string'),)),
+    (IdentifierNode, (('name', 'string'),)),
+    (ConstantNode, (('value', 'string'),)),
+    (LiteralNode, (('value', 'string'),)),
+    (BinaryOpNode, (('left', 'node'), ('operator', 'string'), ('right', 'node')))
+)
+
+# NODE_LAYOUTS by class name. The views of parser.flat subclass the node
+# classes under the same names, so they find their layout here too.
+LAYOUTS_BY_NAME = {node_class.__name__: layout for node_class, layout in NODE_LAYOUTS}
+
+# Child fields in the order iter_nodes pushes them, last first
+_CHILD_FIELDS = {class_name: tuple((name, field_type) for name, field_type in reversed(layout) if field_type != 'string')
+                 for class_name, layout in LAYOUTS_BY_NAME.items()}
+
+def iter_nodes(node: ASTNode):
+    """Yield node and every node below it, parents first, without recursing."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        for name, field_type in _CHILD_FIELDS[type(node).__name__]:
+            value = getattr(node, name)
+            if field_type == 'list':
+                stack.extend(reversed(value))
+            elif value is not None:
+                stack.append(value)
+
+# Parsing engines: the recursive-descent methods of Parser, or the
+# table-driven LL(1) parser in parser.ll1 (for parse_program only)
+PARSER_ENGINES = ('recursive', 'll1')
+
 # --- Parser Class ---
 class Parser:
     # Error Message Templates
@@ -83,23 +142,60 @@ class Parser:
     _UNEXPECTED_EOF_EXPECTED_EXPRESSION = "Unexpected end of input expected expression at position {}."
     _EXPECTED_IDENTIFIER_OR_CONSTANT_EXPRESSION = "Expected identifier or constant for expression got {} value {} at position {}."
 
-    def __init__(self, tokens: list[tuple[str, str]]):
+    def __init__(self, tokens: list[tuple[str, str]] | Iterable[tuple[str, str]], engine: str = 'recursive'):
+        if engine not in PARSER_ENGINES:
+            raise ValueError(f"Unknown parser engine '{engine}'. Expected one of {', '.join(PARSER_ENGINES)}.")
+        self.engine = engine
+        # A list or TokenStream is indexed directly. Any other iterable (such
+        # as a generator fed by the lexer) is pulled one token at a time, and
+        # at most the current token and the one after it are held in memory.
         self.tokens = tokens
         self.pos = 0
-        self.current_token = self.tokens[self.pos] if self.pos < len(self.tokens) else None
+        if hasattr(tokens, '__getitem__') and hasattr(tokens, '__len__'):
+            self._stream = None
+            self.current_token = self.tokens[self.pos] if self.pos < len(self.tokens) else None
+        else:
+            self._stream = iter(tokens)
+            self._lookahead = deque(maxlen=1) # The token after current_token, once peeked
+            self.current_token = next(self._stream, None)
 
     def advance(self) -> None:
         """Advance to the next token."""
         self.pos += 1
-        if self.pos < len(self.tokens):
+        if self._stream is not None:
+            self.current_token = self._lookahead.popleft() if self._lookahead else next(self._stream, None)
+        elif self.pos < len(self.tokens):
             self.current_token = self.tokens[self.pos]
         else:
             self.current_token = None
 
+    def peek(self) -> tuple[str, str] | None:
+        """Return the token after the current one without advancing."""
+        if self._stream is None:
+            return self.tokens[self.pos + 1] if self.pos + 1 < len(self.tokens) else None
+        if not self._lookahead:
+            token = next(self._stream, None)
+            if token is None:
+                return None
+            self._lookahead.append(token)
+        return self._lookahead[0]
+
+    def _position_info(self) -> str:
+        """Describe where the current token is, for error messages."""
+        if self.current_token is None:
+            return "at end of input"
+        return f"at position {self._format_position(self.pos)}"
+
+    def _format_position(self, pos: int) -> str:
+        """Index of the current token, plus line and column when the tokens can resolve them."""
+        if hasattr(self.tokens, 'position') and self.current_token is not None:
+            line, column = self.tokens.position(pos)
+            return f"{pos} (line {line}, column {column})"
+        return str(pos)
+
     def consume(self, expected_type: str, expected_value: str | None = None) -> tuple[str, str]:
         """Consume the current token if it matches expectations, or raise SyntaxError."""
         token = self.current_token
-        current_pos_info = f"at position {self.pos}" if self.pos < len(self.tokens) else "at end of input"
 
         if token is None:
             if expected_value:
@@ -109,15 +205,26 @@ class Parser:
 
         token_kind, token_value = token
         if token_kind != expected_type:
-            raise SyntaxError(self._UNEXPECTED_TOKEN_TYPE.format(expected_type, token_kind, token_value, current_pos_info))
+            raise SyntaxError(self._UNEXPECTED_TOKEN_TYPE.format(expected_type, token_kind, token_value, self._position_info()))
         if expected_value is not None and token_value != expected_value:
-            raise SyntaxError(self._UNEXPECTED_TOKEN_VALUE.format(expected_value, expected_type, token_value, current_pos_info))
+            raise SyntaxError(self._UNEXPECTED_TOKEN_VALUE.format(expected_value, expected_type, token_value, self._position_info()))
 
         self.advance()
         return token
 
     def parse_program(self) -> ProgramNode:
         """<program> ::= <function>+"""
+        if self.engine == 'll1':
+            # Imported here because parser.ll1 imports the node classes from this module
+            from parser import ll1
+            if self._stream is None:
+                remaining = self.tokens[self.pos:] if self.pos else self.tokens
+            else:
+                remaining = itertools.chain(self._lookahead, self._stream)
+                if self.current_token is not None:
+                    remaining = itertools.chain((self.current_token,), remaining)
+            return ll1.LL1Parser(remaining).parse_program()
+
         functions = []
         while self.current_token is not None:
             functions.append(self.parse_function())
@@ -167,12 +274,12 @@ class Parser:
                 statements.append(self.parse_print_statement())
             elif token_kind == 'identifier':
                 # Look ahead to distinguish between assignment and function call
-                if self.pos + 1 < len(self.tokens) and self.tokens[self.pos + 1] == ('punctuation', '('):
+                if self.peek() == ('punctuation', '('):
                     statements.append(self.parse_function_call())
                 else:
                     statements.append(self.parse_statement())
             else:
-                raise SyntaxError(self._UNEXPECTED_TOKEN_IN_BLOCK.format(token_value, token_kind, self.pos))
+                raise SyntaxError(self._UNEXPECTED_TOKEN_IN_BLOCK.format(token_value, token_kind, self._format_position(self.pos)))
         return BlockNode(statements)
 
     def parse_declaration(self) -> DeclarationNode:
@@ -233,7 +340,7 @@ class Parser:
         self.consume('punctuation', '(')
         expression: ASTNode
         if self.current_token is None:
-            raise SyntaxError(self._UNEXPECTED_EOF_AFTER_PRINT.format(self.pos))
+            raise SyntaxError(self._UNEXPECTED_EOF_AFTER_PRINT.format(self._format_position(self.pos)))
         if self.current_token[0] == 'literal':
             _, value = self.consume('literal')
             expression = LiteralNode(value)
@@ -242,7 +349,7 @@ class Parser:
             expression = IdentifierNode(name)
         else:
             tk, tv = self.current_token
-            raise SyntaxError(self._EXPECTED_LITERAL_OR_IDENTIFIER_PRINT.format(tk, tv, self.pos))
+            raise SyntaxError(self._EXPECTED_LITERAL_OR_IDENTIFIER_PRINT.format(tk, tv, self._format_position(self.pos)))
         self.consume('punctuation', ')')
         self.consume('punctuation', ';')
         return PrintNode(expression)
@@ -260,7 +367,7 @@ class Parser:
            <simple_expression> ::= <identifier> | <constant>
         """
         if not self.current_token:
-            raise SyntaxError(self._UNEXPECTED_EOF_EXPECTED_EXPRESSION.format(self.pos))
+            raise SyntaxError(self._UNEXPECTED_EOF_EXPECTED_EXPRESSION.format(self._format_position(self.pos)))
 
         token_kind, token_value = self.current_token
         if token_kind == 'identifier':
@@ -270,7 +377,7 @@ class Parser:
             self.consume('constant')
             return ConstantNode(token_value)
         else:
-            raise SyntaxError(self._EXPECTED_IDENTIFIER_OR_CONSTANT_EXPRESSION.format(token_kind, token_value, self.pos))
+            raise SyntaxError(self._EXPECTED_IDENTIFIER_OR_CONSTANT_EXPRESSION.format(token_kind, token_value, self._format_position(self.pos)))
 
     def parse_expression(self) -> ASTNode:
         """<expression> ::= <simple_expression> { <operator> <simple_expression> }*
@@ -290,65 +397,259 @@ class Parser:
             node = BinaryOpNode(left=node, operator=operator, right=right_node)
         return node
 
-# Simple AST printer
-def print_ast(node, indent=0):
-    if node is None: return
-    prefix = "  " * indent
-
-    if isinstance(node, ProgramNode):
+# --- Binary AST format ---
+#
+# The magic bytes, the format version, the string table (count, then each
+# string's UTF-8 length and bytes) and the nodes in post-order. A node is its
+# tag (1 + its index in NODE_LAYOUTS, 0 for a missing child) followed by its
+# string ids and list lengths; its child nodes are the ones just before it.
+# Every integer is a varint: 7 bits per byte, low bits first, high bit set
+# on all but the last byte.
+AST_MAGIC = b'G5AST'
+AST_FORMAT_VERSION = 1
+
+_LAYOUT_TAGS = {node_class.__name__: tag for tag, (node_class, _) in enumerate(NODE_LAYOUTS, 1)}
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def dump_ast(node: ASTNode) -> bytes:
+    """Encode an AST (or any subtree) in the compact binary format."""
+    strings: dict[str, int] = {}
+    body = bytearray()
+    stack = [(node, False)]
+    while stack:
+        current, children_written = stack.pop()
+        if current is None:
+            body.append(0)
+            continue
+        # By name, so flat AST views encode like the nodes they stand for
+        tag = _LAYOUT_TAGS[type(current).__name__]
+        layout = NODE_LAYOUTS[tag - 1][1]
+        if not children_written:
+            stack.append((current, True))
+            for name, field_type in reversed(layout):
+                if field_type == 'node':
+                    stack.append((getattr(current, name), False))
+                elif field_type == 'list':
+                    stack.extend((child, False) for child in reversed(getattr(current, name)))
+            continue
+
+        _write_varint(body, tag)
+        for name, field_type in layout:
+            if field_type == 'string':
+                value = getattr(current, name)
+                string_id = strings.get(value)
+                if string_id is None:
+                    string_id = strings[value] = len(strings)
+                _write_varint(body, string_id)
+            elif field_type == 'list':
+                _write_varint(body, len(getattr(current, name)))
+
+    header = bytearray(AST_MAGIC)
+    _write_varint(header, AST_FORMAT_VERSION)
+    _write_varint(header, len(strings))
+    for value in strings:
+        encoded = value.encode('utf-8')
+        _write_varint(header, len(encoded))
+        header += encoded
+    return bytes(header + body)
+
+def load_ast(data: bytes) -> ASTNode:
+    """Decode an AST written by dump_ast, raising ValueError for bad data."""
+    if not data.startswith(AST_MAGIC):
+        raise ValueError("Not a binary AST: wrong magic bytes.")
+    length = len(data)
+    pos = len(AST_MAGIC)
+
+    def read_varint() -> int:
+        nonlocal pos
+        value = shift = 0
+        while True:
+            if pos >= length:
+                raise ValueError("Truncated binary AST.")
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    version = read_varint()
+    if version != AST_FORMAT_VERSION:
+        raise ValueError(f"Unsupported binary AST version {version}, expected {AST_FORMAT_VERSION}.")
+
+    strings = []
+    for _ in range(read_varint()):
+        size = read_varint()
+        if pos + size > length:
+            raise ValueError("Truncated binary AST.")
+        strings.append(str(data[pos:pos + size], 'utf-8'))
+        pos += size
+
+    # (node class, field types) per tag, with tag 0 for a missing child
+    layouts = [None] + [(node_class, [field_type for _, field_type in layout]) for node_class, layout in NODE_LAYOUTS]
+    stack = []
+    try:
+        while pos < length:
+            byte = data[pos]
+            if byte < 0x80: # Every tag fits in one byte
+                pos += 1
+                tag = byte
+            else:
+                tag = read_varint()
+            if tag == 0:
+                stack.append(None)
+                continue
+            node_class, field_types = layouts[tag]
+
+            if field_types == ['string']:
+                # Identifiers, constants, literals and calls: the bulk of a tree
+                byte = data[pos]
+                if byte < 0x80:
+                    pos += 1
+                    stack.append(node_class(strings[byte]))
+                    continue
+
+            # Read this node's own fields, counting the children it takes from the stack
+            values = []
+            child_count = 0
+            for field_type in field_types:
+                if field_type == 'node':
+                    child_count += 1
+                    values.append(None)
+                else:
+                    byte = data[pos]
+                    if byte < 0x80:
+                        pos += 1
+                        value = byte
+                    else:
+                        value = read_varint()
+                    if field_type == 'string':
+                        values.append(strings[value])
+                    else:
+                        child_count += value
+                        values.append(value)
+
+            children = stack[len(stack) - child_count:] if child_count else ()
+            if len(children) != child_count:
+                raise ValueError("Invalid binary AST: a node has fewer children than it needs.")
+            if child_count:
+                del stack[len(stack) - child_count:]
+            next_child = 0
+            for index, field_type in enumerate(field_types):
+                if field_type == 'node':
+                    values[index] = children[next_child]
+                    next_child += 1
+                elif field_type == 'list':
+                    values[index] = list(children[next_child:next_child + values[index]])
+                    next_child += len(values[index])
+            stack.append(node_class(*values))
+    except (IndexError, TypeError) as error:
+        raise ValueError(f"Invalid binary AST: {error}.") from error
+
+    if len(stack) != 1 or stack[0] is None:
+        raise ValueError("Invalid binary AST: it does not hold exactly one tree.")
+    return stack[0]
+
+# --- AST printing ---
+
+class _ASTPrinter(NodeVisitor):
+    """Prints an indented outline of the tree; children are yielded, not recursed into."""
+
+    def __init__(self, indent: int) -> None:
+        self.indent = indent
+
+    def _child(self, node, extra_indent: int):
+        self.indent += extra_indent
+        yield node
+        self.indent -= extra_indent
+
+    @property
+    def prefix(self) -> str:
+        return "  " * self.indent
+
+    def visit_NoneType(self, node):
+        pass
+
+    def visit_ProgramNode(self, node):
         print(f"ProgramNode:")
         for func in node.functions:
-            print_ast(func, indent + 1)
-    elif isinstance(node, FunctionNode):
+            yield from self._child(func, 1)
+
+    def visit_FunctionNode(self, node):
+        prefix = self.prefix
         print(f"{prefix}FunctionNode: {node.name}() -> {node.type_name}")
         print(f"{prefix}  Block:")
-        print_ast(node.block, indent + 2)
+        yield from self._child(node.block, 2)
         print(f"{prefix}  Return:")
-        print_ast(node.return_expression, indent + 2)
-    elif isinstance(node, BlockNode):
+        yield from self._child(node.return_expression, 2)
+
+    def visit_BlockNode(self, node):
         if not node.statements:
-            print(f"{prefix}  (empty)")
+            print(f"{self.prefix}  (empty)")
         for stmt in node.statements:
-            print_ast(stmt, indent + 1)
-    elif isinstance(node, DeclarationNode):
+            yield from self._child(stmt, 1)
+
+    def visit_DeclarationNode(self, node):
+        prefix = self.prefix
         print(f"{prefix}DeclarationNode: {node.name} ({node.type_name})")
         if node.expression:
             print(f"{prefix}  Initializer:")
-            print_ast(node.expression, indent + 2)
-    elif isinstance(node, AssignmentNode):
-        print(f"{prefix}AssignmentNode: {node.identifier_name} =")
-        print_ast(node.expression, indent + 1)
-    elif isinstance(node, ConditionalNode):
+            yield from self._child(node.expression, 2)
+
+    def visit_AssignmentNode(self, node):
+        print(f"{self.prefix}AssignmentNode: {node.identifier_name} =")
+        yield from self._child(node.expression, 1)
+
+    def visit_ConditionalNode(self, node):
+        prefix = self.prefix
         print(f"{prefix}ConditionalNode:")
         print(f"{prefix}  Condition:")
-        print_ast(node.condition, indent + 1)
+        yield from self._child(node.condition, 1)
         print(f"{prefix}  If True:")
-        print_ast(node.if_block, indent + 1)
+        yield from self._child(node.if_block, 1)
         if node.else_block:
             print(f"{prefix}  Else:")
-            print_ast(node.else_block, indent + 1)
-    elif isinstance(node, WhileNode):
+            yield from self._child(node.else_block, 1)
+
+    def visit_WhileNode(self, node):
+        prefix = self.prefix
         print(f"{prefix}WhileNode:")
         print(f"{prefix}  Condition:")
-        print_ast(node.condition, indent + 1)
+        yield from self._child(node.condition, 1)
         print(f"{prefix}  Block:")
-        print_ast(node.block, indent + 1)
-    elif isinstance(node, PrintNode):
-        print(f"{prefix}PrintNode:")
-        print_ast(node.expression, indent + 1)
-    elif isinstance(node, FunctionCallNode):
-        print(f"{prefix}FunctionCallNode: name={node.name}")
-    elif isinstance(node, IdentifierNode):
-        print(f"{prefix}IdentifierNode: {node.name}")
-    elif isinstance(node, ConstantNode):
-        print(f"{prefix}ConstantNode: {node.value}")
-    elif isinstance(node, LiteralNode):
-        print(f"{prefix}LiteralNode: \"{node.value}\"")
-    elif isinstance(node, BinaryOpNode):
+        yield from self._child(node.block, 1)
+
+    def visit_PrintNode(self, node):
+        print(f"{self.prefix}PrintNode:")
+        yield from self._child(node.expression, 1)
+
+    def visit_FunctionCallNode(self, node):
+        print(f"{self.prefix}FunctionCallNode: name={node.name}")
+
+    def visit_IdentifierNode(self, node):
+        print(f"{self.prefix}IdentifierNode: {node.name}")
+
+    def visit_ConstantNode(self, node):
+        print(f"{self.prefix}ConstantNode: {node.value}")
+
+    def visit_LiteralNode(self, node):
+        print(f"{self.prefix}LiteralNode: \"{node.value}\"")
+
+    def visit_BinaryOpNode(self, node):
+        prefix = self.prefix
         print(f"{prefix}BinaryOpNode: {node.operator}")
         print(f"{prefix}  Left:")
-        print_ast(node.left, indent + 1)
+        yield from self._child(node.left, 1)
         print(f"{prefix}  Right:")
-        print_ast(node.right, indent + 1)
-    else:
-        print(f"{prefix}Unknown ASTNode: {type(node)}")
+        yield from self._child(node.right, 1)
+
+    def generic_visit(self, node):
+        print(f"{self.prefix}Unknown ASTNode: {type(node)}")
+
+def print_ast(node, indent=0):
+    _ASTPrinter(indent).visit(node)
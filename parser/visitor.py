@@ -0,0 +1,69 @@
+# AST visitors
+#
+# Deep trees (an expression with thousands of operands is a left-deep chain
+# of BinaryOpNodes) would overflow the Python call stack if walked
+# recursively, so walkers keep the path to the current node in a list.
+
+from types import GeneratorType
+
+def visit_iteratively(visit, node):
+    """Return visit(node), where visit walks the tree without recursing.
+
+    visit returns a node's result directly, or a generator for a node with
+    children: the generator yields each child node, receives the child's
+    result back from the yield, and returns the node's own result. The
+    generators of the nodes above the current one wait on an explicit stack,
+    so the depth of the tree never reaches the Python call stack.
+    """
+    result = visit(node)
+    if type(result) is not GeneratorType:
+        return result
+    stack = [result]
+    result = None
+    while stack:
+        try:
+            child = stack[-1].send(result)
+        except StopIteration as stop:
+            stack.pop()
+            result = stop.value
+        else:
+            result = visit(child)
+            if type(result) is GeneratorType:
+                stack.append(result)
+                result = None
+    return result
+
+class NodeVisitor:
+    """Base class for walkers with a visit_<ClassName> method per node class.
+
+    The method for a node class is looked up once per visitor class and
+    cached by type(node), instead of building its name and calling getattr
+    for every node. Classes without a method go to generic_visit. Methods of
+    nodes with children may be generators, as described in
+    visit_iteratively, which visit() runs them with.
+    """
+    _visitors: dict[type, object] = {}
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._visitors = {} # Node class -> unbound visit method, filled on first use
+
+    def visit(self, node):
+        visitors = self._visitors
+
+        def dispatch(node):
+            method = visitors.get(type(node))
+            if method is None:
+                method = self._cache_visitor(type(node))
+            return method(self, node)
+
+        return visit_iteratively(dispatch, node)
+
+    @classmethod
+    def _cache_visitor(cls, node_class: type):
+        method = getattr(cls, f'visit_{node_class.__name__}', None) or cls.generic_visit
+        cls._visitors[node_class] = method
+        return method
+
+    def generic_visit(self, node):
+        raise NotImplementedError(f"No visit_{type(node).__name__} method defined for {type(self).__name__}.")
@@ -0,0 +1,67 @@
+# Saving and restoring the analyzer's annotations
+#
+# The semantic analyzer gives identifiers, assignments and declarations their
+# Symbol and each FunctionNode its local symbols. The parallel analyzer sends
+# these from its workers, and the incremental analyzer keeps them for
+# functions it does not check again, as plain data rather than node objects.
+
+from array import array
+
+from parser.parser import AssignmentNode, DeclarationNode, FunctionNode, IdentifierNode, iter_nodes
+from semanter.semanter import Symbol, SymbolTable
+
+# Names of the node classes the analyzer gives a symbol
+ANNOTATED_CLASSES = {DeclarationNode.__name__, AssignmentNode.__name__, IdentifierNode.__name__}
+
+# (name, type, scope level) of each local in slot order, the names of the
+# globals the function's nodes refer to, and per annotated node its symbol:
+# a slot, or -1 - i for the i-th global name
+SavedAnnotations = tuple[list[tuple[str, str, int]], list[str], array]
+
+def annotated_nodes(function: FunctionNode) -> list:
+    """The nodes of a function that the analyzer gives a symbol, in pre-order.
+
+    The n-th node of a copy of the function (in a worker, or parsed again)
+    is the n-th node of the original.
+    """
+    return [node for node in iter_nodes(function) if type(node).__name__ in ANNOTATED_CLASSES]
+
+def save_annotations(function: FunctionNode, nodes: list | None = None) -> SavedAnnotations:
+    """The annotations of an analyzed function, as data that pickles compactly.
+
+    nodes is annotated_nodes(function), if the caller already has it.
+    """
+    global_names = []
+    global_indexes = {}
+    slots = array('i')
+    for node in nodes if nodes is not None else annotated_nodes(function):
+        symbol = node.symbol
+        if symbol.slot is not None:
+            slots.append(symbol.slot)
+            continue
+        index = global_indexes.get(symbol.name)
+        if index is None:
+            index = global_indexes[symbol.name] = len(global_names)
+            global_names.append(symbol.name)
+        slots.append(-1 - index)
+    local_symbols = [(symbol.name, symbol.type, symbol.scope_level) for symbol in function.local_symbols]
+    return local_symbols, global_names, slots
+
+def restore_annotations(function: FunctionNode, saved: SavedAnnotations, symbol_table: SymbolTable,
+                        nodes: list | None = None) -> None:
+    """Annotate a function like the analyzer did, from save_annotations of it or an identical copy.
+
+    Local symbols are made again, interned in the table's SymbolInterner, and
+    globals are looked up in symbol_table, which must be in the global scope.
+    nodes is annotated_nodes(function), if the caller already has it.
+    """
+    local_symbols, global_names, slots = saved
+    symbols = symbol_table.symbols
+    resolved = function.local_symbols = []
+    for slot, (name, type_name, scope_level) in enumerate(local_symbols):
+        symbol = Symbol(name, type_name, scope_level, symbols.intern(name))
+        symbol.slot = slot
+        resolved.append(symbol)
+    global_symbols = [symbol_table.lookup(name) for name in global_names]
+    for node, slot in zip(nodes if nodes is not None else annotated_nodes(function), slots):
+        node.symbol = resolved[slot] if slot >= 0 else global_symbols[-1 - slot]
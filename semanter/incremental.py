@@ -0,0 +1,142 @@
+# Incremental semantic analysis
+
+from lexer.symbols import SymbolInterner
+from parser.parser import FunctionNode, LAYOUTS_BY_NAME, ProgramNode, iter_nodes
+from semanter.annotations import ANNOTATED_CLASSES, SavedAnnotations, restore_annotations, save_annotations
+from semanter.semanter import SemanticAnalyzer, SemanticError, SymbolTable
+
+class _RecordingSymbolTable(SymbolTable):
+    """A SymbolTable noting the global names looked up, and what they were."""
+
+    def __init__(self, symbols: SymbolInterner | None = None):
+        super().__init__(symbols)
+        # Name -> type of its global symbol, or None if there was none; None
+        # while not checking a function
+        self.dependencies = None
+
+    def lookup(self, name):
+        symbol = super().lookup(name)
+        if self.dependencies is not None:
+            if symbol is None:
+                self.dependencies[name] = None
+            elif symbol.scope_level == 0:
+                self.dependencies[name] = symbol.type
+        return symbol
+
+def structure(function: FunctionNode) -> tuple[tuple, list]:
+    """A key equal for functions with the same tree, and the function's annotated_nodes.
+
+    The key lists, in pre-order, every node's class and string fields, every
+    list's length and whether each optional child is there. The same walk
+    collects the annotated nodes, in the order of annotated_nodes. A tuple
+    rather than a digest: it is as quick to build and hash, and equal keys
+    always mean equal trees.
+    """
+    parts = []
+    nodes = []
+    for node in iter_nodes(function):
+        class_name = type(node).__name__
+        parts.append(class_name)
+        if class_name in ANNOTATED_CLASSES:
+            nodes.append(node)
+        for name, field_type in LAYOUTS_BY_NAME[class_name]:
+            value = getattr(node, name)
+            if field_type == 'string':
+                parts.append(value)
+            elif field_type == 'list':
+                parts.append(len(value))
+            else:
+                parts.append(value is not None)
+    return tuple(parts), nodes
+
+class _FunctionResult:
+    """What checking one function gave, and the globals the outcome depends on."""
+    __slots__ = ('key', 'dependencies', 'error', 'annotations')
+
+    def __init__(self, key: tuple, dependencies: dict[str, str | None], error: str | None,
+                 annotations: SavedAnnotations | None) -> None:
+        self.key = key # structure() key of the function
+        self.dependencies = dependencies
+        self.error = error # Message of the SemanticError it raised
+        self.annotations = annotations # Saved annotations, if it passed
+
+    def still_valid(self, symbol_table: SymbolTable) -> bool:
+        """Whether every global the function looked up is still what it was."""
+        for name, type_name in self.dependencies.items():
+            symbol = symbol_table.lookup(name)
+            if (symbol.type if symbol is not None else None) != type_name:
+                return False
+        return True
+
+class IncrementalAnalyzer:
+    """Semantic analysis that re-checks only what changed since the last run.
+
+    analyze() raises the same SemanticError as SemanticAnalyzer().analyze()
+    and annotates the nodes the same way. It keeps the outcome of checking
+    each function, keyed by the FunctionNode object and by its structure,
+    along with the global names the function looked up: the functions it
+    calls, its own signature, and names that were not declared. The global
+    declarations are always made again, which is cheap. A function is only
+    checked again if it is new or edited, or if one of the globals it looked
+    up was added, removed or changed type. Unchanged FunctionNodes kept by
+    parser.incremental.IncrementalParser are found by identity at almost no
+    cost. Those of a fresh parse are found by structure, which takes a walk
+    of the function but no checks.
+
+    FunctionNodes must not be changed in place after they were analyzed.
+    """
+
+    def __init__(self, symbols: SymbolInterner | None = None) -> None:
+        self.symbols = symbols if symbols is not None else SymbolInterner()
+        self._by_node: dict[int, tuple[FunctionNode, _FunctionResult]] = {} # id(function) -> (function, result)
+        self._by_key: dict[tuple, _FunctionResult] = {} # structure() key -> result
+        self.rechecked: list[int] = [] # Indexes of the functions checked by the last analyze()
+
+    def analyze(self, ast_root: ProgramNode) -> None:
+        if not isinstance(ast_root, ProgramNode):
+            raise SemanticError("AST root must be a ProgramNode.")
+        analyzer = SemanticAnalyzer(self.symbols)
+        symbol_table = analyzer.symbol_table = _RecordingSymbolTable(self.symbols)
+        analyzer.declare_functions(ast_root.functions)
+
+        self.rechecked = []
+        by_node, by_key = {}, {}
+        try:
+            for index, function in enumerate(ast_root.functions):
+                cached = self._by_node.get(id(function))
+                if cached is not None and cached[0] is function:
+                    # The very same nodes, which still carry their annotations
+                    result = cached[1]
+                    key, nodes = result.key, None
+                else:
+                    key, nodes = structure(function)
+                    result = self._by_key.get(key)
+                if result is None or not result.still_valid(symbol_table):
+                    result = self._check(analyzer, function, key, nodes)
+                    self.rechecked.append(index)
+                elif nodes is not None and result.annotations is not None:
+                    restore_annotations(function, result.annotations, symbol_table, nodes)
+                by_node[id(function)] = (function, result)
+                by_key[key] = result
+                if result.error is not None:
+                    raise SemanticError(result.error)
+        except SemanticError:
+            # The functions after the error were not looked at, so keep what is known about them
+            self._by_node.update(by_node)
+            self._by_key.update(by_key)
+            raise
+        # Forget the functions that are gone
+        self._by_node = by_node
+        self._by_key = by_key
+
+    def _check(self, analyzer: SemanticAnalyzer, function: FunctionNode, key: tuple,
+               nodes: list | None) -> _FunctionResult:
+        symbol_table = analyzer.symbol_table
+        dependencies = symbol_table.dependencies = {}
+        try:
+            analyzer.visit(function)
+        except SemanticError as error:
+            return _FunctionResult(key, dependencies, str(error), None)
+        finally:
+            symbol_table.dependencies = None
+        return _FunctionResult(key, dependencies, None, save_annotations(function, nodes))
@@ -0,0 +1,84 @@
+# Parallel semantic analysis
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from lexer.symbols import SymbolInterner
+from parser.parallel import BATCHES_PER_WORKER, batch_spans
+from parser.parser import FunctionNode, ProgramNode
+from semanter.annotations import restore_annotations, save_annotations
+from semanter.semanter import SemanticAnalyzer, SemanticError
+
+# bench_parallel_semanter checks a generated function in 0.2-0.3 ms here, so
+# 2,000 of them are around half a second of work. Below that, the ~10 ms
+# pool start-up and the parent's annotation walk, about a third of a
+# sequential analysis, leave little to gain.
+PARALLEL_THRESHOLD = 2_000
+
+# Set in each worker by _start_worker: the analyzer after the global
+# declaration pass, and the functions to check
+_analyzer = None
+_functions = None
+
+def _start_worker(analyzer: SemanticAnalyzer, functions: list[FunctionNode]) -> None:
+    # Forked workers inherit these without pickling
+    global _analyzer, _functions
+    _analyzer = analyzer
+    _functions = functions
+
+def _check_batch(batch: tuple[int, int]):
+    """Check the functions of a batch in order, stopping at the first error.
+
+    Returns the saved annotations of each function that passed. A
+    SemanticError ends the list with its message.
+    """
+    results = []
+    for function in _functions[batch[0]:batch[1]]:
+        try:
+            _analyzer.visit(function)
+        except SemanticError as error:
+            results.append(str(error))
+            break
+        results.append(save_annotations(function))
+    return results
+
+def parallel_analyze(ast_root: ProgramNode, symbols: SymbolInterner | None = None,
+                     workers: int | None = None, threshold: int = PARALLEL_THRESHOLD) -> SemanticAnalyzer:
+    """Analyze a program with its function bodies checked in a process pool.
+
+    Does what SemanticAnalyzer(symbols).analyze(ast_root) does and returns
+    the analyzer. The functions are first declared in the global scope here,
+    and after that each function body only reads that scope, so the pool's
+    workers (forked, so they share the tree without pickling it) check
+    batches of functions independently. Each batch stops at its first error,
+    and the batches are read back in source order, so the error raised is the
+    one the sequential analyzer would raise. Workers send back the symbols
+    they resolved (see semanter.annotations), which the nodes here are
+    annotated with.
+
+    Programs with fewer than threshold functions, flat ASTs, a single worker,
+    or no 'fork' start method are analyzed sequentially.
+    """
+    analyzer = SemanticAnalyzer(symbols)
+    workers = workers or os.cpu_count() or 1
+    # Views of a flat AST are made on each access, so they could not keep annotations
+    if (workers < 2 or type(ast_root) is not ProgramNode or len(ast_root.functions) < threshold
+            or 'fork' not in multiprocessing.get_all_start_methods()):
+        analyzer.analyze(ast_root)
+        return analyzer
+
+    functions = ast_root.functions
+    analyzer.declare_functions(functions)
+    # Every function counts the same
+    batches = batch_spans([(index, index + 1) for index in range(len(functions))], workers * BATCHES_PER_WORKER)
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches)), mp_context=multiprocessing.get_context('fork'),
+                             initializer=_start_worker, initargs=(analyzer, functions)) as pool:
+        # map() yields the results in source order
+        for (start, _), results in zip(batches, pool.map(_check_batch, batches)):
+            for function, result in zip(functions[start:], results):
+                if isinstance(result, str):
+                    pool.shutdown(cancel_futures=True) # The batches after this one no longer matter
+                    raise SemanticError(result)
+                restore_annotations(function, result, analyzer.symbol_table)
+    return analyzer
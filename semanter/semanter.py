@@ -1,85 +1,122 @@
 # Semanter
 
+from lexer.symbols import SymbolInterner
 from parser.parser import (ASTNode, ProgramNode, FunctionNode, BlockNode,
                              DeclarationNode, AssignmentNode, ConditionalNode, WhileNode,
                              PrintNode, FunctionCallNode, IdentifierNode, ConstantNode,
                              LiteralNode, BinaryOpNode)
+from parser.visitor import NodeVisitor
 
 class SemanticError(Exception):
     """Custom exception for semantic errors."""
     pass
 
 class Symbol:
-    def __init__(self, name, type, scope_level):
+    def __init__(self, name, type, scope_level, symbol_id=None):
         self.name = name
         self.type = type
         self.scope_level = scope_level
+        self.symbol_id = symbol_id # Id of name in the SymbolInterner
+        self.slot = None # Index in its function's stack frame, for variables
+
+    def __str__(self):
+        # Printed as the name they declare
+        return self.name
 
 class SymbolTable:
-    def __init__(self):
-        self._symbols = {}
-        self._scope_stack = [{}]
+    """Scoped symbols with O(1) lookup.
+
+    Names are keyed by their SymbolInterner id: the id indexes a list
+    holding the stack of the name's active symbols, innermost last, so
+    lookup only reads the top of one stack. Each scope keeps the symbols it
+    declared, and exit_scope pops just those.
+    """
+    def __init__(self, symbols: SymbolInterner | None = None):
+        self.symbols = symbols if symbols is not None else SymbolInterner()
+        self._symbols = [] # Symbol id -> active symbols, innermost last (None until declared)
+        self._scope_stack = [[]] # Symbols declared in each open scope
 
     def enter_scope(self):
-        self._scope_stack.append({})
+        self._scope_stack.append([])
 
     def exit_scope(self):
         if len(self._scope_stack) > 1:
-            self._scope_stack.pop()
+            for symbol in self._scope_stack.pop():
+                self._symbols[symbol.symbol_id].pop()
         else:
             raise SemanticError("Cannot exit global scope.")
 
     def declare(self, name, type):
         current_scope_level = len(self._scope_stack) - 1
-        current_scope_symbols = self._scope_stack[-1]
-
-        if name in current_scope_symbols:
+        symbol_id = self.symbols.intern(name)
+        if symbol_id >= len(self._symbols):
+            # Room for every name interned so far
+            self._symbols.extend([None] * (len(self.symbols) - len(self._symbols)))
+        active = self._symbols[symbol_id]
+        if active is None:
+            active = self._symbols[symbol_id] = []
+
+        if active and active[-1].scope_level == current_scope_level:
             raise SemanticError(f"Identifier '{name}' already declared in the current scope.")
 
-        symbol = Symbol(name, type, current_scope_level)
-        current_scope_symbols[name] = symbol
+        symbol = Symbol(name, type, current_scope_level, symbol_id)
+        active.append(symbol)
+        self._scope_stack[-1].append(symbol)
+        return symbol
 
     def lookup(self, name):
-        for i in range(len(self._scope_stack) - 1, -1, -1):
-            if name in self._scope_stack[i]:
-                return self._scope_stack[i][name]
-        return None
+        symbol_id = self.symbols.ids.get(name)
+        if symbol_id is None or symbol_id >= len(self._symbols):
+            return None
+        active = self._symbols[symbol_id]
+        return active[-1] if active else None
 
     def print_symbols(self):
         for scope in self._scope_stack:
-            for name, symbol in scope.items():
-                print(f"Name: {name}, Type: {symbol.type}, Scope Level: {symbol.scope_level}")
+            for symbol in scope:
+                print(f"Name: {symbol.name}, Type: {symbol.type}, Scope Level: {symbol.scope_level}")
         print("End of Symbol Table")
 
-class SemanticAnalyzer:
-    def __init__(self):
-        self.symbol_table = SymbolTable()
+class SemanticAnalyzer(NodeVisitor):
+    def __init__(self, symbols: SymbolInterner | None = None):
+        # symbols is the compilation's interner, usually the one the lexer filled
+        self.symbol_table = SymbolTable(symbols)
         self.current_function_return_type = None
+        self.local_symbols = None # Variables of the current function, by frame slot
 
     def analyze(self, ast_root: ProgramNode):
         if not isinstance(ast_root, ProgramNode):
             raise SemanticError("AST root must be a ProgramNode.")
         self.visit(ast_root)
 
-    def visit(self, node: ASTNode):
-        method_name = f'visit_{type(node).__name__}'
-        visitor = getattr(self, method_name, self.generic_visit)
-        return visitor(node)
+    # visit(node) returns the type of node. Visitors of nodes with children
+    # are generators that yield each child and get its type back.
+    #
+    # Identifiers, assignments and declarations get the Symbol they resolve
+    # to in node.symbol, and each FunctionNode gets the symbols of its
+    # variables in node.local_symbols. Every declaration has its own frame
+    # slot, so a variable shadowing another one does not share its slot.
 
     # Abstract method for nodes without a specific visit method
     def generic_visit(self, node: ASTNode):
         raise NotImplementedError(f"No visit_{type(node).__name__} method defined and generic_visit not fully implemented for this node type.")
 
-    def visit_ProgramNode(self, node: ProgramNode):
-        # Functions are in the global scope
-        for func_node in node.functions:
+    def declare_functions(self, functions: list[FunctionNode]) -> list:
+        """Declare functions in the global scope and return their symbols."""
+        function_symbols = []
+        for func_node in functions:
             if self.symbol_table.lookup(func_node.name) and self.symbol_table.lookup(func_node.name).scope_level == 0:
                 raise SemanticError(f"Function '{func_node.name}' already declared.")
-            self.symbol_table.declare(func_node.name, func_node.type_name)
+            function_symbols.append(self.symbol_table.declare(func_node.name, func_node.type_name))
+        return function_symbols
+
+    def visit_ProgramNode(self, node: ProgramNode):
+        # Functions are in the global scope
+        self.declare_functions(node.functions)
 
         # Second pass: visit each function
         for func_node in node.functions:
-            self.visit(func_node)
+            yield func_node
 
     def visit_FunctionNode(self, node: FunctionNode):
         # Check if function was already declared (e.g. in ProgramNode pass)
@@ -89,19 +126,20 @@ class SemanticAnalyzer:
 
         self.current_function_return_type = node.type_name
         self.symbol_table.enter_scope()
+        node.local_symbols = self.local_symbols = []
 
         if node.block:
             if not isinstance(node.block, BlockNode):
                  raise SemanticError(f"Expected BlockNode for function '{node.name}' body, got {type(node.block)}.")
             for stmt in node.block.statements:
-                self.visit(stmt)
+                yield stmt
 
         expected_return_type = self.current_function_return_type
 
         if node.return_expression is None:
             raise SemanticError(f"Non-void function '{node.name}' must return a value of type '{expected_return_type}'.")
 
-        return_expr_type = self.visit(node.return_expression)
+        return_expr_type = yield node.return_expression
         if return_expr_type != expected_return_type:
             raise SemanticError(f"Return type mismatch in function '{node.name}'. Expected '{expected_return_type}' but got '{return_expr_type}'.")
 
@@ -111,7 +149,7 @@ class SemanticAnalyzer:
     def visit_BlockNode(self, node: BlockNode):
         self.symbol_table.enter_scope()
         for stmt in node.statements:
-            self.visit(stmt)
+            yield stmt
         self.symbol_table.exit_scope()
 
     def visit_DeclarationNode(self, node: DeclarationNode):
@@ -119,10 +157,12 @@ class SemanticAnalyzer:
             raise SemanticError(f"Unsupported type '{node.type_name}'. Only 'int' is supported.")
 
         # Check for redeclaration
-        self.symbol_table.declare(node.name, node.type_name)
+        symbol = node.symbol = self.symbol_table.declare(node.name, node.type_name)
+        symbol.slot = len(self.local_symbols)
+        self.local_symbols.append(symbol)
 
         if node.expression:
-            expr_type = self.visit(node.expression)
+            expr_type = yield node.expression
             if expr_type != node.type_name:
                 raise SemanticError(f"Type mismatch in declaration of '{node.name}'. Expected '{node.type_name}' but got '{expr_type}'.")
         return node.type_name
@@ -131,33 +171,34 @@ class SemanticAnalyzer:
         var_symbol = self.symbol_table.lookup(node.identifier_name)
         if not var_symbol:
             raise SemanticError(f"Identifier '{node.identifier_name}' not declared.")
+        node.symbol = var_symbol
 
         if var_symbol.type != 'int':
              raise SemanticError(f"Assignment to non-int variable '{node.identifier_name}' of type '{var_symbol.type}' is not supported or type error.")
 
-        expr_type = self.visit(node.expression)
+        expr_type = yield node.expression
         if expr_type != var_symbol.type:
             raise SemanticError(f"Type mismatch in assignment to '{node.identifier_name}'. Expected '{var_symbol.type}' but got '{expr_type}'.")
         return var_symbol.type
 
     def visit_ConditionalNode(self, node: ConditionalNode):
-        condition_type = self.visit(node.condition)
+        condition_type = yield node.condition
         # Non-zero integer is true and zero is false
         if condition_type != 'int':
             raise SemanticError(f"Condition for 'if' statement must be an 'int', got '{condition_type}'.")
 
-        self.visit(node.if_block)
+        yield node.if_block
         if node.else_block:
-            self.visit(node.else_block)
+            yield node.else_block
 
     def visit_WhileNode(self, node: WhileNode):
-        condition_type = self.visit(node.condition)
+        condition_type = yield node.condition
         if condition_type != 'int':
             raise SemanticError(f"Condition for 'while' statement must be an 'int', got '{condition_type}'.")
-        self.visit(node.block)
+        yield node.block
 
     def visit_PrintNode(self, node: PrintNode):
-        expr_type = self.visit(node.expression)
+        expr_type = yield node.expression
 
         if isinstance(node.expression, LiteralNode):
             pass
@@ -178,6 +219,7 @@ class SemanticAnalyzer:
         symbol = self.symbol_table.lookup(node.name)
         if not symbol:
             raise SemanticError(f"Identifier '{node.name}' not declared.")
+        node.symbol = symbol
         return symbol.type
 
     def visit_ConstantNode(self, node: ConstantNode):
@@ -191,8 +233,8 @@ class SemanticAnalyzer:
         return 'string_literal'
 
     def visit_BinaryOpNode(self, node: BinaryOpNode):
-        left_type = self.visit(node.left)
-        right_type = self.visit(node.right)
+        left_type = yield node.left
+        right_type = yield node.right
 
         if left_type != 'int' or right_type != 'int':
             raise SemanticError(f"Operands for binary operator '{node.operator}' must be 'int'. Got '{left_type}' and '{right_type}'.")
@@ -1,9 +1,15 @@
 import unittest
 
 from generator.generator import CodeGenerator
+from intermediator.intermediator import IRGenerator
+from lexer.lexer import Lexer
+from lexer.symbols import SymbolInterner
+from parser.parser import Parser
+from semanter.semanter import SemanticAnalyzer
 from intermediator.intermediator import (
     LabelInstr, AssignInstr, BinaryOpInstr, JumpInstr, ConditionalJumpInstr,
-    ReturnInstr, FunctionCallInstr, PrintInstr
+    ReturnInstr, FunctionCallInstr, PrintInstr,
+    Temp, Var, IntConst, StrConst, Label, FuncLabel
 )
 
 
@@ -31,8 +37,8 @@ class TestCodeGenerator(unittest.TestCase):
     def test_simple_return_constant(self):
         # IR for: int main() { return 0; }
         ir = [
-            LabelInstr("main"),
-            ReturnInstr(0)
+            LabelInstr(FuncLabel("main")),
+            ReturnInstr(IntConst(0))
         ]
         generated_asm = self._run_generator(ir)
 
@@ -49,10 +55,11 @@ class TestCodeGenerator(unittest.TestCase):
 
     def test_declaration_and_return_identifier(self):
         # IR for: int main() { int x = 10; return x; }
+        x = Var("x")
         ir = [
-            LabelInstr("main"),
-            AssignInstr("x", 10),
-            ReturnInstr("x")
+            LabelInstr(FuncLabel("main")),
+            AssignInstr(x, IntConst(10)),
+            ReturnInstr(x)
         ]
         generated_asm = self._run_generator(ir)
 
@@ -64,10 +71,11 @@ class TestCodeGenerator(unittest.TestCase):
 
     def test_binary_operation_addition(self):
         # IR for: int main() { int t1 = 5 + 3; return t1; }
+        t1 = Temp("t1")
         ir = [
-            LabelInstr("main"),
-            BinaryOpInstr("t1", 5, "+", 3),
-            ReturnInstr("t1")
+            LabelInstr(FuncLabel("main")),
+            BinaryOpInstr(t1, IntConst(5), "+", IntConst(3)),
+            ReturnInstr(t1)
         ]
         generated_asm = self._run_generator(ir)
 
@@ -79,10 +87,11 @@ class TestCodeGenerator(unittest.TestCase):
 
     def test_binary_operation_subtraction(self):
         # IR for: int main() { int t1 = 10 - 3; return t1; }
+        t1 = Temp("t1")
         ir = [
-            LabelInstr("main"),
-            BinaryOpInstr("t1", 10, "-", 3),
-            ReturnInstr("t1")
+            LabelInstr(FuncLabel("main")),
+            BinaryOpInstr(t1, IntConst(10), "-", IntConst(3)),
+            ReturnInstr(t1)
         ]
         generated_asm = self._run_generator(ir)
 
@@ -93,10 +102,11 @@ class TestCodeGenerator(unittest.TestCase):
 
     def test_binary_operation_multiplication(self):
         # IR for: int main() { int t1 = 4 * 5; return t1; }
+        t1 = Temp("t1")
         ir = [
-            LabelInstr("main"),
-            BinaryOpInstr("t1", 4, "*", 5),
-            ReturnInstr("t1")
+            LabelInstr(FuncLabel("main")),
+            BinaryOpInstr(t1, IntConst(4), "*", IntConst(5)),
+            ReturnInstr(t1)
         ]
         generated_asm = self._run_generator(ir)
 
@@ -107,10 +117,11 @@ class TestCodeGenerator(unittest.TestCase):
 
     def test_binary_operation_division(self):
         # IR for: int main() { int t1 = 20 / 4; return t1; }
+        t1 = Temp("t1")
         ir = [
-            LabelInstr("main"),
-            BinaryOpInstr("t1", 20, "/", 4),
-            ReturnInstr("t1")
+            LabelInstr(FuncLabel("main")),
+            BinaryOpInstr(t1, IntConst(20), "/", IntConst(4)),
+            ReturnInstr(t1)
         ]
         generated_asm = self._run_generator(ir)
 
@@ -122,10 +133,11 @@ class TestCodeGenerator(unittest.TestCase):
 
     def test_binary_operation_comparison_equal(self):
         # IR for: int main() { int t1 = (5 == 5); return t1; }
+        t1 = Temp("t1")
         ir = [
-            LabelInstr("main"),
-            BinaryOpInstr("t1", 5, "==", 5),
-            ReturnInstr("t1")
+            LabelInstr(FuncLabel("main")),
+            BinaryOpInstr(t1, IntConst(5), "==", IntConst(5)),
+            ReturnInstr(t1)
         ]
         generated_asm = self._run_generator(ir)
 
@@ -136,10 +148,11 @@ class TestCodeGenerator(unittest.TestCase):
 
     def test_binary_operation_comparison_not_equal(self):
         # IR for: int main() { int t1 = (5 != 3); return t1; }
+        t1 = Temp("t1")
         ir = [
-            LabelInstr("main"),
-            BinaryOpInstr("t1", 5, "!=", 3),
-            ReturnInstr("t1")
+            LabelInstr(FuncLabel("main")),
+            BinaryOpInstr(t1, IntConst(5), "!=", IntConst(3)),
+            ReturnInstr(t1)
         ]
         generated_asm = self._run_generator(ir)
 
@@ -150,10 +163,11 @@ class TestCodeGenerator(unittest.TestCase):
 
     def test_binary_operation_comparison_less_than(self):
         # IR for: int main() { int t1 = (3 < 5); return t1; }
+        t1 = Temp("t1")
         ir = [
-            LabelInstr("main"),
-            BinaryOpInstr("t1", 3, "<", 5),
-            ReturnInstr("t1")
+            LabelInstr(FuncLabel("main")),
+            BinaryOpInstr(t1, IntConst(3), "<", IntConst(5)),
+            ReturnInstr(t1)
         ]
         generated_asm = self._run_generator(ir)
 
@@ -164,10 +178,11 @@ class TestCodeGenerator(unittest.TestCase):
 
     def test_binary_operation_comparison_greater_than(self):
         # IR for: int main() { int t1 = (5 > 3); return t1; }
+        t1 = Temp("t1")
         ir = [
-            LabelInstr("main"),
-            BinaryOpInstr("t1", 5, ">", 3),
-            ReturnInstr("t1")
+            LabelInstr(FuncLabel("main")),
+            BinaryOpInstr(t1, IntConst(5), ">", IntConst(3)),
+            ReturnInstr(t1)
         ]
         generated_asm = self._run_generator(ir)
 
@@ -180,10 +195,11 @@ class TestCodeGenerator(unittest.TestCase):
 
     def test_binary_operation_comparison_greater_equal(self):
         # IR for: int main() { int t1 = (5 >= 5); return t1; }
+        t1 = Temp("t1")
         ir = [
-            LabelInstr("main"),
-            BinaryOpInstr("t1", 5, ">=", 5),
-            ReturnInstr("t1")
+            LabelInstr(FuncLabel("main")),
+            BinaryOpInstr(t1, IntConst(5), ">=", IntConst(5)),
+            ReturnInstr(t1)
         ]
         generated_asm = self._run_generator(ir)
 
@@ -196,10 +212,11 @@ class TestCodeGenerator(unittest.TestCase):
 
     def test_binary_operation_comparison_less_equal(self):
         # IR for: int main() { int t1 = (3 <= 5); return t1; }
+        t1 = Temp("t1")
         ir = [
-            LabelInstr("main"),
-            BinaryOpInstr("t1", 3, "<=", 5),
-            ReturnInstr("t1")
+            LabelInstr(FuncLabel("main")),
+            BinaryOpInstr(t1, IntConst(3), "<=", IntConst(5)),
+            ReturnInstr(t1)
         ]
         generated_asm = self._run_generator(ir)
 
@@ -213,9 +230,9 @@ class TestCodeGenerator(unittest.TestCase):
     def test_print_integer_constant(self):
         # IR for: int main() { print(42); return 0; }
         ir = [
-            LabelInstr("main"),
-            PrintInstr(42),
-            ReturnInstr(0)
+            LabelInstr(FuncLabel("main")),
+            PrintInstr(IntConst(42)),
+            ReturnInstr(IntConst(0))
         ]
         generated_asm = self._run_generator(ir)
 
@@ -226,11 +243,12 @@ class TestCodeGenerator(unittest.TestCase):
 
     def test_print_integer_variable(self):
         # IR for: int main() { int val = 77; print(val); return 0; }
+        val = Var("val")
         ir = [
-            LabelInstr("main"),
-            AssignInstr("val", 77),
-            PrintInstr("val"),
-            ReturnInstr(0)
+            LabelInstr(FuncLabel("main")),
+            AssignInstr(val, IntConst(77)),
+            PrintInstr(val),
+            ReturnInstr(IntConst(0))
         ]
         generated_asm = self._run_generator(ir)
 
@@ -241,9 +259,9 @@ class TestCodeGenerator(unittest.TestCase):
     def test_print_string_literal(self):
         # IR for: int main() { print("hello"); return 0; }
         ir = [
-            LabelInstr("main"),
-            PrintInstr('"hello"'),
-            ReturnInstr(0)
+            LabelInstr(FuncLabel("main")),
+            PrintInstr(StrConst("hello")),
+            ReturnInstr(IntConst(0))
         ]
         generated_asm = self._run_generator(ir)
 
@@ -255,13 +273,15 @@ class TestCodeGenerator(unittest.TestCase):
 
     def test_conditional_jump_if_false(self):
         # IR for: if_false condition goto L1
+        condition = Var("condition")
+        x = Var("x")
         ir = [
-            LabelInstr("main"),
-            AssignInstr("condition", 0),
-            ConditionalJumpInstr("condition", "L1", jump_if_false=True),
-            AssignInstr("x", 1),
-            LabelInstr("L1"),
-            ReturnInstr(0)
+            LabelInstr(FuncLabel("main")),
+            AssignInstr(condition, IntConst(0)),
+            ConditionalJumpInstr(condition, Label("L1"), jump_if_false=True),
+            AssignInstr(x, IntConst(1)),
+            LabelInstr(Label("L1")),
+            ReturnInstr(IntConst(0))
         ]
         generated_asm = self._run_generator(ir)
 
@@ -270,13 +290,15 @@ class TestCodeGenerator(unittest.TestCase):
 
     def test_conditional_jump_if_true(self):
         # IR for: if_true condition goto L1
+        condition = Var("condition")
+        x = Var("x")
         ir = [
-            LabelInstr("main"),
-            AssignInstr("condition", 1),
-            ConditionalJumpInstr("condition", "L1", jump_if_false=False),
-            AssignInstr("x", 1),
-            LabelInstr("L1"),
-            ReturnInstr(0)
+            LabelInstr(FuncLabel("main")),
+            AssignInstr(condition, IntConst(1)),
+            ConditionalJumpInstr(condition, Label("L1"), jump_if_false=False),
+            AssignInstr(x, IntConst(1)),
+            LabelInstr(Label("L1")),
+            ReturnInstr(IntConst(0))
         ]
         generated_asm = self._run_generator(ir)
 
@@ -285,12 +307,13 @@ class TestCodeGenerator(unittest.TestCase):
 
     def test_unconditional_jump(self):
         # IR for: goto L1
+        x = Var("x")
         ir = [
-            LabelInstr("main"),
-            JumpInstr("L1"),
-            AssignInstr("x", 1),  # Should be skipped
-            LabelInstr("L1"),
-            ReturnInstr(0)
+            LabelInstr(FuncLabel("main")),
+            JumpInstr(Label("L1")),
+            AssignInstr(x, IntConst(1)),  # Should be skipped
+            LabelInstr(Label("L1")),
+            ReturnInstr(IntConst(0))
         ]
         generated_asm = self._run_generator(ir)
 
@@ -300,11 +323,11 @@ class TestCodeGenerator(unittest.TestCase):
         # IR for: int main() { foo(); return 0; }
         # foo returns 42, but main doesn't use it.
         ir = [
-            LabelInstr("foo"),
-            ReturnInstr(42),
-            LabelInstr("main"),
-            FunctionCallInstr("foo"),
-            ReturnInstr(0)
+            LabelInstr(FuncLabel("foo")),
+            ReturnInstr(IntConst(42)),
+            LabelInstr(FuncLabel("main")),
+            FunctionCallInstr(FuncLabel("foo")),
+            ReturnInstr(IntConst(0))
         ]
         generated_asm = self._run_generator(ir)
 
@@ -318,8 +341,8 @@ class TestCodeGenerator(unittest.TestCase):
     def test_data_section_generation(self):
         # Basic test to ensure data section is properly generated
         ir = [
-            LabelInstr("main"),
-            ReturnInstr(0)
+            LabelInstr(FuncLabel("main")),
+            ReturnInstr(IntConst(0))
         ]
         generated_asm = self._run_generator(ir)
 
@@ -330,9 +353,9 @@ class TestCodeGenerator(unittest.TestCase):
     def test_print_routines_included(self):
         # Test that helper routines are included
         ir = [
-            LabelInstr("main"),
-            PrintInstr(42),
-            ReturnInstr(0)
+            LabelInstr(FuncLabel("main")),
+            PrintInstr(IntConst(42)),
+            ReturnInstr(IntConst(0))
         ]
         generated_asm = self._run_generator(ir)
 
@@ -344,6 +367,63 @@ class TestCodeGenerator(unittest.TestCase):
         # Check for print_newline routine
         self.assertIn("print_newline:", generated_asm)
 
+    def test_variables_collected_from_ir(self):
+        source = """
+        int helper() { int t = 2; return t * 3; }
+        int main() { int x = -5; int y = x + 1; helper(); print(y); print("done"); return x; }
+        """
+        ast = Parser(Lexer(source).tokenize()).parse_program()
+        generated_asm = CodeGenerator(IRGenerator().generate(ast)).generate_x86()
+        # Only variables and temporaries get stack slots, not the constant -5
+        self.assertIn("sub esp, 12  ; Allocate 12 bytes for locals: t2, x, y", generated_asm)
+        self.assertIn("mov dword [ebp-8], -5", generated_asm)
+
+    def test_frames_from_analyzed_ast(self):
+        source = "int main() { int y = 1; if (y) { int y = 2; print(y); } print(y); return y; }"
+        symbols = SymbolInterner()
+        ast = Parser(Lexer(source, symbols=symbols).tokenize()).parse_program()
+        SemanticAnalyzer(symbols).analyze(ast)
+        ir_generator = IRGenerator()
+        ir = ir_generator.generate(ast)
+        generated_asm = CodeGenerator(ir, ir_generator.frames).generate_x86()
+        # Slots in declaration order, and the inner y does not overwrite the outer one
+        self.assertIn("sub esp, 8  ; Allocate 8 bytes for locals: y, y", generated_asm)
+        self.assertIn("mov dword [ebp-4], 1", generated_asm)
+        self.assertIn("mov dword [ebp-8], 2", generated_asm)
+        self.assertEqual(generated_asm.count("mov eax, [ebp-4]"), 3)
+        self.assertEqual(generated_asm.count("mov eax, [ebp-8]"), 1)
+
+    def test_function_named_like_a_label(self):
+        source = "int Loop() { int i = 0; while (i < 3) { i = i + 1; } return i; } int main() { Loop(); return 0; }"
+        ast = Parser(Lexer(source).tokenize()).parse_program()
+        SemanticAnalyzer().analyze(ast)
+        ir_generator = IRGenerator()
+        generated_asm = CodeGenerator(ir_generator.generate(ast), ir_generator.frames).generate_x86()
+        # Loop gets its own frame instead of being taken for a label inside the previous function
+        self.assertIn("Loop:\npush ebp\nmov ebp, esp\nsub esp, 12", normalize_asm(generated_asm))
+        self.assertIn("call Loop", generated_asm)
+
+    def test_function_name_as_value(self):
+        source = "int foo() { return 1; } int main() { int x = foo; print(foo); return 0; }"
+        ast = Parser(Lexer(source).tokenize()).parse_program()
+        SemanticAnalyzer().analyze(ast)
+        ir_generator = IRGenerator()
+        ir = ir_generator.generate(ast)
+        unanalyzed_ir = IRGenerator().generate(Parser(Lexer(source).tokenize()).parse_program())
+        # The name is foo's address with frames, and with frames collected from the IR
+        for generated_asm in (CodeGenerator(ir, ir_generator.frames).generate_x86(),
+                              CodeGenerator(ir).generate_x86(),
+                              CodeGenerator(unanalyzed_ir).generate_x86()):
+            self.assertIn("sub esp, 4  ; Allocate 4 bytes for locals: x", generated_asm)
+            self.assertIn("mov dword [ebp-4], foo", generated_asm)
+            self.assertIn("mov eax, foo", generated_asm)
+
+    def test_local_named_like_a_function(self):
+        source = "int foo() { return 1; } int main() { int foo = 2; print(foo); return 0; }"
+        generated_asm = CodeGenerator(IRGenerator().generate(Parser(Lexer(source).tokenize()).parse_program())).generate_x86()
+        # An assigned name is a variable, even without a Symbol to say so
+        self.assertIn("sub esp, 4  ; Allocate 4 bytes for locals: foo", generated_asm)
+        self.assertIn("mov eax, [ebp-4]", generated_asm)
 
 if __name__ == '__main__':
     unittest.main()
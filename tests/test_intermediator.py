@@ -1,12 +1,18 @@
+import re
 import unittest
 
-from intermediator.intermediator import IRGenerator
+from intermediator.fused import FusedIRGenerator
+from intermediator.intermediator import (IRGenerator, LabelInstr, Temp, Var, IntConst, StrConst,
+                                         Label, FuncLabel)
+from lexer.lexer import Lexer
+from parser.flat import flatten
 
 from parser.parser import (
     ProgramNode, FunctionNode, BlockNode, DeclarationNode,
     AssignmentNode, ConditionalNode, PrintNode, IdentifierNode,
-    ConstantNode, LiteralNode, BinaryOpNode, WhileNode
+    ConstantNode, LiteralNode, BinaryOpNode, WhileNode, Parser
 )
+from semanter.semanter import SemanticAnalyzer, SemanticError
 
 class TestIRGenerator(unittest.TestCase):
     def setUp(self):
@@ -369,5 +375,153 @@ class TestIRGenerator(unittest.TestCase):
         ]
         self.assert_ir_equals(generated_ir, expected_ir)
 
+    def test_flat_ast_gives_same_ir(self):
+        ast = ProgramNode(functions=[
+            FunctionNode('int', 'main', BlockNode([
+                DeclarationNode('int', 'x', ConstantNode('5')),
+                WhileNode(BinaryOpNode(IdentifierNode('x'), '>', ConstantNode('0')), BlockNode([
+                    AssignmentNode('x', BinaryOpNode(IdentifierNode('x'), '-', ConstantNode('1'))),
+                    PrintNode(LiteralNode('tick'))
+                ])),
+                ConditionalNode(IdentifierNode('x'), BlockNode([]), BlockNode([PrintNode(IdentifierNode('x'))]))
+            ]), IdentifierNode('x'))
+        ])
+        expected = [str(instr) for instr in IRGenerator().generate(ast)]
+        self.assert_ir_equals(self.generator.generate(flatten(ast).program()), expected)
+
+    def test_deep_expression(self):
+        # A left-deep chain of 100k operands, far past the recursion limit
+        expression = IdentifierNode('x')
+        for index in range(100_000):
+            expression = BinaryOpNode(expression, '+', ConstantNode(str(index)))
+        ast = ProgramNode([FunctionNode('int', 'main', BlockNode([]), expression)])
+        ir = [str(instr) for instr in self.generator.generate(ast)]
+        self.assertEqual(len(ir), 100_002)
+        self.assertEqual(ir[:3], ["main:", "  t1 = x + 0", "  t2 = t1 + 1"])
+        self.assertEqual(ir[-2:], ["  t100000 = t99999 + 99999", "  return t100000"])
+
+    def test_deeply_nested_blocks(self):
+        block = BlockNode([PrintNode(IdentifierNode('x'))])
+        for _ in range(10_000):
+            block = BlockNode([WhileNode(IdentifierNode('x'), block)])
+        ast = ProgramNode([FunctionNode('int', 'main', block, ConstantNode('0'))])
+        ir = [str(instr) for instr in self.generator.generate(ast)]
+        self.assertEqual(len(ir), 10_000 * 4 + 3)
+        self.assertEqual(ir[:3], ["main:", "L1:", "  if_false x goto L2"])
+        self.assertEqual(ir[20_000:20_004], ["  if_false x goto L20000", "  print x", "  goto L19999", "L20000:"])
+        self.assertEqual(ir[-3:], ["  goto L1", "L2:", "  return 0"])
+
+    def test_frames_of_analyzed_ast(self):
+        ast = Parser(Lexer("""
+        int f() { return 1 + 2; }
+        int main() { int x = 1; if (x) { int x = 2; print(x); } int y = x * 3; return y; }
+        """).tokenize()).parse_program()
+        self.assertEqual(self.generator.generate(ast)[1].left.value, 1)
+        self.assertEqual(self.generator.frames, {}) # Only analyzed ASTs have frames
+        SemanticAnalyzer().analyze(ast)
+        ir = self.generator.generate(ast)
+        self.assertEqual([str(operand) for operand in self.generator.frames['f']], ['t1'])
+        outer_x, inner_x, y, temp = self.generator.frames['main']
+        self.assertEqual((str(outer_x), str(inner_x), str(y), str(temp)), ('x', 'x', 'y', 't2'))
+        self.assertEqual((outer_x.symbol.slot, inner_x.symbol.slot, y.symbol.slot), (0, 1, 2))
+        # Variables are operands through the Vars of their Symbols, so the shadowed x is not the outer x
+        self.assertIs(ir[4].target, outer_x)
+        self.assertIs(ir[5].condition_var, outer_x)
+        self.assertIs(ir[6].target, inner_x)
+        self.assertIs(ir[7].value, inner_x)
+        self.assertIs(ir[9].left, outer_x)
+
+    def test_typed_operands(self):
+        ast = Parser(Lexer("""
+        int f() { return 1; }
+        int main() { int x = 1; f(); print("hi"); while (x < 2) { x = x + 1; } return x; }
+        """).tokenize()).parse_program()
+        SemanticAnalyzer().analyze(ast)
+        ir = self.generator.generate(ast)
+        self.assertEqual([type(instr.name) for instr in ir if isinstance(instr, LabelInstr)],
+                         [FuncLabel, FuncLabel, Label, Label])
+        _, _, _, assign, call, print_instr, _, _, jump, add, _, _, _, ret = ir
+        self.assertIsInstance(assign.source, IntConst)
+        self.assertEqual(call.function_name, 'f')
+        self.assertIsInstance(call.function_name, FuncLabel)
+        self.assertIsInstance(print_instr.value, StrConst)
+        self.assertEqual(print_instr.value.value, 'hi')
+        self.assertIsInstance(jump.condition_var, Temp)
+        self.assertIsInstance(add.right, IntConst)
+        # Every use of x is the same Var
+        self.assertIs(add.left, assign.target)
+        self.assertIs(ret.value, assign.target)
+        self.assertIsInstance(ret.value, Var)
+        with self.assertRaises(AttributeError):
+            ret.extra = None # Instructions have __slots__
+
+class TestFusedIRGenerator(unittest.TestCase):
+    def two_passes(self, ast):
+        SemanticAnalyzer().analyze(ast)
+        return [str(instr) for instr in IRGenerator().generate(ast)]
+
+    def test_same_ir_as_two_passes(self):
+        ast = Parser(Lexer("""
+        int helper() { int a = 3; int b = a * 2 - 1; while (a < 10) { a = a + b / 2; } return a; }
+        int main() {
+            int x = 1;
+            if (x == 1) { int x = 2; print(x); } else { x = x + 3; }
+            helper();
+            if (x != 0) { print("small"); } else { int y = x >= 4; print(y); }
+            while (x <= 5) { int z = x > 2; x = x + z; }
+            return x - 1;
+        }
+        """).tokenize()).parse_program()
+        fused = FusedIRGenerator()
+        fused_ir = [str(instr) for instr in fused.generate(ast)]
+        fused_frames = {name: [str(operand) for operand in frame] for name, frame in fused.frames.items()}
+        self.assertEqual(fused_ir, self.two_passes(ast))
+        generator = IRGenerator()
+        generator.generate(ast)
+        self.assertEqual(fused_frames, {name: [str(operand) for operand in frame] for name, frame in generator.frames.items()})
+
+    def test_function_name_as_value(self):
+        source = "int foo() { return 1; } int main() { int x = foo; print(foo); return 0; }"
+        for generator in (IRGenerator(), FusedIRGenerator()):
+            ast = Parser(Lexer(source).tokenize()).parse_program()
+            if type(generator) is IRGenerator:
+                SemanticAnalyzer().analyze(ast)
+            ir = generator.generate(ast)
+            assign, print_instr = ir[3], ir[4]
+            self.assertEqual([str(instr) for instr in ir[3:5]], ['  x = foo', '  print foo'])
+            # foo is a Var of the global Symbol, outside every frame, so it stays the function's address
+            self.assertIsInstance(assign.source, Var)
+            self.assertIs(print_instr.value, assign.source)
+            self.assertEqual(assign.source.symbol.scope_level, 0)
+            self.assertEqual([str(operand) for operand in generator.frames['main']], ['x'])
+
+    def test_same_errors_as_analyzer(self):
+        programs = [
+            "int main() { return x; }",
+            "int main() { int x; int x; return 0; }",
+            "int f() { return 1; } int f() { return 2; } int main() { return 0; }",
+            "int main() { int x = 1; print(\"ok\"); return y; }",
+            "int main() { g(); y = 1; return 0; }",
+            "int main() { while (1) { print(q); } return 0; }",
+            "int main() { int a = 1; if (a) { int a = 2; } else { b = a; } return 0; }",
+            "int main() { int x = 1; return x + z; }",
+        ]
+        for code in programs:
+            ast = Parser(Lexer(code).tokenize()).parse_program()
+            with self.assertRaises(SemanticError) as expected:
+                self.two_passes(ast)
+            with self.assertRaisesRegex(SemanticError, f"^{re.escape(str(expected.exception))}$"):
+                FusedIRGenerator().generate(ast)
+
+    def test_reusable(self):
+        generator = FusedIRGenerator()
+        ast = Parser(Lexer("int main() { int x = 1; return x + 2; }").tokenize()).parse_program()
+        self.assertEqual([str(instr) for instr in generator.generate(ast)],
+                         [str(instr) for instr in generator.generate(ast)])
+
+    def test_root_must_be_program(self):
+        with self.assertRaisesRegex(SemanticError, "AST root must be a ProgramNode."):
+            FusedIRGenerator().generate(ConstantNode('1'))
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,5 +1,31 @@
+import io
+import mmap
+import random
+import tempfile
 import unittest
-from lexer.lexer import Lexer
+from lexer.incremental import TokenDiff, relex
+from lexer.lexer import Lexer, TokenIterator, map_source_file
+from lexer.parallel import parallel_tokenize, split_source
+from lexer.symbols import SymbolInterner
+from lexer.tokens import LineIndex, TokenStream
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Source exercising every token class plus the tricky spots: keywords glued
+# to numbers, multi-line literals, unterminated quotes and non-ASCII text
+EDGE_CASE_SOURCE = """int main() { // entry point
+    int x = -5; int y=x-1; int z = 123if;
+    if (x <= y && y != 0 || z >= 1) { print("multi
+line literal"); print('single'); }
+    while (x < 10) { x = x + 1; } // trailing comment
+    print("caf\u00e9"); \u00e9if $ ! & | ifx _if if_ \t\r\f\x1c
+    return x == y / 2 * 3;
+}
+int dangling() { print("never closed); return 0; }
+"""
 
 class TestLexer(unittest.TestCase):
     def test_empty_input(self):
@@ -398,5 +424,362 @@ class TestLexer(unittest.TestCase):
         self.assertEqual(tokens, expected_tokens)
         self.assertEqual(43, lexer.token_count())
 
+class TestLexerStreaming(unittest.TestCase):
+    def assertStreamsLikeTokenize(self, source, make_file):
+        expected = Lexer(source).tokenize()
+        for chunk_size in (1, 2, 3, 7, 64, 4096):
+            tokens = list(Lexer(make_file()).iter_tokens(chunk_size=chunk_size))
+            self.assertEqual(tokens, expected, f"chunk_size={chunk_size}")
+
+    def test_iter_tokens_over_string(self):
+        self.assertEqual(list(Lexer(EDGE_CASE_SOURCE).iter_tokens()), Lexer(EDGE_CASE_SOURCE).tokenize())
+
+    def test_text_file_object(self):
+        self.assertStreamsLikeTokenize(EDGE_CASE_SOURCE, lambda: io.StringIO(EDGE_CASE_SOURCE))
+
+    def test_binary_file_object_splits_multibyte_characters(self):
+        data = EDGE_CASE_SOURCE.encode('utf-8')
+        self.assertStreamsLikeTokenize(EDGE_CASE_SOURCE, lambda: io.BytesIO(data))
+
+    def test_mmap(self):
+        with tempfile.TemporaryFile() as file:
+            file.write(EDGE_CASE_SOURCE.encode('utf-8'))
+            file.flush()
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                def rewound():
+                    mapped.seek(0)
+                    return mapped
+                self.assertStreamsLikeTokenize(EDGE_CASE_SOURCE, rewound)
+
+    def test_tokens_crossing_chunk_boundaries(self):
+        source = 'print("a long literal") // a long comment\nvariable_name == 12345'
+        tokens = list(Lexer(io.StringIO(source)).iter_tokens(chunk_size=4))
+        self.assertEqual(tokens, [
+            ('keyword', 'print'),
+            ('punctuation', '('),
+            ('literal', 'a long literal'),
+            ('punctuation', ')'),
+            ('identifier', 'variable_name'),
+            ('operator', '=='),
+            ('constant', '12345')
+        ])
+
+    def test_keyword_boundary_across_chunks(self):
+        # "if" right after a digit is an identifier, even when the digit was
+        # already consumed in an earlier chunk
+        tokens = list(Lexer(io.StringIO("12if if")).iter_tokens(chunk_size=2))
+        self.assertEqual(tokens, [('constant', '12'), ('identifier', 'if'), ('keyword', 'if')])
+
+    def test_tokenize_file_object(self):
+        lexer = Lexer(io.StringIO("int x;"))
+        self.assertEqual(lexer.tokenize(), [('keyword', 'int'), ('identifier', 'x'), ('punctuation', ';')])
+        self.assertEqual(lexer.token_count(), 3)
+
+class TestBytesMode(unittest.TestCase):
+    def test_bytes_source(self):
+        source = EDGE_CASE_SOURCE.replace('éif', 'if')
+        stream = Lexer(source.encode('utf-8')).tokenize_stream()
+        self.assertIsInstance(stream.source, bytes)
+        self.assertEqual(stream, Lexer(source).tokenize())
+
+    def test_literal_decoded_on_read(self):
+        stream = Lexer('print("año €");\nx = 1;'.encode('utf-8')).tokenize_stream()
+        self.assertEqual(stream[2], ('literal', 'año €'))
+        # Columns count characters even after a non-ASCII literal
+        self.assertEqual(stream.position(4), (1, 15))
+        self.assertEqual(stream.position(5), (2, 1))
+
+    def test_ascii_control_whitespace(self):
+        source = "int\x1cx\x1f;\v"
+        self.assertEqual(Lexer(source.encode('ascii')).tokenize(), Lexer(source).tokenize())
+
+    def test_non_ascii_outside_literals_lexed_as_text(self):
+        # "\u00a0" is whitespace and "é" a word character for the str regex
+        for source in ("int\u00a0x;", "éif 1", "if€ x"):
+            stream = Lexer(source.encode('utf-8')).tokenize_stream()
+            self.assertEqual(stream, Lexer(source).tokenize(), source)
+
+    def test_map_source_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = f"{directory}/source.c"
+            with open(path, 'wb') as file:
+                file.write(EDGE_CASE_SOURCE.encode('utf-8'))
+            mapped = map_source_file(path)
+            try:
+                self.assertIsInstance(mapped, mmap.mmap)
+                self.assertEqual(Lexer(mapped).tokenize_stream(), Lexer(EDGE_CASE_SOURCE).tokenize())
+                self.assertEqual(Lexer(mapped).tokenize(), Lexer(EDGE_CASE_SOURCE).tokenize())
+            finally:
+                mapped.close()
+
+            open(path, 'wb').close()
+            self.assertEqual(map_source_file(path), b'')
+            self.assertEqual(len(Lexer(map_source_file(path)).tokenize_stream()), 0)
+
+    def test_other_engines_decode_buffers(self):
+        data = EDGE_CASE_SOURCE.encode('utf-8')
+        self.assertEqual(Lexer(data, engine='dfa').tokenize(), Lexer(EDGE_CASE_SOURCE).tokenize())
+
+class TestTokenIterator(unittest.TestCase):
+    def test_tokens_and_positions(self):
+        iterator = TokenIterator(EDGE_CASE_SOURCE, window=1000)
+        stream = Lexer(EDGE_CASE_SOURCE).tokenize_stream()
+        self.assertEqual(list(iterator), list(stream))
+        for index in range(len(stream)):
+            self.assertEqual(iterator.position(index), stream.position(index))
+
+    def test_window(self):
+        iterator = TokenIterator("a b\n c d", window=2)
+        self.assertEqual(list(iterator), [('identifier', name) for name in 'abcd'])
+        self.assertEqual(iterator.position(2), (2, 2))
+        self.assertEqual(iterator.position(3), (2, 4))
+        with self.assertRaises(IndexError):
+            iterator.position(1)
+        with self.assertRaises(IndexError):
+            iterator.position(4)
+
+class TestTokenStream(unittest.TestCase):
+    def test_matches_tokenize(self):
+        stream = Lexer(EDGE_CASE_SOURCE).tokenize_stream()
+        self.assertIsInstance(stream, TokenStream)
+        self.assertEqual(stream, Lexer(EDGE_CASE_SOURCE).tokenize())
+        self.assertEqual(list(stream), Lexer(EDGE_CASE_SOURCE).tokenize())
+
+    def test_tuple_view(self):
+        stream = Lexer('print("hi"); x').tokenize_stream()
+        self.assertEqual(len(stream), 6)
+        self.assertEqual(stream[0], ('keyword', 'print'))
+        self.assertEqual(stream[2], ('literal', 'hi'))
+        self.assertEqual(stream[-1], ('identifier', 'x'))
+        self.assertEqual(stream.kind(2), 'literal')
+        self.assertEqual(stream.value(2), 'hi')
+        self.assertEqual(stream[1:3], [('punctuation', '('), ('literal', 'hi')])
+
+    def test_offsets_point_into_source(self):
+        source = 'int  x = "abc";'
+        stream = Lexer(source).tokenize_stream()
+        self.assertEqual(list(stream.starts), [0, 5, 7, 9, 14])
+        self.assertEqual(list(stream.ends), [3, 6, 8, 14, 15])
+        self.assertIs(stream.source, source)
+
+    def test_compact_storage(self):
+        stream = Lexer("int x = 1;" * 100).tokenize_stream()
+        self.assertEqual(stream.nbytes(), len(stream) * 9)
+
+    def test_token_count(self):
+        lexer = Lexer("int x;")
+        lexer.tokenize_stream()
+        self.assertEqual(lexer.token_count(), 3)
+
+    def test_requires_string_source(self):
+        with self.assertRaises(TypeError):
+            Lexer(io.StringIO("int x;")).tokenize_stream()
+
+class TestLineIndex(unittest.TestCase):
+    def test_offsets_to_positions(self):
+        index = LineIndex("ab\ncd\n\nefg")
+        self.assertEqual(list(index.newlines), [2, 5, 6])
+        self.assertEqual(index.line_count(), 4)
+        self.assertEqual(index.position(0), (1, 1))
+        self.assertEqual(index.position(2), (1, 3))
+        self.assertEqual(index.position(3), (2, 1))
+        self.assertEqual(index.position(6), (3, 1))
+        self.assertEqual(index.position(9), (4, 3))
+
+    def test_token_positions(self):
+        stream = Lexer("int main() {\n    return 0;\n}").tokenize_stream()
+        self.assertEqual(stream.position(0), (1, 1))
+        self.assertEqual(stream.position(1), (1, 5))
+        self.assertEqual(stream.position(5), (2, 5))
+        self.assertEqual(stream.position(8), (3, 1))
+
+    def test_index_is_built_once_and_shared_with_slices(self):
+        stream = Lexer("a\nb\nc").tokenize_stream()
+        index = stream.line_index
+        self.assertIs(stream.line_index, index)
+        self.assertIs(stream[1:].line_index, index)
+
+class TestIncrementalRelex(unittest.TestCase):
+    def assertMatchesFullLex(self, stream):
+        full = Lexer(stream.source).tokenize_stream()
+        self.assertEqual(list(stream.kinds), list(full.kinds))
+        self.assertEqual(list(stream.starts), list(full.starts))
+        self.assertEqual(list(stream.ends), list(full.ends))
+
+    def test_rename_identifier(self):
+        stream = Lexer("int a = 1;\nint b = a;\nreturn b;").tokenize_stream()
+        new_stream, diff = relex(stream, 15, 1, "count")
+        self.assertEqual(new_stream.source, "int a = 1;\nint count = a;\nreturn b;")
+        self.assertMatchesFullLex(new_stream)
+        self.assertEqual(diff, TokenDiff(5, 7, 7))
+        self.assertEqual(new_stream[6], ('identifier', 'count'))
+
+    def test_edit_stays_local(self):
+        source = "x = 1;\n" * 1000
+        stream = Lexer(source).tokenize_stream()
+        new_stream, diff = relex(stream, 2000, 0, "y = 2;")
+        self.assertMatchesFullLex(new_stream)
+        self.assertLessEqual(len(diff.changed), 6)
+        self.assertLessEqual(diff.old_stop - diff.start, 2)
+
+    def test_opening_quote_turns_rest_into_literal(self):
+        stream = Lexer('print(a); print(b); x = "').tokenize_stream()
+        new_stream, diff = relex(stream, 6, 0, '"')
+        self.assertMatchesFullLex(new_stream)
+        self.assertEqual(new_stream[2], ('literal', 'a); print(b); x = '))
+        self.assertEqual(diff.start, 1)
+
+    def test_closing_a_dangling_quote(self):
+        stream = Lexer("print('a); b = 1;").tokenize_stream()
+        new_stream, _ = relex(stream, 9, 0, "'")
+        self.assertMatchesFullLex(new_stream)
+        self.assertEqual(new_stream[2], ('literal', 'a)'))
+
+    def test_newline_ends_comment(self):
+        stream = Lexer("a // b c\nd").tokenize_stream()
+        new_stream, _ = relex(stream, 6, 1, "\n")
+        self.assertMatchesFullLex(new_stream)
+        self.assertEqual(list(new_stream), [('identifier', 'a'), ('identifier', 'c'), ('identifier', 'd')])
+
+    def test_rejects_edit_outside_source(self):
+        stream = Lexer("int x;").tokenize_stream()
+        with self.assertRaises(ValueError):
+            relex(stream, 4, 5, "")
+
+    def test_random_edits(self):
+        rng = random.Random(5)
+        pieces = ['"', "'", '/', '//', '\n', ' ', 'if', 'x', '1', '-', '=', '}', ';', 'int ', '\u00e9']
+        stream = Lexer(EDGE_CASE_SOURCE).tokenize_stream()
+        for _ in range(500):
+            offset = rng.randint(0, len(stream.source))
+            removed = rng.randint(0, min(3, len(stream.source) - offset))
+            inserted = ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 3)))
+            new_stream, diff = relex(stream, offset, removed, inserted)
+            self.assertMatchesFullLex(new_stream)
+            self.assertEqual(list(stream[:diff.start]), list(new_stream[:diff.start]))
+            self.assertEqual(list(stream[diff.old_stop:]), list(new_stream[diff.new_stop:]))
+            stream = new_stream
+
+class TestDFAEngine(unittest.TestCase):
+    SOURCES = [
+        EDGE_CASE_SOURCE,
+        "",
+        "\"",
+        "12if if \u00e9if ifx if\u00e9 _if",
+        "a-1--2 //x\n/ / -",
+        "\x1c\x85  x\xa0y",
+        "x=='a'!='b\"c'&&d||e<=f>=g<h>i+j*k/l;{},()",
+    ]
+
+    def test_same_tokens_as_regex_engine(self):
+        for source in self.SOURCES:
+            expected = Lexer(source).tokenize_stream()
+            stream = Lexer(source, engine='dfa').tokenize_stream()
+            self.assertEqual(list(stream.kinds), list(expected.kinds), repr(source))
+            self.assertEqual(list(stream.starts), list(expected.starts), repr(source))
+            self.assertEqual(list(stream.ends), list(expected.ends), repr(source))
+
+    def test_tokenize(self):
+        lexer = Lexer("int x = 5; // five", engine='dfa')
+        self.assertEqual(lexer.tokenize(), [
+            ('keyword', 'int'),
+            ('identifier', 'x'),
+            ('operator', '='),
+            ('constant', '5'),
+            ('punctuation', ';')
+        ])
+        self.assertEqual(lexer.token_count(), 5)
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            Lexer("int x;", engine='lalr')
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TestNumpyEngine(unittest.TestCase):
+    SOURCES = TestDFAEngine.SOURCES + [
+        "===!==<==>=&&&|||",
+        "x--1 - -2 -a 12ab3 9_x",
+        "'a''b'\"c\"//d\n/e",
+        "print('unterminated); x = \"also",
+    ]
+
+    def test_same_tokens_as_regex_engine(self):
+        for source in self.SOURCES:
+            expected = Lexer(source).tokenize_stream()
+            stream = Lexer(source, engine='numpy').tokenize_stream()
+            self.assertEqual(list(stream.kinds), list(expected.kinds), repr(source))
+            self.assertEqual(list(stream.starts), list(expected.starts), repr(source))
+            self.assertEqual(list(stream.ends), list(expected.ends), repr(source))
+
+    def test_random_sources(self):
+        rng = random.Random(3)
+        pieces = ['"', "'", '/', '//', '\n', ' ', 'if', 'x', '1', '-', '=', '!', '&', '|', '<',
+                  '}', ';', 'int ', 'return', '$', '\x1c', '9a', '_']
+        for _ in range(300):
+            source = ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 30)))
+            self.assertEqual(Lexer(source, engine='numpy').tokenize(), Lexer(source).tokenize(), repr(source))
+
+class TestParallelTokenize(unittest.TestCase):
+    def test_split_points_avoid_literals(self):
+        source = 'print("a\nb\nc\nd");\nx = 1;\n// "\ny = 2;\n'
+        chunks = split_source(source, 4)
+        self.assertEqual(''.join(chunks), source)
+        for chunk in chunks[1:]:
+            self.assertTrue(chunk.startswith('\n'))
+        self.assertEqual(chunks[0], 'print("a\nb\nc\nd");')
+
+    def test_chunks_lex_like_the_whole_source(self):
+        rng = random.Random(4)
+        pieces = ['"', "'", '/', '//', '\n', '\n', ' ', 'if', 'x', '1', '-', '=', '}', ';', '\n"', '\n//']
+        for _ in range(300):
+            source = ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 60)))
+            for parts in (2, 3, 7):
+                tokens = []
+                for chunk in split_source(source, parts):
+                    tokens.extend(Lexer(chunk).tokenize())
+                self.assertEqual(tokens, Lexer(source).tokenize(), repr(source))
+
+    def test_process_pool(self):
+        source = EDGE_CASE_SOURCE * 20
+        self.assertEqual(parallel_tokenize(source, workers=3, threshold=0), Lexer(source).tokenize())
+
+    def test_small_input_stays_sequential(self):
+        self.assertEqual(parallel_tokenize("int x;", workers=4), Lexer("int x;").tokenize())
+
+class TestSymbolInterner(unittest.TestCase):
+    def test_ids_are_dense_and_stable(self):
+        symbols = SymbolInterner(['main', 'x'])
+        self.assertEqual(symbols.intern('x'), 1)
+        self.assertEqual(symbols.intern('y'), 2)
+        self.assertEqual(symbols[2], 'y')
+        self.assertIn('main', symbols)
+        self.assertNotIn('z', symbols)
+        self.assertEqual(len(symbols), 3)
+
+    def test_lexer_fills_interner(self):
+        source = "int main() { int total = 1; total = total + 2; return total; }"
+        symbols = SymbolInterner()
+        tokens = Lexer(source, symbols=symbols).tokenize()
+        self.assertEqual(tokens, Lexer(source).tokenize())
+        self.assertEqual(symbols.names, ['main', 'total'])
+        # Every occurrence of a name is the same string object
+        totals = [value for kind, value in tokens if kind == 'identifier' and value == 'total']
+        self.assertEqual(len(totals), 4)
+        self.assertTrue(all(value is symbols.canonical('total') for value in totals))
+
+    def test_every_token_source_fills_interner(self):
+        source = EDGE_CASE_SOURCE
+        expected = SymbolInterner(value for kind, value in Lexer(source).tokenize() if kind == 'identifier')
+        for engine in ('regex', 'dfa'):
+            symbols = SymbolInterner()
+            Lexer(source, engine, symbols).tokenize_stream()
+            self.assertEqual(symbols.names, expected.names)
+            symbols = SymbolInterner()
+            self.assertEqual(Lexer(source.encode('utf-8'), engine, symbols).tokenize(), Lexer(source).tokenize())
+            self.assertEqual(symbols.names, expected.names)
+        symbols = SymbolInterner()
+        list(Lexer(io.StringIO(source), symbols=symbols).iter_tokens(chunk_size=7))
+        self.assertEqual(symbols.names, expected.names)
+
 if __name__ == '__main__':
     unittest.main()
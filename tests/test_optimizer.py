@@ -0,0 +1,145 @@
+import unittest
+
+from generator.generator import CodeGenerator
+from intermediator.fused import FusedIRGenerator
+from intermediator.intermediator import IRGenerator
+from lexer.lexer import Lexer
+from intermediator.intermediator import FunctionCallInstr
+from optimizer.callgraph import CallGraph, drop_unreachable_functions, drop_unreachable_ir, function_ranges
+from optimizer.purity import (MAY_NOT_TERMINATE, MAY_TRAP, PRINTS, effect_summaries, pure_functions,
+                              remove_pure_calls)
+from parser.parser import Parser
+from semanter.semanter import SemanticAnalyzer
+
+def parse(code):
+    return Parser(Lexer(code).tokenize()).parse_program()
+
+SOURCE = """
+int unused() { used(); return 0; }
+int used() { int x = 1; while (x < 3) { if (x) { leaf(); } x = x + 1; } return x; }
+int leaf() { print("leaf"); return 1; }
+int ping() { pong(); return 0; }
+int pong() { ping(); return 1; }
+int self() { self(); return 2; }
+int Loop() { ping(); return 3; }
+int main() { used(); if (1 > 0) { Loop(); } return 0; }
+"""
+
+class TestCallGraph(unittest.TestCase):
+    def test_calls_from_ast_and_ir_agree(self):
+        ast = parse(SOURCE)
+        graph = CallGraph.from_program(ast)
+        self.assertEqual(graph.calls, {
+            'unused': ['used'], 'used': ['leaf'], 'leaf': [], 'ping': ['pong'], 'pong': ['ping'],
+            'self': ['self'], 'Loop': ['ping'], 'main': ['used', 'Loop'],
+        })
+        ir_graph = CallGraph.from_ir(IRGenerator().generate(ast))
+        self.assertEqual({name: set(callees) for name, callees in ir_graph.calls.items()},
+                         {name: set(callees) for name, callees in graph.calls.items()})
+
+    def test_reachable(self):
+        graph = CallGraph.from_program(parse(SOURCE))
+        self.assertEqual(graph.reachable(), {'main', 'used', 'leaf', 'Loop', 'ping', 'pong'})
+        self.assertEqual(graph.reachable('leaf'), {'leaf'})
+        self.assertEqual(graph.reachable('missing'), set())
+
+    def test_strongly_connected_components(self):
+        graph = CallGraph.from_program(parse(SOURCE))
+        components = graph.strongly_connected_components()
+        self.assertEqual(sorted(sorted(component) for component in components),
+                         [['Loop'], ['leaf'], ['main'], ['ping', 'pong'], ['self'], ['unused'], ['used']])
+        # Callees come before their callers
+        position = {name: index for index, component in enumerate(components) for name in component}
+        for caller, callees in graph.calls.items():
+            for callee in callees:
+                self.assertLessEqual(position[callee], position[caller])
+        self.assertEqual(graph.recursive_functions(), {'ping', 'pong', 'self'})
+
+    def test_long_call_chain(self):
+        # Far deeper than the recursion limit
+        calls = {f"f{index}": [f"f{index + 1}"] for index in range(50_000)}
+        calls["f50000"] = ["f0"]
+        graph = CallGraph(calls)
+        self.assertEqual(len(graph.strongly_connected_components()), 1)
+        self.assertEqual(len(graph.reachable("f0")), 50_001)
+
+    def test_function_ranges_do_not_guess_from_names(self):
+        ranges = function_ranges(IRGenerator().generate(parse(SOURCE)))
+        self.assertEqual(list(ranges), ['unused', 'used', 'leaf', 'ping', 'pong', 'self', 'Loop', 'main'])
+
+class TestDeadFunctionElimination(unittest.TestCase):
+    def test_drop_unreachable_functions(self):
+        ast = parse(SOURCE)
+        SemanticAnalyzer().analyze(ast)
+        live = drop_unreachable_functions(ast)
+        self.assertEqual([function.name for function in live.functions], ['used', 'leaf', 'ping', 'pong', 'Loop', 'main'])
+        without_main = parse("int f() { return 0; }")
+        self.assertIs(drop_unreachable_functions(without_main), without_main)
+
+    def test_ast_and_ir_pruning_agree(self):
+        # The second program keeps a function alive only through its address
+        address_taken = "int dead() { return 1; } int addr() { return 2; } int main() { int f = addr; return f; }"
+        for code in (SOURCE, address_taken):
+            ast = parse(code)
+            SemanticAnalyzer().analyze(ast)
+            live = [function.name for function in drop_unreachable_functions(ast).functions]
+            self.assertLess(len(live), len(ast.functions))
+            pruned_ir = drop_unreachable_ir(FusedIRGenerator().generate(ast))
+            self.assertEqual(list(function_ranges(pruned_ir)), live)
+
+    def test_generated_code_has_only_reachable_functions(self):
+        ast = parse(SOURCE)
+        SemanticAnalyzer().analyze(ast)
+        ir_generator = IRGenerator()
+        assembly = CodeGenerator(ir_generator.generate(drop_unreachable_functions(ast)), frames=ir_generator.frames).generate_x86()
+        self.assertNotIn("unused:", assembly)
+        self.assertNotIn("self:", assembly)
+        self.assertIn("ping:", assembly)
+
+PURITY_SOURCE = """
+int square() { int x = 7; return x * x; }
+int counted() { int i = 0; while (i < 10) { i = i + 2; } square(); return i; }
+int to_max() { int i = 0; while (i <= 2147483646) { i = i + 1; } return i; }
+int overflows() { int i = 0; while (i <= 2147483647) { i = i + 1; } return i; }
+int backwards() { int i = 0; while (i <= 2147483647) { i = i + -1; } return i; }
+int reset() { int i = 0; while (i < 10) { i = i + 1; if (i > 5) { i = 0; } } return i; }
+int spin() { int i = 0; while (i < 10) { print("spin"); } return i; }
+int halves() { int x = 8; return x / 2; }
+int divides() { int x = 8; int y = 0; return x / y; }
+int talks() { print("hi"); return 1; }
+int calls_talks() { talks(); return 0; }
+int ping() { pong(); return 0; }
+int pong() { ping(); return 1; }
+int main() { square(); counted(); calls_talks(); ping(); to_max(); halves(); return 0; }
+"""
+
+class TestPurity(unittest.TestCase):
+    def test_effect_summaries(self):
+        summaries = effect_summaries(parse(PURITY_SOURCE))
+        self.assertEqual(summaries['square'], frozenset())
+        self.assertEqual(summaries['counted'], frozenset())
+        self.assertEqual(summaries['to_max'], frozenset())
+        self.assertEqual(summaries['halves'], frozenset())
+        self.assertEqual(summaries['overflows'], {MAY_NOT_TERMINATE})
+        self.assertEqual(summaries['backwards'], {MAY_NOT_TERMINATE})
+        self.assertEqual(summaries['reset'], {MAY_NOT_TERMINATE})
+        self.assertEqual(summaries['spin'], {PRINTS, MAY_NOT_TERMINATE})
+        self.assertEqual(summaries['divides'], {MAY_TRAP})
+        self.assertEqual(summaries['calls_talks'], {PRINTS})
+        # Recursion is not known to end
+        self.assertEqual(summaries['ping'], {MAY_NOT_TERMINATE})
+        self.assertEqual(summaries['pong'], {MAY_NOT_TERMINATE})
+        self.assertEqual(summaries['main'], {PRINTS, MAY_NOT_TERMINATE})
+
+    def test_remove_pure_calls(self):
+        ast = parse(PURITY_SOURCE)
+        SemanticAnalyzer().analyze(ast)
+        pure = pure_functions(ast)
+        self.assertEqual(pure, {'square', 'counted', 'to_max', 'halves'})
+        ir_code = drop_unreachable_ir(remove_pure_calls(IRGenerator().generate(ast), pure))
+        called = [instr.function_name for instr in ir_code if isinstance(instr, FunctionCallInstr)]
+        self.assertEqual(called, ['talks', 'pong', 'ping', 'calls_talks', 'ping'])
+        self.assertEqual(set(function_ranges(ir_code)), {'talks', 'calls_talks', 'ping', 'pong', 'main'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,52 @@
+import contextlib
+import io
+import random
+import re
 import unittest
-from lexer.lexer import Lexer
+from lexer.incremental import relex
+from lexer.lexer import Lexer, TokenIterator
+from parser.flat import FlatAST, flatten, parse_flat
+from parser.incremental import IncrementalParser
+from parser import ll1
+from parser.parallel import function_spans, parallel_parse
+from parser.visitor import NodeVisitor
 from parser.parser import (
-    Parser, ProgramNode, FunctionNode, BlockNode, DeclarationNode,
+    Parser, print_ast, dump_ast, load_ast, AST_FORMAT_VERSION, AST_MAGIC, ProgramNode, FunctionNode, BlockNode, DeclarationNode,
     AssignmentNode, ConditionalNode, PrintNode, IdentifierNode,
     ConstantNode, LiteralNode, BinaryOpNode, FunctionCallNode, WhileNode
 )
 
+# Program touching every statement and expression form
+SAMPLE_PROGRAM = """
+int helper() {
+    print("helper");
+    return 1;
+}
+
+int main() {
+    int x = 10;
+    int y;
+    y = x * 2 + 1;
+    if (x < y && y != 0) {
+        print(x);
+    } else {
+        while (y > 0) {
+            y = y - 1;
+        }
+    }
+    helper();
+    print('done');
+    return x == y;
+}
+"""
+
+def printed_ast(node) -> str:
+    """What print_ast prints for node."""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        print_ast(node)
+    return output.getvalue()
+
 class TestParser(unittest.TestCase):
     def assertASTEqual(self, node1, node2, msg=None):
         """Recursively checks if two AST nodes are equal."""
@@ -742,6 +783,356 @@ class TestParser(unittest.TestCase):
         with self.assertRaisesRegex(SyntaxError, r"Expected identifier or constant for expression got punctuation value ; at position 6."):
             parser.parse_program()
 
+    def test_token_stream_input(self):
+        expected_ast = Parser(Lexer(SAMPLE_PROGRAM).tokenize()).parse_program()
+        ast = Parser(Lexer(SAMPLE_PROGRAM).tokenize_stream()).parse_program()
+        self.assertASTEqual(ast, expected_ast)
+
+    def test_error_reports_line_and_column_from_token_stream(self):
+        code = """int main() {
+    int x = 1
+    return 0;
+}"""
+        parser = Parser(Lexer(code).tokenize_stream())
+        with self.assertRaisesRegex(SyntaxError, r"got keyword value return. at position 9 \(line 3, column 5\)."):
+            parser.parse_program()
+
+class TestBinaryAST(unittest.TestCase):
+    def test_round_trip_every_node_type(self):
+        ast = Parser(Lexer(SAMPLE_PROGRAM).tokenize()).parse_program()
+        loaded = load_ast(dump_ast(ast))
+        self.assertIs(type(loaded), ProgramNode)
+        self.assertEqual(printed_ast(loaded), printed_ast(ast))
+
+    def test_round_trip_subtrees_and_missing_children(self):
+        for node in (DeclarationNode('int', 'x'),
+                     ConditionalNode(ConstantNode('1'), BlockNode([]), None),
+                     BinaryOpNode(BinaryOpNode(IdentifierNode('a'), '-', ConstantNode('-1')), '*', IdentifierNode('a')),
+                     LiteralNode('año € \\n')):
+            self.assertEqual(printed_ast(load_ast(dump_ast(node))), printed_ast(node))
+
+    def test_strings_are_stored_once(self):
+        many = ProgramNode([FunctionNode('int', 'main', BlockNode([
+            AssignmentNode('counter', IdentifierNode('counter')) for _ in range(50)
+        ]), IdentifierNode('counter'))])
+        self.assertEqual(dump_ast(many).count(b'counter'), 1)
+
+    def test_flat_ast_views_encode_like_nodes(self):
+        ast = Parser(Lexer(SAMPLE_PROGRAM).tokenize()).parse_program()
+        self.assertEqual(dump_ast(flatten(ast).program()), dump_ast(ast))
+
+    def test_invalid_data(self):
+        data = dump_ast(Parser(Lexer(SAMPLE_PROGRAM).tokenize()).parse_program())
+        version = AST_FORMAT_VERSION + 1
+        for bad in (b'', b'not an AST', AST_MAGIC + bytes([version]) + data[len(AST_MAGIC) + 1:],
+                    data[:len(data) // 2], data + b'\x00', data + b'\x7f'):
+            with self.assertRaises(ValueError):
+                load_ast(bad)
+
+class TestStreamingParser(unittest.TestCase):
+    def test_token_iterators(self):
+        expected = printed_ast(Parser(Lexer(SAMPLE_PROGRAM).tokenize()).parse_program())
+        for tokens in (iter(Lexer(SAMPLE_PROGRAM).tokenize()),
+                       Lexer(SAMPLE_PROGRAM).iter_tokens(),
+                       Lexer(io.StringIO(SAMPLE_PROGRAM)).iter_tokens(chunk_size=16),
+                       TokenIterator(SAMPLE_PROGRAM)):
+            self.assertEqual(printed_ast(Parser(tokens).parse_program()), expected)
+
+    def test_pulls_at_most_one_token_ahead(self):
+        tokens = Lexer(SAMPLE_PROGRAM).tokenize()
+        pulled = 0
+
+        def counting():
+            nonlocal pulled
+            for token in tokens:
+                pulled += 1
+                yield token
+
+        parser = Parser(counting())
+        while parser.current_token is not None:
+            parser.parse_function()
+            # Only the current token (or none at the end) and one peeked token were read
+            self.assertLessEqual(pulled - parser.pos, 2)
+        self.assertEqual(pulled, len(tokens))
+
+    def test_call_and_assignment_lookahead(self):
+        ast = Parser(iter(Lexer("int main() { f(); f = 1; return f; }").tokenize())).parse_program()
+        statements = ast.functions[0].block.statements
+        self.assertIsInstance(statements[0], FunctionCallNode)
+        self.assertIsInstance(statements[1], AssignmentNode)
+
+    def test_error_positions_from_token_iterator(self):
+        code = """int main() {
+    int x = 1
+    return 0;
+}"""
+        with self.assertRaisesRegex(SyntaxError, r"got keyword value return. at position 9 \(line 3, column 5\)."):
+            Parser(TokenIterator(code)).parse_program()
+        with self.assertRaisesRegex(SyntaxError, r"got keyword value return. at position 9."):
+            Parser(Lexer(code).iter_tokens()).parse_program()
+        with self.assertRaisesRegex(SyntaxError, "Expected punctuation."):
+            Parser(TokenIterator("int main() { return 0;")).parse_program()
+
+class TestParallelParse(unittest.TestCase):
+    def test_function_spans(self):
+        tokens = Lexer(SAMPLE_PROGRAM).tokenize()
+        spans = function_spans(tokens)
+        self.assertEqual(len(spans), 2)
+        self.assertEqual(spans[0][0], 0)
+        self.assertEqual(spans[1][1], len(tokens))
+        self.assertEqual(tokens[spans[1][0]:spans[1][0] + 2], [('keyword', 'int'), ('identifier', 'main')])
+
+    def test_unbalanced_braces_have_no_spans(self):
+        for code in ("int main() { return 0; } }", "int main() { return 0;", "int main() { return 0; } int"):
+            self.assertIsNone(function_spans(Lexer(code).tokenize()), code)
+
+    def test_matches_sequential_parse(self):
+        source = SAMPLE_PROGRAM * 3
+        expected = printed_ast(Parser(Lexer(source).tokenize()).parse_program())
+        for tokens in (Lexer(source).tokenize(), Lexer(source).tokenize_stream()):
+            ast = parallel_parse(tokens, workers=2, threshold=0)
+            self.assertIsInstance(ast, ProgramNode)
+            self.assertEqual(printed_ast(ast), expected)
+
+    def test_syntax_errors_match_sequential_parse(self):
+        code = SAMPLE_PROGRAM + "int broken() { int x = 1 return x; }"
+        with self.assertRaisesRegex(SyntaxError, r"at position \d+ \(line 22, column 26\)"):
+            parallel_parse(Lexer(code).tokenize_stream(), workers=2, threshold=0)
+
+    def test_small_input_stays_sequential(self):
+        tokens = Lexer("int main() { return 0; }").tokenize()
+        self.assertEqual(printed_ast(parallel_parse(tokens, workers=4)), printed_ast(Parser(tokens).parse_program()))
+
+class TestIncrementalParser(unittest.TestCase):
+    SOURCE = SAMPLE_PROGRAM + "int last() { return 2; }\n"
+
+    def edit(self, stream, old, new):
+        offset = stream.source.index(old)
+        return relex(stream, offset, len(old), new)
+
+    def test_reuses_untouched_functions(self):
+        stream = Lexer(self.SOURCE).tokenize_stream()
+        incremental = IncrementalParser(stream)
+        before = list(incremental.program.functions)
+
+        stream, diff = self.edit(stream, "y = y - 1;", "y = y - 2; print(y);")
+        program = incremental.update(stream, diff)
+        self.assertEqual(incremental.reparsed, range(1, 2))
+        self.assertIs(program.functions[0], before[0])
+        self.assertIsNot(program.functions[1], before[1])
+        self.assertIs(program.functions[2], before[2])
+        self.assertEqual(printed_ast(program), printed_ast(Parser(stream).parse_program()))
+
+        # Spans were shifted, so a later edit after the first one still lines up
+        stream, diff = self.edit(stream, "return 2;", "return 3;")
+        program = incremental.update(stream, diff)
+        self.assertEqual(incremental.reparsed, range(2, 3))
+        self.assertEqual(printed_ast(program), printed_ast(Parser(stream).parse_program()))
+
+    def test_added_and_removed_functions(self):
+        stream = Lexer(self.SOURCE).tokenize_stream()
+        incremental = IncrementalParser(stream)
+        stream, diff = self.edit(stream, "int last()", "int extra() { return 1; }\nint last()")
+        self.assertEqual(len(incremental.update(stream, diff).functions), 4)
+
+        # Deleting a closing brace merges two functions into a syntax error
+        stream, diff = self.edit(stream, "extra() { return 1; }", "extra() { return 1;")
+        with self.assertRaises(SyntaxError) as expected:
+            Parser(stream).parse_program()
+        with self.assertRaisesRegex(SyntaxError, re.escape(str(expected.exception))):
+            incremental.update(stream, diff)
+
+        # After an error the next edit parses everything again
+        stream, diff = self.edit(stream, "extra() { return 1;", "extra() { return 1; }")
+        program = incremental.update(stream, diff)
+        self.assertEqual(incremental.reparsed, range(4))
+        self.assertEqual(printed_ast(program), printed_ast(Parser(stream).parse_program()))
+
+    def test_random_edits_match_full_parse(self):
+        rng = random.Random(7)
+        pieces = ['}', '{', 'int f() { return 0; }\n', ' x = 1;', 'print(x);', ' ', 'y', '1', '+', '']
+        for _ in range(100):
+            stream = Lexer(self.SOURCE).tokenize_stream()
+            incremental = IncrementalParser(stream)
+            for _ in range(5):
+                offset = rng.randint(0, len(stream.source))
+                removed = rng.randint(0, min(2, len(stream.source) - offset))
+                stream, diff = relex(stream, offset, removed, rng.choice(pieces))
+                try:
+                    expected = printed_ast(Parser(stream).parse_program())
+                except SyntaxError as error:
+                    with self.assertRaisesRegex(SyntaxError, re.escape(str(error))):
+                        incremental.update(stream, diff)
+                else:
+                    self.assertEqual(printed_ast(incremental.update(stream, diff)), expected)
+
+class TestLL1Parser(unittest.TestCase):
+    def test_same_ast_as_recursive_descent(self):
+        tokens = Lexer(SAMPLE_PROGRAM).tokenize()
+        expected = printed_ast(Parser(tokens).parse_program())
+        for parser in (Parser(tokens, engine='ll1'), Parser(Lexer(SAMPLE_PROGRAM).tokenize_stream(), engine='ll1'),
+                       Parser(iter(tokens), engine='ll1'), ll1.LL1Parser(tokens)):
+            self.assertEqual(printed_ast(parser.parse_program()), expected)
+
+    def test_first_and_follow_sets(self):
+        self.assertEqual(ll1.FIRST['Statement'], {"'int'", "'if'", "'while'", "'print'", 'identifier'})
+        self.assertEqual(ll1.FOLLOW['Statements'], {"'return'", "'}'"})
+        self.assertIn('', ll1.FIRST['ExpressionTail'])
+        self.assertEqual(ll1.FOLLOW['ExpressionTail'], {"';'", "')'"})
+
+    def test_accepts_the_same_programs(self):
+        rng = random.Random(11)
+        tokens = Lexer(SAMPLE_PROGRAM).tokenize()
+        for _ in range(500):
+            mutated = list(tokens)
+            index = rng.randrange(len(mutated))
+            choice = rng.random()
+            if choice < 0.4:
+                del mutated[index]
+            elif choice < 0.7:
+                mutated.insert(index, rng.choice(tokens))
+            else:
+                mutated[index] = rng.choice(tokens)
+            try:
+                expected = printed_ast(Parser(mutated).parse_program())
+            except SyntaxError:
+                with self.assertRaises(SyntaxError):
+                    Parser(mutated, engine='ll1').parse_program()
+            else:
+                self.assertEqual(printed_ast(Parser(mutated, engine='ll1').parse_program()), expected)
+
+    def test_error_messages(self):
+        code = """int main() {
+    int x = 1
+    return 0;
+}"""
+        with self.assertRaisesRegex(SyntaxError, r"Expected token type ';' but got keyword value return. at position 9 \(line 3, column 5\)."):
+            Parser(Lexer(code).tokenize_stream(), engine='ll1').parse_program()
+        with self.assertRaisesRegex(SyntaxError, "Unexpected end of input. Expected 'int'."):
+            Parser([], engine='ll1').parse_program()
+        with self.assertRaisesRegex(SyntaxError, "but got unknown value @. at position 3."):
+            Parser(Lexer("int main(@) { return 0; }").tokenize(), engine='ll1').parse_program()
+
+    def test_deep_nesting(self):
+        depth = 5000
+        code = "int main() { int x = 1; " + "if (x) { " * depth + "print(x);" + " }" * depth + " return 0; }"
+        tokens = Lexer(code).tokenize()
+        node = Parser(tokens, engine='ll1').parse_program().functions[0].block.statements[1]
+        for _ in range(depth - 1):
+            node = node.if_block.statements[0]
+        self.assertIsInstance(node.if_block.statements[0], PrintNode)
+        # Recursive descent recurses per level
+        with self.assertRaises(RecursionError):
+            Parser(tokens).parse_program()
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            Parser([], engine='lalr')
+
+class TestDeepTrees(unittest.TestCase):
+    # Well past the recursion limit; no walker may recurse per level
+
+    def test_long_expression(self):
+        code = "int main() { return " + " + ".join(["x"] * 100_000) + "; }"
+        ast = Parser(Lexer(code).tokenize_stream()).parse_program()
+        encoded = dump_ast(ast)
+        self.assertEqual(dump_ast(load_ast(encoded)), encoded)
+        flat = flatten(ast)
+        self.assertEqual(len(flat), 100_000 + 99_999 + 3) # Operands, operators, program, function, block
+        self.assertEqual(dump_ast(flat.to_node()), encoded)
+
+    def test_deeply_nested_blocks(self):
+        code = ("int main() { " + "if (x) { while (x) { " * 5_000 + "x = 1;"
+                + "} } " * 5_000 + "return x; }")
+        ast = Parser(Lexer(code).tokenize(), engine='ll1').parse_program()
+        encoded = dump_ast(ast)
+        self.assertEqual(dump_ast(flatten(ast).to_node()), encoded)
+
+    def test_print_ast(self):
+        expression = IdentifierNode('x')
+        for _ in range(1_500):
+            expression = BinaryOpNode(expression, '+', ConstantNode('1'))
+        lines = printed_ast(expression).splitlines()
+        self.assertEqual(len(lines), 1_500 * 4 + 1)
+        self.assertEqual(lines[:3], ["BinaryOpNode: +", "  Left:", "  BinaryOpNode: +"])
+        self.assertEqual(lines[1_500 * 2 - 1:1_500 * 2 + 2],
+                         [" " * 2 * 1_499 + "  Left:", " " * 2 * 1_500 + "IdentifierNode: x",
+                          " " * 2 * 1_499 + "  Right:"])
+        self.assertEqual(lines[-2:], ["  Right:", "  ConstantNode: 1"])
+
+class TestNodeVisitor(unittest.TestCase):
+    class Evaluator(NodeVisitor):
+        def visit_ConstantNode(self, node):
+            return int(node.value)
+
+        def visit_BinaryOpNode(self, node):
+            left = yield node.left
+            right = yield node.right
+            return left + right if node.operator == '+' else left * right
+
+    def test_dispatch_is_cached_per_class(self):
+        evaluator = self.Evaluator()
+        ast = BinaryOpNode(ConstantNode('2'), '*', BinaryOpNode(ConstantNode('3'), '+', ConstantNode('4')))
+        self.assertEqual(evaluator.visit(ast), 14)
+        self.assertEqual(set(self.Evaluator._visitors), {BinaryOpNode, ConstantNode})
+        self.assertNotIn(ConstantNode, NodeVisitor._visitors)
+
+        # Flat AST views are other classes with the same names
+        flat = flatten(ast)
+        self.assertEqual(evaluator.visit(flat.node(len(flat) - 1)), 14) # Children come before their parent
+
+    def test_generic_visit(self):
+        with self.assertRaisesRegex(NotImplementedError, "No visit_IdentifierNode method defined for Evaluator."):
+            self.Evaluator().visit(BinaryOpNode(ConstantNode('1'), '+', IdentifierNode('x')))
+
+class TestFlatAST(unittest.TestCase):
+    def test_flatten_round_trips_every_node_type(self):
+        ast = Parser(Lexer(SAMPLE_PROGRAM).tokenize()).parse_program()
+        self.assertEqual(printed_ast(flatten(ast).program()), printed_ast(ast))
+
+    def test_views_look_like_node_classes(self):
+        flat = parse_flat(Lexer(SAMPLE_PROGRAM).tokenize())
+        main = flat.program().functions[1]
+        self.assertIsInstance(main, FunctionNode)
+        self.assertEqual(type(main).__name__, 'FunctionNode')
+        self.assertEqual(main.name, 'main')
+        declaration = main.block.statements[1]
+        self.assertIsInstance(declaration, DeclarationNode)
+        self.assertIsNone(declaration.expression)
+
+    def test_parse_flat_matches_parse_program(self):
+        ast = Parser(Lexer(SAMPLE_PROGRAM).tokenize()).parse_program()
+        flat = parse_flat(Lexer(SAMPLE_PROGRAM).tokenize_stream())
+        self.assertEqual(printed_ast(flat.program()), printed_ast(ast))
+        # Identical names and values are stored once
+        self.assertEqual(len(flat.strings), len(set(flat.strings)))
+
+    def test_walk_visits_every_node_once(self):
+        flat = parse_flat(Lexer(SAMPLE_PROGRAM).tokenize())
+        order = list(flat.walk())
+        self.assertEqual(sorted(order), list(range(len(flat))))
+        self.assertEqual(order[0], flat.root)
+        self.assertIs(flat.kind(order[1]), FunctionNode)
+
+    def test_parse_flat_errors_match_parser(self):
+        for code in ("", "int main() { return 0 }", "int main() { print(1); return 0; }"):
+            with self.assertRaises(SyntaxError) as expected:
+                Parser(Lexer(code).tokenize()).parse_program()
+            with self.assertRaisesRegex(SyntaxError, re.escape(str(expected.exception))):
+                parse_flat(Lexer(code).tokenize())
+
+    def test_to_node_builds_regular_nodes(self):
+        ast = Parser(Lexer(SAMPLE_PROGRAM).tokenize()).parse_program()
+        flat = flatten(ast)
+        rebuilt = flat.to_node()
+        self.assertIs(type(rebuilt), ProgramNode)
+        self.assertEqual(printed_ast(rebuilt), printed_ast(ast))
+        main = flat.program().functions[1]
+        self.assertEqual(printed_ast(flat.to_node(main._id)), printed_ast(ast.functions[1]))
+
+    def test_empty_flat_ast_has_no_program(self):
+        with self.assertRaises(ValueError):
+            FlatAST().program()
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,8 +1,19 @@
+import contextlib
+import io
 import unittest
 
+from lexer.incremental import relex
 from lexer.lexer import Lexer
-from parser.parser import Parser
-from semanter.semanter import SemanticAnalyzer, SemanticError
+from lexer.symbols import SymbolInterner
+from parser.flat import parse_flat
+from parser.incremental import IncrementalParser
+from parser.parser import (Parser, ProgramNode, FunctionNode, BlockNode, DeclarationNode,
+                           AssignmentNode, ConditionalNode, WhileNode, IdentifierNode,
+                           ConstantNode, BinaryOpNode)
+from semanter.annotations import annotated_nodes
+from semanter.incremental import IncrementalAnalyzer
+from semanter.parallel import parallel_analyze
+from semanter.semanter import SemanticAnalyzer, SemanticError, SymbolTable
 
 class TestSemanticAnalyzer(unittest.TestCase):
     def analyze_code(self, code):
@@ -235,5 +246,232 @@ class TestSemanticAnalyzer(unittest.TestCase):
         """
         self.analyze_code_for_error(code, "Function 'main' already declared.")
 
+    def test_flat_ast(self):
+        code = """
+        int helper() { return 1; }
+        int main() { int x = 2; if (x > 1) { helper(); } return x; }
+        """
+        SemanticAnalyzer().analyze(parse_flat(Lexer(code).tokenize()).program())
+
+        flat = parse_flat(Lexer("int main() { x = 1; return 0; }").tokenize())
+        with self.assertRaisesRegex(SemanticError, "Identifier 'x' not declared."):
+            SemanticAnalyzer().analyze(flat.program())
+
+    def test_deep_expression(self):
+        # A left-deep chain of 100k operands, far past the recursion limit
+        expression = IdentifierNode('x')
+        for _ in range(100_000):
+            expression = BinaryOpNode(expression, '+', ConstantNode('1'))
+        block = BlockNode([DeclarationNode('int', 'x', ConstantNode('0'))])
+        SemanticAnalyzer().analyze(ProgramNode([FunctionNode('int', 'main', block, expression)]))
+
+        expression.left.left = BinaryOpNode(IdentifierNode('y'), '+', expression.left.left)
+        with self.assertRaisesRegex(SemanticError, "Identifier 'y' not declared."):
+            SemanticAnalyzer().analyze(ProgramNode([FunctionNode('int', 'main', block, expression)]))
+
+    def test_deeply_nested_blocks(self):
+        innermost = BlockNode([AssignmentNode('x', IdentifierNode('x'))])
+        block = innermost
+        for depth in range(10_000):
+            if depth % 2:
+                block = BlockNode([WhileNode(IdentifierNode('x'), block)])
+            else:
+                block = BlockNode([ConditionalNode(IdentifierNode('x'), block)])
+        block.statements.insert(0, DeclarationNode('int', 'x', ConstantNode('1')))
+        SemanticAnalyzer().analyze(ProgramNode([FunctionNode('int', 'main', block, IdentifierNode('x'))]))
+
+        innermost.statements.append(AssignmentNode('y', ConstantNode('1')))
+        with self.assertRaisesRegex(SemanticError, "Identifier 'y' not declared."):
+            SemanticAnalyzer().analyze(ProgramNode([FunctionNode('int', 'main', block, IdentifierNode('x'))]))
+
+    def test_nodes_get_symbols_and_frame_slots(self):
+        ast = Parser(Lexer("""
+        int main() { int x = 1; if (x) { int x = 2; x = x + 1; } int y = x; return y; }
+        """).tokenize()).parse_program()
+        SemanticAnalyzer().analyze(ast)
+        main = ast.functions[0]
+        outer_x, conditional, y_declaration = main.block.statements
+        inner_x, assignment = conditional.if_block.statements
+        self.assertEqual([(symbol.name, symbol.slot) for symbol in main.local_symbols], [('x', 0), ('x', 1), ('y', 2)])
+        self.assertEqual(main.local_symbols, [outer_x.symbol, inner_x.symbol, y_declaration.symbol])
+        self.assertIs(conditional.condition.symbol, outer_x.symbol)
+        self.assertIs(assignment.symbol, inner_x.symbol)
+        self.assertIs(assignment.expression.left.symbol, inner_x.symbol)
+        self.assertIs(y_declaration.expression.symbol, outer_x.symbol)
+        self.assertIs(main.return_expression.symbol, y_declaration.symbol)
+
+class TestSymbolTable(unittest.TestCase):
+    def test_shadowing_and_scope_exit(self):
+        table = SymbolTable()
+        table.declare('x', 'int')
+        table.enter_scope()
+        self.assertEqual(table.lookup('x').scope_level, 0)
+        table.declare('x', 'int')
+        table.declare('y', 'int')
+        self.assertEqual(table.lookup('x').scope_level, 1)
+        with self.assertRaisesRegex(SemanticError, "Identifier 'y' already declared in the current scope."):
+            table.declare('y', 'int')
+        table.exit_scope()
+        self.assertEqual(table.lookup('x').scope_level, 0)
+        self.assertIsNone(table.lookup('y'))
+        table.declare('y', 'int')
+        with self.assertRaisesRegex(SemanticError, "Cannot exit global scope."):
+            table.exit_scope()
+
+    def test_symbols_are_keyed_by_interner_id(self):
+        symbols = SymbolInterner(['main', 'x'])
+        table = SymbolTable(symbols)
+        table.declare('x', 'int')
+        self.assertEqual(table.lookup('x').symbol_id, 1)
+        self.assertIsNone(table.lookup('main'))
+        self.assertIsNone(table.lookup('unknown'))
+        self.assertNotIn('unknown', symbols)
+
+    def test_print_symbols(self):
+        table = SymbolTable()
+        table.declare('main', 'int')
+        table.enter_scope()
+        table.declare('x', 'int')
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            table.print_symbols()
+        self.assertEqual(output.getvalue().splitlines(), [
+            "Name: main, Type: int, Scope Level: 0",
+            "Name: x, Type: int, Scope Level: 1",
+            "End of Symbol Table"
+        ])
+
+class TestParallelAnalyze(unittest.TestCase):
+    PROGRAM = """
+    int f1() { int a = 1; while (a < 5) { a = a + 1; } return a; }
+    int f2() { int a = 2; int b = a * 3; f1(); return b; }
+    int f3() { int c = 0; if (c) { int c = 1; print(c); } else { c = f2 + 1; } return c; }
+    int f4() { int d = 4; print("f4"); f3(); return d / 2; }
+    int f5() { int e = 5; int g = e == 5; return g; }
+    int main() { int x = 1; f4(); f5(); return x; }
+    """
+
+    def parse(self, code):
+        return Parser(Lexer(code).tokenize()).parse_program()
+
+    def resolved(self, ast):
+        return [[(node.symbol.name, node.symbol.slot, node.symbol.scope_level) for node in annotated_nodes(function)]
+                for function in ast.functions]
+
+    def test_same_symbols_as_sequential(self):
+        code = self.PROGRAM + "int shadow() { int f = 1; if (f) { int f = 2; f = f + main; } return f; }"
+        sequential = self.parse(code)
+        SemanticAnalyzer().analyze(sequential)
+        parallel = self.parse(code)
+        symbols = SymbolInterner()
+        analyzer = parallel_analyze(parallel, symbols, workers=2, threshold=0)
+        self.assertEqual(self.resolved(parallel), self.resolved(sequential))
+        shadow = parallel.functions[-1]
+        self.assertIs(shadow.return_expression.symbol, shadow.local_symbols[0])
+        self.assertEqual(shadow.local_symbols[0].symbol_id, symbols.ids['f'])
+        self.assertEqual(analyzer.symbol_table.lookup('main').scope_level, 0)
+
+    def test_first_error_in_source_order(self):
+        program = self.PROGRAM
+        errors = [
+            ("int a() { return x; } " + program + " int b() { return y; }", "Identifier 'x' not declared."),
+            (program + " int b() { return y; } int c() { return z; }", "Identifier 'y' not declared."),
+            (program + " int a() { return y; } int a() { return 1; }", "Function 'a' already declared."),
+        ]
+        for code, message in errors:
+            with self.assertRaisesRegex(SemanticError, f"^{message}$"):
+                parallel_analyze(self.parse(code), workers=3, threshold=0)
+
+    def test_small_input_stays_sequential(self):
+        ast = self.parse("int main() { int x = 1; return x; }")
+        analyzer = parallel_analyze(ast, workers=4)
+        self.assertIsInstance(analyzer, SemanticAnalyzer)
+        self.assertIs(ast.functions[0].return_expression.symbol, ast.functions[0].local_symbols[0])
+
+class TestIncrementalAnalyzer(unittest.TestCase):
+    SOURCE = """
+    int helper() { int x = 1; return x; }
+    int other() { int y = 2; helper(); return y; }
+    int main() { int z = 3; if (z) { int z = 4; print(z); } other(); return z; }
+    """
+
+    def parse(self, code):
+        return Parser(Lexer(code).tokenize()).parse_program()
+
+    def resolved(self, ast):
+        return [[(node.symbol.name, node.symbol.slot) for node in annotated_nodes(function)]
+                for function in ast.functions]
+
+    def sequential_error(self, code):
+        try:
+            SemanticAnalyzer().analyze(self.parse(code))
+        except SemanticError as error:
+            return str(error)
+        return None
+
+    def test_rechecks_only_edited_functions(self):
+        stream = Lexer(self.SOURCE).tokenize_stream()
+        parser = IncrementalParser(stream)
+        analyzer = IncrementalAnalyzer()
+        analyzer.analyze(parser.program)
+        self.assertEqual(analyzer.rechecked, [0, 1, 2])
+        analyzer.analyze(parser.program)
+        self.assertEqual(analyzer.rechecked, [])
+
+        offset = stream.source.index("print(z);")
+        stream, diff = relex(stream, offset, 0, "z = z + 1; ")
+        program = parser.update(stream, diff)
+        analyzer.analyze(program)
+        self.assertEqual(analyzer.rechecked, [2])
+        expected = Parser(stream).parse_program()
+        SemanticAnalyzer().analyze(expected)
+        self.assertEqual(self.resolved(program), self.resolved(expected))
+
+    def test_fresh_parse_is_found_by_structure(self):
+        analyzer = IncrementalAnalyzer()
+        analyzer.analyze(self.parse(self.SOURCE))
+        ast = self.parse(self.SOURCE)
+        analyzer.analyze(ast)
+        self.assertEqual(analyzer.rechecked, [])
+        expected = self.parse(self.SOURCE)
+        SemanticAnalyzer().analyze(expected)
+        self.assertEqual(self.resolved(ast), self.resolved(expected))
+        main = ast.functions[2]
+        self.assertIs(main.return_expression.symbol, main.local_symbols[0])
+
+    def test_dependents_of_changed_declarations(self):
+        analyzer = IncrementalAnalyzer()
+        analyzer.analyze(self.parse(self.SOURCE))
+        # Removing helper breaks other, which calls it, and leaves main alone
+        without_helper = self.SOURCE.replace("int helper() { int x = 1; return x; }", "")
+        with self.assertRaisesRegex(SemanticError, "^Function 'helper' not declared.$"):
+            analyzer.analyze(self.parse(without_helper))
+        self.assertEqual(analyzer.rechecked, [0])
+        # The cached error is raised again without checking anything
+        with self.assertRaisesRegex(SemanticError, "^Function 'helper' not declared.$"):
+            analyzer.analyze(self.parse(without_helper))
+        self.assertEqual(analyzer.rechecked, [])
+        # Declaring it again (elsewhere) fixes other
+        analyzer.analyze(self.parse(without_helper + "int helper() { return 5; }"))
+        self.assertEqual(analyzer.rechecked, [0, 2])
+
+    def test_same_errors_as_sequential(self):
+        programs = [
+            self.SOURCE.replace("return x;", "return q;"),
+            self.SOURCE.replace("helper();", "missing();").replace("print(z);", "print(w);"),
+            self.SOURCE + "int main() { return 0; }",
+            self.SOURCE.replace("int y = 2;", "int y = 2; int y = 3;"),
+            self.SOURCE,
+        ]
+        analyzer = IncrementalAnalyzer()
+        for _ in range(2):
+            for code in programs:
+                message = self.sequential_error(code)
+                if message is None:
+                    analyzer.analyze(self.parse(code))
+                else:
+                    with self.assertRaisesRegex(SemanticError, f"^{message}$"):
+                        analyzer.analyze(self.parse(code))
+
 if __name__ == '__main__':
     unittest.main()